@@ -1,84 +1,107 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from app.core.config import settings
-from app.models.user import TokenPayload, User, UserProfile
-from app.repositories.user import UserRepository, UserRoleRepository
+from app.core.security import decode_access_token
+from app.models.user import Principal, TokenPayload, User, UserProfile
+from app.repositories.user import UserRepository
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from pydantic import ValidationError
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _insufficient_permissions() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Insufficient permissions",
+    )
+
+def _verified_payload(token: str) -> Dict[str, Any]:
+    """Verify the access token (cached per worker until it expires) and return its payload."""
+    payload = decode_access_token(token)
+    if payload is None:
+        raise _credentials_exception()
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
         token_data = TokenPayload(**payload)
-    except (JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = await UserRepository.get_by_id(token_data.sub)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    return user
+    except ValidationError:
+        raise _credentials_exception()
+    if not token_data.sub:
+        raise _credentials_exception()
+    return payload
+
+def _has_role_claims(payload: Dict[str, Any]) -> bool:
+    # Tokens issued before role claims existed only carry the subject
+    return payload.get("pv") is not None and payload.get("role") is not None
+
+async def _claims_are_current(payload: Dict[str, Any]) -> bool:
+    """Whether the token's role claim matches the user's current profile version."""
+    if not _has_role_claims(payload):
+        return False
+    return await UserRepository.get_profile_version(payload["sub"]) == payload["pv"]
+
+async def _load_profile(user_id: str) -> UserProfile:
+    """The user's profile, served from the profile cache; Mongo is only read on a miss."""
+    profile = await UserRepository.get_profile(user_id)
+    if not profile:
+        raise _user_not_found()
+    return profile
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    The caller's ID and role from the verified token claims alone, for handlers
+    that only need to know who is calling. Costs no Redis or Mongo round trip.
+    """
+    payload = _verified_payload(token)
+    return Principal(id=payload["sub"], role=payload.get("role"))
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    payload = _verified_payload(token)
+    profile = await _load_profile(payload["sub"])
+    return User(**profile.model_dump())
 
 async def get_current_user_profile(token: str = Depends(oauth2_scheme)) -> UserProfile:
     """
     Get current user with complete profile information including role.
-    This dependency validates the JWT token and returns UserProfile with role.
+    Profile fields are not carried in the token; they come from the profile
+    cache, which is invalidated whenever the profile or role changes.
     """
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    profile = await UserRepository.get_profile(token_data.sub)
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    return profile
+    payload = _verified_payload(token)
+    return await _load_profile(payload["sub"])
 
 async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[User]:
     if not token:
         return None
     
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-        user = await UserRepository.get_by_id(token_data.sub)
-        return user
+        return await get_current_user(token)
     except:
         return None
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
-    is_admin = await UserRoleRepository.is_admin(current_user.id)
-    if not is_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Insufficient permissions",
-        )
-    return current_user
+async def get_current_admin(token: str = Depends(oauth2_scheme)) -> Principal:
+    payload = _verified_payload(token)
+    # A role claim is trusted while the profile version still matches, so
+    # demotions take effect immediately at the cost of one version lookup
+    if await _claims_are_current(payload):
+        if payload["role"] != "admin":
+            raise _insufficient_permissions()
+        return Principal(id=payload["sub"], role=payload["role"])
+    
+    # Older or stale claims: decide from the profile
+    profile = await _load_profile(payload["sub"])
+    if profile.role != "admin":
+        raise _insufficient_permissions()
+    return Principal(id=profile.id, role=profile.role)
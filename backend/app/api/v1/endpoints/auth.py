@@ -8,7 +8,7 @@ from pydantic import BaseModel, ValidationError
 
 from app.api.dependencies import (
     get_current_admin,
-    get_current_user,
+    get_current_principal,
     get_current_user_profile,
 )
 from app.core.config import settings
@@ -18,6 +18,7 @@ from app.models.password_reset import PasswordResetConfirm, PasswordResetRequest
 from app.models.user import (
     FirebaseLoginRequest,
     FirebaseUserCreate,
+    Principal,
     Token,
     TokenPayload,
     User,
@@ -109,6 +110,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+    # Read the version before the profile, so a concurrent change makes the claims stale, not wrong
+    profile_version = await UserRepository.get_profile_version(user.id) or 0
+    
     # Get user profile with role information
     user_profile = await UserRepository.get_profile(user.id)
     if not user_profile:
@@ -120,7 +124,10 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=user.id, expires_delta=access_token_expires
+        subject=user.id,
+        expires_delta=access_token_expires,
+        profile=user_profile,
+        profile_version=profile_version
     )
 
     # Create refresh token
@@ -147,16 +154,8 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
 async def refresh_token(refresh_request: RefreshTokenRequest) -> Any:
     """
     Get a new access token using a refresh token.
+    The refresh token is rotated: the response carries a new one that replaces it.
     """
-    # Verify refresh token validity
-    is_valid = await RefreshTokenRepository.is_token_valid(refresh_request.refresh_token)
-    if not is_valid:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired refresh token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
     try:
         # Decode the refresh token
         payload = jwt.decode(
@@ -165,43 +164,61 @@ async def refresh_token(refresh_request: RefreshTokenRequest) -> Any:
             algorithms=[settings.ALGORITHM]
         )
         token_data = TokenPayload(**payload)
-        
-        # Verify token type
-        if token_data.token_type != "refresh_token":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token type",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Get user from token data
-        user_id = token_data.sub
-        user_profile = await UserRepository.get_profile(user_id)
-        if not user_profile:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found",
-            )
-        
-        # Create a new access token
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            subject=user_id, expires_delta=access_token_expires
-        )
-        
-        # Return the new access token
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_request.refresh_token,  # Return the same refresh token
-            "token_type": "bearer",
-            "user": user_profile
-        }
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate refresh token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    # Verify token type
+    if token_data.token_type != "refresh_token" or not token_data.sub:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token type",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Swap the stored refresh token for a new one; fails if it was revoked or expired
+    user_id = token_data.sub
+    refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    new_refresh_token = create_refresh_token(subject=user_id, expires_delta=refresh_token_expires)
+    rotated_user_id = await RefreshTokenRepository.rotate(
+        refresh_request.refresh_token,
+        new_refresh_token,
+        expires_delta=refresh_token_expires
+    )
+    if rotated_user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Get user from token data
+    profile_version = await UserRepository.get_profile_version(user_id) or 0
+    user_profile = await UserRepository.get_profile(user_id)
+    if not user_profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    
+    # Create a new access token
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        subject=user_id,
+        expires_delta=access_token_expires,
+        profile=user_profile,
+        profile_version=profile_version
+    )
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": new_refresh_token,
+        "token_type": "bearer",
+        "user": user_profile
+    }
 
 @router.get("/me", response_model=UserProfile)
 async def read_users_me(current_user_profile: UserProfile = Depends(get_current_user_profile)) -> Any:
@@ -215,7 +232,7 @@ async def read_users_me(current_user_profile: UserProfile = Depends(get_current_
 @router.patch("/users/me", response_model=User)
 async def update_user_me(
     user_update: UserUpdate, 
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Update own user information.
@@ -226,23 +243,16 @@ async def update_user_me(
 @router.get("/users", response_model=PaginatedResponse[UserProfile])
 async def read_users(
     pagination: PaginationParams = Depends(),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Retrieve users with pagination. Only for admins.
     """
-    users = await UserRepository.get_all(skip=pagination.skip, limit=pagination.limit)
+    profiles = await UserRepository.get_profiles(skip=pagination.skip, limit=pagination.limit)
     total_count = await UserRepository.count()
     
-    # Convert users to profiles
-    result = []
-    for user in users:
-        profile = await UserRepository.get_profile(user.id)
-        if profile:
-            result.append(profile)
-    
     return await create_paginated_response(
-        data=result,
+        data=profiles,
         page=pagination.page,
         limit=pagination.limit,
         total_count=total_count
@@ -251,7 +261,7 @@ async def read_users(
 @router.post("/users/{user_id}/make-admin", response_model=UserProfile)
 async def make_admin(
     user_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Make a user an admin. Only for admins.
@@ -278,7 +288,7 @@ async def logout(refresh_request: RefreshTokenRequest) -> None:
 
 
 @router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
-async def logout_all(current_user: User = Depends(get_current_user)) -> None:
+async def logout_all(current_user: Principal = Depends(get_current_principal)) -> None:
     """
     Logout from all devices by revoking all refresh tokens for the user.
     """
@@ -407,6 +417,9 @@ async def firebase_login(firebase_request: FirebaseLoginRequest) -> Any:
             detail="Failed to create or retrieve user"
         )
     
+    # Read the version before the profile, so a concurrent change makes the claims stale, not wrong
+    profile_version = await UserRepository.get_profile_version(user.id) or 0
+    
     # Get user profile with role information
     user_profile = await UserRepository.get_profile(user.id)
     if not user_profile:
@@ -418,7 +431,10 @@ async def firebase_login(firebase_request: FirebaseLoginRequest) -> Any:
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=user.id, expires_delta=access_token_expires
+        subject=user.id,
+        expires_delta=access_token_expires,
+        profile=user_profile,
+        profile_version=profile_version
     )
     
     # Create refresh token
@@ -3,7 +3,7 @@ from typing import List, Optional
 from app.api.dependencies import get_current_admin, get_current_user
 from app.models.contact import ContactMessageCreate, ContactMessageResponse
 from app.models.pagination import PaginatedResponse, PaginationParams
-from app.models.user import User
+from app.models.user import Principal
 from app.repositories.contact import contact_repository
 from app.services.email import send_email
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -87,7 +87,7 @@ async def get_contact_messages(
     page: int = 1,
     limit: int = 20,
     status_filter: Optional[str] = None,
-    admin_user: User = Depends(get_current_admin)
+    admin_user: Principal = Depends(get_current_admin)
 ):
     """Get all contact messages (Admin only)"""
     pagination = PaginationParams(page=page, limit=limit)
@@ -120,7 +120,7 @@ async def update_message_status(
     message_id: str,
     status: str,
     admin_notes: Optional[str] = None,
-    admin_user: User = Depends(get_current_admin)
+    admin_user: Principal = Depends(get_current_admin)
 ):
     """Update contact message status (Admin only)"""
     if status not in ["new", "read", "replied"]:
@@ -142,7 +142,7 @@ async def update_message_status(
 @router.delete("/contact/messages/{message_id}")
 async def delete_contact_message(
     message_id: str,
-    admin_user: User = Depends(get_current_admin)
+    admin_user: Principal = Depends(get_current_admin)
 ):
     """Delete a contact message (Admin only)"""
     success = await contact_repository.delete_message(message_id)
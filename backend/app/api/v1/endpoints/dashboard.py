@@ -1,17 +1,20 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from app.api.dependencies import get_current_admin
-from app.models.user import User
+from app.core.security import password_hasher
+from app.models.user import CustomerDirectoryPage, Principal
 from app.repositories.order import OrderRepository
 from app.repositories.product import ProductRepository
 from app.repositories.user import UserRepository
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.services.cache_metrics import cache_metrics
+from app.services.http_client import http_client
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 router = APIRouter()
 
 @router.get("/stats", response_model=Dict[str, Any])
 async def get_dashboard_stats(
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Get dashboard statistics. Only for admins.
@@ -32,3 +35,72 @@ async def get_dashboard_stats(
         "customers": "+4.1%"
     }
 }
+
+
+@router.get("/customers", response_model=CustomerDirectoryPage)
+async def get_customer_directory(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    search: Optional[str] = Query(None, max_length=100, description="Email or name prefix"),
+    cached_stats: bool = Query(False, description="Use the cached per-customer order stats"),
+    current_user: Principal = Depends(get_current_admin)
+) -> Any:
+    """
+    Get customers, newest first, with their role, order count and lifetime
+    spend. Only for admins.
+    """
+    try:
+        return await UserRepository.get_customer_directory(
+            limit=limit,
+            cursor=cursor,
+            search=search,
+            cached_stats=cached_stats
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/cache-metrics", response_model=Dict[str, Any])
+async def get_cache_metrics(
+    current_user: Principal = Depends(get_current_admin)
+) -> Any:
+    """
+    Get per key-family cache hit/miss, stale, byte and Redis latency metrics
+    for this worker process. Only for admins.
+    """
+    return cache_metrics.snapshot()
+
+
+@router.delete("/cache-metrics", response_model=Dict[str, Any])
+async def reset_cache_metrics(
+    current_user: Principal = Depends(get_current_admin)
+) -> Any:
+    """
+    Reset cache metrics for this worker process. Only for admins.
+    """
+    cache_metrics.reset()
+    return {"message": "Cache metrics reset"}
+
+
+@router.get("/password-hash-metrics", response_model=Dict[str, Any])
+async def get_password_hash_metrics(
+    current_user: Principal = Depends(get_current_admin)
+) -> Any:
+    """
+    Get bcrypt executor queue and run times for this worker process. Only for admins.
+    """
+    return password_hasher.snapshot()
+
+
+@router.get("/http-client-metrics", response_model=Dict[str, Any])
+async def get_http_client_metrics(
+    current_user: Principal = Depends(get_current_admin)
+) -> Any:
+    """
+    Get per-host outbound request, retry and latency metrics for this worker
+    process. Only for admins.
+    """
+    return http_client.snapshot()
@@ -3,7 +3,8 @@ from typing import Any, List, Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 
-from app.api.dependencies import get_current_admin, get_current_user
+from app.api.dependencies import (get_current_admin, get_current_principal,
+                                  get_current_user, get_current_user_profile)
 from app.core.config import settings
 from app.models.pagination import PaginatedResponse, PaginationParams
 from app.models.product import (
@@ -16,9 +17,9 @@ from app.models.product import (
     OrderUpdate,
     OrderWithItems,
 )
-from app.models.user import User
+from app.models.user import Principal, User, UserProfile
 from app.repositories.order import OrderItemRepository, OrderRepository
-from app.repositories.user import UserRepository, UserRoleRepository
+from app.repositories.user import UserRepository
 from app.services.email import EmailService
 from app.services.premium_code_service import PremiumCodeService
 from app.utils.pagination import create_paginated_response
@@ -109,7 +110,7 @@ async def create_order(
             customer_address = order_in.shipping_address.address
             customer_city = order_in.shipping_address.city
               # Create payment request
-            payment_result = aamarpay_service.create_payment(
+            payment_result = await aamarpay_service.create_payment(
                 order_id=order_id,
                 amount=order_in.total_amount,
                 customer_name=customer_name or current_user.full_name or "Customer",
@@ -186,7 +187,7 @@ async def create_order(
 @router.post("/items", response_model=OrderItem)
 async def create_order_item(
     item_in: OrderItemCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: UserProfile = Depends(get_current_user_profile)
 ) -> Any:
     """
     Add an item to an order.
@@ -200,7 +201,7 @@ async def create_order_item(
         )
     
     # Check that the order belongs to the current user or user is admin
-    is_admin = await UserRoleRepository.is_admin(current_user.id)
+    is_admin = current_user.role == "admin"
     if order.user_id != current_user.id and not is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -213,7 +214,7 @@ async def create_order_item(
 async def update_order_item(
     item_id: str,
     item_update: OrderItemUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: UserProfile = Depends(get_current_user_profile)
 ) -> Any:
     """
     Update an order item (quantity, price).
@@ -235,7 +236,7 @@ async def update_order_item(
         )
     
     # Check that the order belongs to the current user or user is admin
-    is_admin = await UserRoleRepository.is_admin(current_user.id)
+    is_admin = current_user.role == "admin"
     if order.user_id != current_user.id and not is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -254,7 +255,7 @@ async def update_order_item(
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_order_item(
     item_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: UserProfile = Depends(get_current_user_profile)
 ):
     """
     Delete an order item.
@@ -276,7 +277,7 @@ async def delete_order_item(
         )
     
     # Check that the order belongs to the current user or user is admin
-    is_admin = await UserRoleRepository.is_admin(current_user.id)
+    is_admin = current_user.role == "admin"
     if order.user_id != current_user.id and not is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -343,7 +344,7 @@ async def read_orders(
 
 @router.get("/my-orders", response_model=List[OrderWithItems])
 async def read_my_orders(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Retrieve orders with items for the current user.
@@ -361,7 +362,7 @@ async def read_my_orders(
 @router.get("/{order_id}", response_model=OrderWithItems)
 async def read_order(
     order_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: UserProfile = Depends(get_current_user_profile)
 ) -> Any:
     """
     Get a specific order by ID.
@@ -374,7 +375,7 @@ async def read_order(
         )
     
     # Check that the order belongs to the current user or user is admin
-    is_admin = await UserRoleRepository.is_admin(current_user.id)
+    is_admin = current_user.role == "admin"
     if order.user_id != current_user.id and not is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -386,7 +387,7 @@ async def read_order(
 @router.get("/admin/{order_id}/details")
 async def admin_get_order_details(
     order_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Get detailed order information including premium code data (admin only).
@@ -405,7 +406,7 @@ async def update_order(
     order_id: str,
     order_in: OrderUpdate,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user)
+    current_user: UserProfile = Depends(get_current_user_profile)
 ) -> Any:
     """
     Update an order status (admin) or address details (owner).
@@ -418,7 +419,7 @@ async def update_order(
         )
     
     # Check permissions
-    is_admin = await UserRoleRepository.is_admin(current_user.id)
+    is_admin = current_user.role == "admin"
     is_owner = order.user_id == current_user.id
     
     if not is_owner and not is_admin:
@@ -459,7 +460,7 @@ async def admin_update_order(
     order_id: str,
     order_in: AdminOrderUpdate,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Admin-only order update with automatic premium code binding.
@@ -575,7 +576,7 @@ async def admin_update_order(
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_order(
     order_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """
     Delete an order. Only for admins.
@@ -603,12 +604,7 @@ async def track_order(
     This endpoint is designed for public tracking pages.
     Supports both full order IDs and partial IDs (last 8 characters).
     """
-    # First try full ID, then try partial ID search
-    order = await OrderRepository.get_with_items(order_id)
-    if not order:
-        # Try finding by partial ID (last 8 characters)
-        order = await OrderRepository.find_by_partial_id(order_id)
-    
+    order = await OrderRepository.find_for_tracking(order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -620,7 +616,7 @@ async def track_order(
 @router.get("/{order_id}/premium-codes")
 async def get_order_premium_codes(
     order_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: UserProfile = Depends(get_current_user_profile)
 ) -> Any:
     """
     Get premium codes distributed to a specific order.
@@ -633,7 +629,7 @@ async def get_order_premium_codes(
         )
     
     # Check that the order belongs to the current user or user is admin
-    is_admin = await UserRoleRepository.is_admin(current_user.id)
+    is_admin = current_user.role == "admin"
     if order.user_id != current_user.id and not is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
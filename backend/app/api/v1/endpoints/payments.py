@@ -4,8 +4,8 @@ from typing import Any, Dict
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
 
-from app.api.dependencies import get_current_user
-from app.models.user import User
+from app.api.dependencies import get_current_principal, get_current_user_profile
+from app.models.user import Principal, UserProfile
 from app.repositories.order import OrderRepository
 from app.services.aamarpay import aamarpay_service
 
@@ -146,7 +146,7 @@ async def aamarpay_cancel_callback(request: Request) -> Any:
 @router.post("/initiate")
 async def initiate_aamarpay_payment(
     order_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: UserProfile = Depends(get_current_user_profile)
 ) -> Dict[str, Any]:
     """
     Initiate AamarPay payment for an order
@@ -161,8 +161,7 @@ async def initiate_aamarpay_payment(
             )
         
         # Check if user owns this order or is admin
-        from app.repositories.user import UserRoleRepository
-        is_admin = await UserRoleRepository.is_admin(current_user.id)
+        is_admin = current_user.role == "admin"
         if order.user_id != current_user.id and not is_admin:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -182,7 +181,7 @@ async def initiate_aamarpay_payment(
         customer_address = order.shipping_address.address
         customer_city = order.shipping_address.city
         
-        payment_result = aamarpay_service.create_payment(
+        payment_result = await aamarpay_service.create_payment(
             order_id=order_id,
             amount=order.total_amount,
             customer_name=customer_name or current_user.full_name or "Customer",
@@ -218,13 +217,13 @@ async def initiate_aamarpay_payment(
 @router.get("/status/{transaction_id}")
 async def check_payment_status(
     transaction_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
     """
     Check AamarPay payment status
     """
     try:
-        status_result = aamarpay_service.check_payment_status(transaction_id)
+        status_result = await aamarpay_service.check_payment_status(transaction_id)
         return {
             "success": status_result.get("success", False),
             "data": status_result.get("data"),
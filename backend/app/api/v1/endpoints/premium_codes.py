@@ -1,12 +1,12 @@
 from typing import List
 
-from app.api.dependencies import get_current_admin, get_current_user
+from app.api.dependencies import get_current_admin, get_current_principal
 from app.core.config import settings
 from app.models.pagination import PaginatedResponse, PaginationParams
 from app.models.product import (PremiumCode, PremiumCodeBind,
                                 PremiumCodeCreate, PremiumCodeGenerate,
                                 PremiumCodeUpdate)
-from app.models.user import User
+from app.models.user import Principal
 from app.repositories.premium_code import PremiumCodeRepository
 from app.repositories.user import UserRepository
 from app.services.email import EmailService
@@ -20,7 +20,7 @@ router = APIRouter()
 @router.post("/", response_model=dict)
 async def create_premium_code(
     premium_code: PremiumCodeCreate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Create a single premium code."""
     try:
@@ -37,7 +37,7 @@ async def create_premium_code(
 @router.post("/generate", response_model=dict)
 async def generate_premium_codes(
     generate_request: PremiumCodeGenerate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Generate multiple premium codes."""
     try:
@@ -70,7 +70,7 @@ async def get_premium_codes(
     pagination: PaginationParams = Depends(),
     active_only: bool = Query(False, description="Filter only active codes"),
     bound_only: bool = Query(False, description="Filter only bound codes"),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Get all premium codes with pagination and optional filtering."""
     try:
@@ -100,7 +100,7 @@ async def get_premium_codes(
 
 @router.get("/stats", response_model=dict)
 async def get_premium_code_stats(
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Get premium code statistics."""
     try:
@@ -123,7 +123,7 @@ async def get_premium_code_stats(
 
 @router.get("/my-codes", response_model=List[PremiumCode])
 async def get_my_premium_codes(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get premium codes bound to the current user."""
     try:
@@ -139,7 +139,7 @@ async def get_my_premium_codes(
 @router.get("/{code_id}", response_model=PremiumCode)
 async def get_premium_code(
     code_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Get a premium code by ID."""
     try:
@@ -164,7 +164,7 @@ async def bind_premium_code(
     code_id: str,
     bind_request: PremiumCodeBind,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Bind a premium code to a user."""
     try:
@@ -231,7 +231,7 @@ async def bind_premium_code(
 @router.post("/{code_id}/unbind", response_model=PremiumCode)
 async def unbind_premium_code(
     code_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Unbind a premium code from a user."""
     try:
@@ -269,7 +269,7 @@ async def unbind_premium_code(
 async def update_premium_code(
     code_id: str,
     code_update: PremiumCodeUpdate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Update a premium code."""
     try:
@@ -300,7 +300,7 @@ async def update_premium_code(
 @router.delete("/{code_id}", response_model=dict)
 async def delete_premium_code(
     code_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Delete a premium code."""
     try:
@@ -331,7 +331,7 @@ async def delete_premium_code(
 @router.post("/use/{code}", response_model=dict)
 async def use_premium_code(
     code: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Use a premium code."""
     try:
@@ -355,7 +355,7 @@ async def use_premium_code(
 @router.get("/validate/{code}", response_model=dict)
 async def validate_premium_code(
     code: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Validate a premium code without using it."""
     try:
@@ -5,7 +5,7 @@ from app.api.dependencies import get_current_admin
 from app.config.cloudinary import CloudinaryService
 from app.models.pagination import PaginatedResponse, PaginationParams
 from app.models.product import Product, ProductCreate, ProductUpdate
-from app.models.user import User
+from app.models.user import Principal
 from app.repositories.product import ProductRepository
 from app.utils.pagination import create_paginated_response
 from app.utils.timing import profile_operation
@@ -16,7 +16,7 @@ router = APIRouter()
 @router.post("/", response_model=Product, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_in: ProductCreate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Create a new product. Only for admins.
@@ -27,7 +27,7 @@ async def create_product(
 @router.post("/upload-image")
 async def upload_product_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> dict:
     """
     Upload a product image to Cloudinary. Only for admins.
@@ -130,7 +130,7 @@ async def read_product(
 async def update_product(
     product_id: str,
     product_in: ProductUpdate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Update a product. Only for admins.
@@ -148,7 +148,7 @@ async def update_product(
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     product_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """
     Delete a product. Only for admins.
@@ -4,7 +4,7 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_principal, get_current_user
 from app.models.quiz import QuestionType
 from app.models.quiz_score import (
     DailyScoreUpdate,
@@ -21,7 +21,7 @@ from app.models.quiz_session import (
     QuizSessionStatus,
     QuizSessionUpdate,
 )
-from app.models.user import User
+from app.models.user import Principal, User
 from app.repositories.quiz_question import QuestionRepository
 from app.repositories.quiz_score import DailyScoreRepository, UserQuizScoreRepository
 from app.repositories.quiz_session import QuizSessionRepository
@@ -43,7 +43,7 @@ class QuizSubmissionRequest(BaseModel):
 @router.post("/start-session", response_model=QuizSessionResponse)
 async def start_quiz_session(
     request: QuizSessionStartRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Start a new quiz session or resume an active one.
@@ -74,7 +74,7 @@ async def start_quiz_session(
         )
     
     # Create new session
-    question_ids = [q['id'] if isinstance(q, dict) else q.id for q in questions]
+    question_ids = [q.id for q in questions]
     session_create = QuizSessionCreate(
         user_id=current_user.id,
         question_ids=question_ids
@@ -89,7 +89,7 @@ async def start_quiz_session(
 @router.get("/session/{session_id}/question", response_model=dict)
 async def get_current_question(
     session_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get the current question for an active quiz session.
@@ -101,22 +101,22 @@ async def get_current_question(
             detail="Quiz session not found"
         )
     
-    user_id = session['user_id'] if isinstance(session, dict) else session.user_id
+    user_id = session.user_id
     if user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this quiz session"
         )
 
-    status_val = session['status'] if isinstance(session, dict) else session.status
+    status_val = session.status
     if status_val != QuizSessionStatus.ACTIVE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Quiz session is not active"
         )
 
-    current_question_index = session['current_question_index'] if isinstance(session, dict) else session.current_question_index
-    question_ids = session['question_ids'] if isinstance(session, dict) else session.question_ids
+    current_question_index = session.current_question_index
+    question_ids = session.question_ids
     if current_question_index >= len(question_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -170,7 +170,7 @@ async def get_current_question(
 @router.post("/session/answer", response_model=dict)
 async def submit_session_answer(
     request: QuizSessionAnswerRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Submit an answer for the current question in a quiz session.
@@ -182,14 +182,14 @@ async def submit_session_answer(
             detail="Quiz session not found"
         )
     
-    user_id = session['user_id'] if isinstance(session, dict) else session.user_id
+    user_id = session.user_id
     if user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this quiz session"
         )
     
-    status_val = session['status'] if isinstance(session, dict) else session.status
+    status_val = session.status
     if status_val != QuizSessionStatus.ACTIVE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -197,8 +197,8 @@ async def submit_session_answer(
         )
     
     # Verify question is current
-    current_question_index = session['current_question_index'] if isinstance(session, dict) else session.current_question_index
-    question_ids = session['question_ids'] if isinstance(session, dict) else session.question_ids
+    current_question_index = session.current_question_index
+    question_ids = session.question_ids
     if current_question_index >= len(question_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -222,7 +222,7 @@ async def submit_session_answer(
     
     # Find correct answer
     correct_option = None
-    db_options = question['options'] if isinstance(question, dict) else question.options
+    db_options = question.options
     
     # Debug logging
     import logging
@@ -230,7 +230,7 @@ async def submit_session_answer(
     logging.warning(f"[DEBUG] question type: {type(question)}")
     
     for option in db_options or []:
-        is_correct = option['is_correct'] if isinstance(option, dict) else option.is_correct
+        is_correct = option.is_correct
         logging.warning(f"[DEBUG] option: {option}, is_correct: {is_correct}")
         if is_correct:
             correct_option = option
@@ -242,7 +242,7 @@ async def submit_session_answer(
             detail="Question has no correct answer"
         )
     
-    correct_option_id = correct_option['id'] if isinstance(correct_option, dict) else correct_option.id
+    correct_option_id = correct_option.id
     is_correct = request.selected_option_id == correct_option_id
     
     # Create answer record
@@ -254,9 +254,9 @@ async def submit_session_answer(
     )
     
     # Update session with answer and move to next question
-    session_answers = session['answers'] if isinstance(session, dict) else session.answers
-    session_current_index = session['current_question_index'] if isinstance(session, dict) else session.current_question_index
-    session_question_ids = session['question_ids'] if isinstance(session, dict) else session.question_ids
+    session_answers = session.answers
+    session_current_index = session.current_question_index
+    session_question_ids = session.question_ids
     
     updated_answers = session_answers + [answer]
     new_question_index = session_current_index + 1
@@ -296,14 +296,14 @@ async def complete_quiz_session(
             detail="Quiz session not found"
         )
     
-    user_id = session['user_id'] if isinstance(session, dict) else session.user_id
+    user_id = session.user_id
     if user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this quiz session"
         )
     
-    status_val = session['status'] if isinstance(session, dict) else session.status
+    status_val = session.status
     if status_val != QuizSessionStatus.ACTIVE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -311,9 +311,9 @@ async def complete_quiz_session(
         )
     
     # Verify all questions are answered
-    session_answers = session['answers'] if isinstance(session, dict) else session.answers
-    session_question_ids = session['question_ids'] if isinstance(session, dict) else session.question_ids
-    session_started_at = session['started_at'] if isinstance(session, dict) else session.started_at
+    session_answers = session.answers
+    session_question_ids = session.question_ids
+    session_started_at = session.started_at
     
     if len(session_answers) < len(session_question_ids):
         raise HTTPException(
@@ -353,9 +353,9 @@ async def complete_quiz_session(
         )
     
     # Get current user stats
-    user_total_answered = user_score['total_answered'] if isinstance(user_score, dict) else user_score.total_answered
-    user_correct_answers = user_score['correct_answers'] if isinstance(user_score, dict) else user_score.correct_answers
-    user_current_score = user_score['score'] if isinstance(user_score, dict) else user_score.score
+    user_total_answered = user_score.total_answered
+    user_correct_answers = user_score.correct_answers
+    user_current_score = user_score.score
     
     # Update user quiz score
     await UserQuizScoreRepository.upsert(
@@ -376,7 +376,7 @@ async def complete_quiz_session(
         new_daily_score = total_score_earned
         new_daily_streak = max_streak
     else:
-        daily_score_current = daily_score['daily_score'] if isinstance(daily_score, dict) else daily_score.daily_score
+        daily_score_current = daily_score.daily_score
         new_daily_score = daily_score_current + total_score_earned
         new_daily_streak = max_streak  # Session streak becomes daily streak
     
@@ -417,7 +417,7 @@ async def complete_quiz_session(
 
 @router.get("/session/status", response_model=dict)
 async def get_quiz_session_status(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get current quiz session status for the user.
@@ -431,16 +431,16 @@ async def get_quiz_session_status(
     return {
         "has_completed_today": has_completed_today,
         "has_active_session": active_session is not None,
-        "active_session_id": active_session['id'] if active_session and isinstance(active_session, dict) else active_session.id if active_session else None,
-        "current_question_index": active_session['current_question_index'] if active_session and isinstance(active_session, dict) else active_session.current_question_index if active_session else None,
-        "total_questions": len(active_session['question_ids']) if active_session and isinstance(active_session, dict) else len(active_session.question_ids) if active_session else None
+        "active_session_id": active_session.id if active_session else None,
+        "current_question_index": active_session.current_question_index if active_session else None,
+        "total_questions": len(active_session.question_ids) if active_session else None
     }
 
 
 @router.get("/reaction-questions", response_model=list)
 async def get_reaction_questions(
     count: int = 10,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get multiple random multiple choice questions for reaction game.
@@ -461,8 +461,7 @@ async def get_reaction_questions(
     result_questions = []
     
     for question in questions:
-        # Use bracket notation for dicts
-        options = question['options'] if isinstance(question, dict) else question.options
+        options = question.options
         if not options:
             continue  # Skip questions without options
         
@@ -470,14 +469,14 @@ async def get_reaction_questions(
         user_safe_options = convert_options_for_reaction_game(shuffled_options)
 
         result_questions.append({
-            "id": question['id'] if isinstance(question, dict) else question.id,
-            "topic_id": question['topic_id'] if isinstance(question, dict) else question.topic_id,
-            "title": question['title'] if isinstance(question, dict) else question.title,
-            "image_url": question.get('image_url') if isinstance(question, dict) else question.image_url,
-            "difficulty": question['difficulty'] if isinstance(question, dict) else question.difficulty,
-            "question_type": question['question_type'] if isinstance(question, dict) else question.question_type,
+            "id": question.id,
+            "topic_id": question.topic_id,
+            "title": question.title,
+            "image_url": question.image_url,
+            "difficulty": question.difficulty,
+            "question_type": question.question_type,
             "options": user_safe_options,
-            "topic_name": question.get('topic_name') if isinstance(question, dict) else question.topic_name
+            "topic_name": question.topic_name
         })
     
     return result_questions
@@ -485,7 +484,7 @@ async def get_reaction_questions(
 
 @router.get("/reaction-question", response_model=dict)
 async def get_reaction_question(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get a random multiple choice question for reaction game.
@@ -505,8 +504,7 @@ async def get_reaction_question(
     
     question = questions[0]
     
-    # Use bracket notation for dicts
-    options = question['options'] if isinstance(question, dict) else question.options
+    options = question.options
     if not options:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -517,14 +515,14 @@ async def get_reaction_question(
     user_safe_options = convert_options_for_reaction_game(shuffled_options)
 
     return {
-        "id": question['id'] if isinstance(question, dict) else question.id,
-        "topic_id": question['topic_id'] if isinstance(question, dict) else question.topic_id,
-        "title": question['title'] if isinstance(question, dict) else question.title,
-        "image_url": question.get('image_url') if isinstance(question, dict) else question.image_url,
-        "difficulty": question['difficulty'] if isinstance(question, dict) else question.difficulty,
-        "question_type": question['question_type'] if isinstance(question, dict) else question.question_type,
+        "id": question.id,
+        "topic_id": question.topic_id,
+        "title": question.title,
+        "image_url": question.image_url,
+        "difficulty": question.difficulty,
+        "question_type": question.question_type,
         "options": user_safe_options,
-        "topic_name": question.get('topic_name') if isinstance(question, dict) else question.topic_name
+        "topic_name": question.topic_name
     }
 
 
@@ -549,11 +547,10 @@ async def submit_quiz_answer(
     correct_option = None
     selected_option = None
     
-    # Use bracket notation for dicts
-    db_options = db_question['options'] if isinstance(db_question, dict) else db_question.options
+    db_options = db_question.options
     for option in db_options or []:
-        is_correct = option['is_correct'] if isinstance(option, dict) else option.is_correct
-        option_id = option['id'] if isinstance(option, dict) else option.id
+        is_correct = option.is_correct
+        option_id = option.id
         
         if is_correct:
             correct_option = option
@@ -573,7 +570,7 @@ async def submit_quiz_answer(
         )
     
     # Check if answer is correct
-    correct_option_id = correct_option['id'] if isinstance(correct_option, dict) else correct_option.id
+    correct_option_id = correct_option.id
     is_correct = request.selected_option_id == correct_option_id
     
     # Get current user scores
@@ -586,10 +583,10 @@ async def submit_quiz_answer(
         )
     
     # Calculate new scores
-    user_total_answered = user_score['total_answered'] if isinstance(user_score, dict) else user_score.total_answered
-    user_correct_answers = user_score['correct_answers'] if isinstance(user_score, dict) else user_score.correct_answers
-    user_streak = user_score['streak'] if isinstance(user_score, dict) else user_score.streak
-    user_current_score = user_score['score'] if isinstance(user_score, dict) else user_score.score
+    user_total_answered = user_score.total_answered
+    user_correct_answers = user_score.correct_answers
+    user_streak = user_score.streak
+    user_current_score = user_score.score
     
     new_total_answered = user_total_answered + 1
     new_correct_answers = user_correct_answers + (1 if is_correct else 0)
@@ -624,10 +621,10 @@ async def submit_quiz_answer(
         new_questions_answered = 1
         new_daily_correct = 1 if is_correct else 0
     else:
-        daily_questions_answered = daily_score['questions_answered'] if isinstance(daily_score, dict) else daily_score.questions_answered
-        daily_correct_answers = daily_score['correct_answers'] if isinstance(daily_score, dict) else daily_score.correct_answers
-        daily_streak_current = daily_score['daily_streak'] if isinstance(daily_score, dict) else daily_score.daily_streak
-        daily_score_current = daily_score['daily_score'] if isinstance(daily_score, dict) else daily_score.daily_score
+        daily_questions_answered = daily_score.questions_answered
+        daily_correct_answers = daily_score.correct_answers
+        daily_streak_current = daily_score.daily_streak
+        daily_score_current = daily_score.daily_score
         
         new_questions_answered = daily_questions_answered + 1
         new_daily_correct = daily_correct_answers + (1 if is_correct else 0)
@@ -658,8 +655,8 @@ async def submit_quiz_answer(
         is_correct=is_correct,
         correct_option_id=correct_option_id,
         explanation=None,  # Could be added later
-        score=updated_user_score['score'] if isinstance(updated_user_score, dict) else updated_user_score.score,
-        streak=updated_user_score['streak'] if isinstance(updated_user_score, dict) else updated_user_score.streak,
-        daily_score=updated_daily_score['daily_score'] if isinstance(updated_daily_score, dict) else updated_daily_score.daily_score,
-        daily_streak=updated_daily_score['daily_streak'] if isinstance(updated_daily_score, dict) else updated_daily_score.daily_streak
+        score=updated_user_score.score,
+        streak=updated_user_score.streak,
+        daily_score=updated_daily_score.daily_score,
+        daily_streak=updated_daily_score.daily_streak
     )
\ No newline at end of file
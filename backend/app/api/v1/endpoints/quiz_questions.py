@@ -2,7 +2,7 @@ from typing import Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.api.dependencies import get_current_admin, get_current_user
+from app.api.dependencies import get_current_admin, get_current_principal
 from app.models.pagination import PaginatedResponse, PaginationParams
 from app.models.quiz import (
     DifficultyLevel,
@@ -12,7 +12,7 @@ from app.models.quiz import (
     QuestionType,
     QuestionUpdate,
 )
-from app.models.user import User
+from app.models.user import Principal
 from app.repositories.quiz_question import QuestionRepository
 from app.repositories.quiz_topic import TopicRepository
 from app.utils.pagination import create_paginated_response
@@ -23,7 +23,7 @@ router = APIRouter()
 @router.post("/", response_model=Question, status_code=status.HTTP_201_CREATED)
 async def create_question(
     question_in: QuestionCreate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Create a new quiz question. Only for admins.
@@ -67,7 +67,7 @@ async def get_questions(
     question_type: Optional[QuestionType] = Query(None, description="Filter by question type"),
     active_only: bool = Query(True, description="Filter only active questions"),
     search: Optional[str] = Query(None, description="Search questions by title"),
-    current_user: User = Depends(get_current_admin)  # Only admins can see all questions
+    current_user: Principal = Depends(get_current_admin)  # Only admins can see all questions
 ) -> Any:
     """
     Get all quiz questions with pagination and filtering. Only for admins.
@@ -104,7 +104,7 @@ async def get_questions_for_users(
     topic_id: Optional[str] = Query(None, description="Filter by topic ID"),
     difficulty: Optional[DifficultyLevel] = Query(None, description="Filter by difficulty"),
     question_type: Optional[QuestionType] = Query(None, description="Filter by question type"),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get quiz questions for regular users (without correct answers).
@@ -145,7 +145,7 @@ async def get_random_questions(
     limit: int = Query(10, ge=1, le=50, description="Number of random questions"),
     topic_id: Optional[str] = Query(None, description="Filter by topic ID"),
     difficulty: Optional[DifficultyLevel] = Query(None, description="Filter by difficulty"),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get random questions for quiz (without correct answers).
@@ -170,7 +170,7 @@ async def get_random_questions(
 @router.get("/{question_id}", response_model=Question)
 async def get_question(
     question_id: str,
-    current_user: User = Depends(get_current_admin)  # Only admins can see full question details
+    current_user: Principal = Depends(get_current_admin)  # Only admins can see full question details
 ) -> Any:
     """
     Get a specific quiz question by ID. Only for admins.
@@ -187,7 +187,7 @@ async def get_question(
 @router.get("/{question_id}/public", response_model=QuestionForUser)
 async def get_question_for_user(
     question_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get a specific quiz question for regular users (without correct answers).
@@ -205,7 +205,7 @@ async def get_question_for_user(
 async def update_question(
     question_id: str,
     question_update: QuestionUpdate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Update a quiz question. Only for admins.
@@ -263,7 +263,7 @@ async def update_question(
 @router.delete("/{question_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_question(
     question_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> None:
     """
     Delete a quiz question and its options. Only for admins.
@@ -2,9 +2,9 @@ from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from app.api.dependencies import get_current_admin, get_current_user
+from app.api.dependencies import get_current_admin, get_current_principal
 from app.models.quiz import QuizStatsResponse, TopicStatsResponse
-from app.models.user import User
+from app.models.user import Principal
 from app.repositories.quiz_stats import QuizStatsRepository
 
 router = APIRouter()
@@ -12,7 +12,7 @@ router = APIRouter()
 
 @router.get("/", response_model=QuizStatsResponse)
 async def get_quiz_stats(
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Get overall quiz statistics. Only for admins.
@@ -29,7 +29,7 @@ async def get_quiz_stats(
 
 @router.get("/topics", response_model=List[TopicStatsResponse])
 async def get_topics_stats(
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Get statistics for all topics. Only for admins.
@@ -47,7 +47,7 @@ async def get_topics_stats(
 @router.get("/topics/{topic_id}", response_model=TopicStatsResponse)
 async def get_topic_stats(
     topic_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Get statistics for a specific topic. Only for admins.
@@ -69,7 +69,7 @@ async def get_topic_stats(
 
 @router.get("/summary", response_model=dict)
 async def get_quiz_summary(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get a summary of quiz data for regular users.
@@ -2,10 +2,10 @@ from typing import Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.api.dependencies import get_current_admin, get_current_user
+from app.api.dependencies import get_current_admin, get_current_principal
 from app.models.pagination import PaginatedResponse, PaginationParams
 from app.models.quiz import Topic, TopicCreate, TopicUpdate
-from app.models.user import User
+from app.models.user import Principal
 from app.repositories.quiz_topic import TopicRepository
 from app.utils.pagination import create_paginated_response
 
@@ -15,7 +15,7 @@ router = APIRouter()
 @router.post("/", response_model=Topic, status_code=status.HTTP_201_CREATED)
 async def create_topic(
     topic_in: TopicCreate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Create a new quiz topic. Only for admins.
@@ -37,7 +37,7 @@ async def get_topics(
     pagination: PaginationParams = Depends(),
     active_only: bool = Query(True, description="Filter only active topics"),
     search: Optional[str] = Query(None, description="Search topics by name"),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get all quiz topics with pagination and optional filtering.
@@ -65,7 +65,7 @@ async def get_topics(
 @router.get("/{topic_id}", response_model=Topic)
 async def get_topic(
     topic_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get a specific quiz topic by ID.
@@ -83,7 +83,7 @@ async def get_topic(
 async def update_topic(
     topic_id: str,
     topic_update: TopicUpdate,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> Any:
     """
     Update a quiz topic. Only for admins.
@@ -118,7 +118,7 @@ async def update_topic(
 @router.delete("/{topic_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_topic(
     topic_id: str,
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ) -> None:
     """
     Delete a quiz topic. Only for admins.
@@ -143,7 +143,7 @@ async def delete_topic(
 @router.get("/{topic_id}/questions-count")
 async def get_topic_questions_count(
     topic_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get the number of questions in a topic.
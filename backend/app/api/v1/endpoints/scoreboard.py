@@ -2,9 +2,9 @@ from typing import Any
 
 from fastapi import APIRouter, Depends
 
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_principal
 from app.models.quiz_score import DailyLeaderboardEntry, DailyLeaderboardResponse
-from app.models.user import User
+from app.models.user import Principal
 from app.repositories.quiz_score import DailyScoreRepository
 from app.utils.quiz_game import get_today_date
 
@@ -13,7 +13,7 @@ router = APIRouter()
 
 @router.get("/daily", response_model=DailyLeaderboardResponse)
 async def get_daily_scoreboard(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> Any:
     """
     Get today's top 3 users from daily scoreboard.
@@ -5,7 +5,7 @@ from app.db.mongodb import get_database
 from app.models.settings import (DeliveryChargesResponse,
                                  EnabledPaymentMethods, PaymentSettings,
                                  PaymentSettingsUpdate)
-from app.models.user import User
+from app.models.user import Principal
 from app.repositories.payment_settings import PaymentSettingsRepository
 from fastapi import APIRouter, Depends, HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
@@ -26,7 +26,7 @@ async def get_enabled_payment_methods(
 
 @router.get("/payment-settings", response_model=PaymentSettings)
 async def get_payment_settings(
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db = Depends(get_database)
 ):
     """
@@ -47,7 +47,7 @@ async def get_payment_settings(
 @router.put("/payment-settings", response_model=PaymentSettings)
 async def update_payment_settings(
     settings_update: PaymentSettingsUpdate,
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db = Depends(get_database)
 ):
     """
@@ -78,7 +78,7 @@ async def update_payment_settings(
 async def toggle_payment_method(
     method_name: str,
     enabled: bool,
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db = Depends(get_database)
 ):
     """
@@ -135,7 +135,7 @@ async def get_delivery_charges(
 async def update_delivery_charges(
     inside_dhaka: float,
     outside_dhaka: float,
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
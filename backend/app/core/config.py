@@ -29,16 +29,59 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str = os.getenv("REDIS_PASSWORD", "")
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     REDIS_POOL_MAX_CONNECTIONS: int = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", "20"))
+    REDIS_MODE: str = os.getenv("REDIS_MODE", "standalone")  # standalone, sentinel or cluster
+    REDIS_SENTINELS: str = os.getenv("REDIS_SENTINELS", "")  # Comma-separated host:port list
+    REDIS_SENTINEL_MASTER: str = os.getenv("REDIS_SENTINEL_MASTER", "mymaster")
+    REDIS_SENTINEL_PASSWORD: str = os.getenv("REDIS_SENTINEL_PASSWORD", "")
+    REDIS_READ_FROM_REPLICAS: bool = os.getenv("REDIS_READ_FROM_REPLICAS", "false").lower() == "true"  # Lag-tolerant cache reads only
+    REDIS_REPLICA_URL: str = os.getenv("REDIS_REPLICA_URL", "")  # Standalone mode replica for lag-tolerant reads
+    REDIS_HEALTH_CHECK_INTERVAL: float = float(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "5"))  # Seconds between background PINGs
+    REDIS_HEALTH_CHECK_TIMEOUT: float = float(os.getenv("REDIS_HEALTH_CHECK_TIMEOUT", "2"))
+    REDIS_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("REDIS_CIRCUIT_FAILURE_THRESHOLD", "5"))  # Consecutive failures before tripping
+    REDIS_CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("REDIS_CIRCUIT_RESET_TIMEOUT", "10"))  # Seconds before a half-open probe
     CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "300"))  # 5 minutes default
     CACHE_TTL_PRODUCTS: int = int(os.getenv("CACHE_TTL_PRODUCTS", "600"))  # 10 minutes for products
     CACHE_TTL_USER_SESSIONS: int = int(os.getenv("CACHE_TTL_USER_SESSIONS", "3600"))  # 1 hour for sessions
-    
+    SESSION_TOUCH_INTERVAL: int = int(os.getenv("SESSION_TOUCH_INTERVAL", "60"))  # Refresh a session's last activity at most this often
+
+    # In-process (L1) cache in front of Redis, for near-static key families only
+    CACHE_L1_ENABLED: bool = os.getenv("CACHE_L1_ENABLED", "true").lower() == "true"
+    CACHE_L1_MAX_ENTRIES: int = int(os.getenv("CACHE_L1_MAX_ENTRIES", "2048"))
+    CACHE_L1_TTL_SECONDS: int = int(os.getenv("CACHE_L1_TTL_SECONDS", "30"))
+    CACHE_L1_PREFIXES: str = os.getenv("CACHE_L1_PREFIXES", "product:,products:,quiz_topic:,payment_settings:")  # Comma-separated
+    CACHE_INVALIDATION_CHANNEL: str = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+    CACHE_LOCK_TIMEOUT: int = int(os.getenv("CACHE_LOCK_TIMEOUT", "10"))  # Seconds a cached(lock=True) recompute may hold its lock
+    CACHE_GENERATION_LOCAL_TTL: int = int(os.getenv("CACHE_GENERATION_LOCAL_TTL", "5"))  # Seconds a worker trusts its namespace generations
+    CACHE_CODEC: str = os.getenv("CACHE_CODEC", "msgpack")  # msgpack, orjson or json
+    CACHE_COMPRESSION_THRESHOLD: int = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", "4096"))  # Bytes; 0 disables compression
+    CACHE_METRICS_ENABLED: bool = os.getenv("CACHE_METRICS_ENABLED", "true").lower() == "true"
+    CACHE_NEGATIVE_TTL: int = int(os.getenv("CACHE_NEGATIVE_TTL", "30"))  # Seconds a not-found tombstone is kept
+
+    # Cache warm-up after deploys (startup and `python redis_utils.py warm`)
+    CACHE_WARM_ON_STARTUP: bool = os.getenv("CACHE_WARM_ON_STARTUP", "true").lower() == "true"
+    CACHE_WARM_FAMILIES: str = os.getenv("CACHE_WARM_FAMILIES", "products,product_categories,quiz_topics,payment_settings,quiz_stats,dashboard")  # Comma-separated
+    CACHE_WARM_CONCURRENCY: int = int(os.getenv("CACHE_WARM_CONCURRENCY", "4"))
+    CACHE_WARM_PAGES: int = int(os.getenv("CACHE_WARM_PAGES", "1"))  # List pages to preload per filter
+    CACHE_WARM_TIMEOUT: float = float(os.getenv("CACHE_WARM_TIMEOUT", "30"))  # Seconds startup waits for the warm-up
+
+    # Rate limiting: per-worker token buckets in front of the shared Redis windows
+    RATE_LIMIT_LOCAL_ENABLED: bool = os.getenv("RATE_LIMIT_LOCAL_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_LOCAL_SHARE: float = float(os.getenv("RATE_LIMIT_LOCAL_SHARE", "0.1"))  # Fraction of the remaining global quota a worker may spend between syncs
+    RATE_LIMIT_SYNC_INTERVAL: float = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", "1"))  # Seconds between pushes of locally consumed tokens to Redis
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "10000"))  # Buckets kept per worker
+    RATE_LIMIT_ROLE_TIERS: str = os.getenv("RATE_LIMIT_ROLE_TIERS", "anonymous:1,customer:2,admin:10")  # role:multiplier of the default limits
+
     # Authentication
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your_very_secure_secret_key_here_change_for_production")
     REFRESH_TOKEN_SECRET_KEY: str = os.getenv("REFRESH_TOKEN_SECRET_KEY", "your_refresh_token_secret_key_change_for_production")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    REFRESH_TOKEN_ROTATION_GRACE: int = int(os.getenv("REFRESH_TOKEN_ROTATION_GRACE", "30"))  # Seconds a rotated refresh token still works
+    REFRESH_TOKEN_AUDIT_ENABLED: bool = os.getenv("REFRESH_TOKEN_AUDIT_ENABLED", "false").lower() == "true"  # Record token hashes in Mongo
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Changing this rehashes passwords at next login
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))  # Concurrent bcrypt operations per worker process
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))  # Verified access tokens kept per worker
     
     # Email Configuration
     MAIL_USERNAME: str = os.getenv("MAIL_USERNAME", "")
@@ -62,6 +105,16 @@ class Settings(BaseSettings):
     AAMARPAY_SANDBOX: bool = os.getenv("AAMARPAY_SANDBOX", "true").lower() == "true"
     AAMARPAY_STORE_ID: str = os.getenv("AAMARPAY_STORE_ID", "aamarpaytest")
     AAMARPAY_SIGNATURE_KEY: str = os.getenv("AAMARPAY_SIGNATURE_KEY", "dbb74894e82415a2f7ff0ec3a97e4183")
+
+    # Outbound HTTP (payment gateway, Firebase REST)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # Seconds an idle connection is kept
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+    HTTP_TOTAL_TIMEOUT: float = float(os.getenv("HTTP_TOTAL_TIMEOUT", "30"))  # Budget for a request including retries
+    HTTP_RETRIES: int = int(os.getenv("HTTP_RETRIES", "2"))
+    HTTP_RETRY_BACKOFF: float = float(os.getenv("HTTP_RETRY_BACKOFF", "0.2"))  # Base of the jittered exponential backoff
       # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
         "http://localhost:5173",
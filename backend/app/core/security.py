@@ -1,35 +1,164 @@
+import asyncio
+import hashlib
 import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar, Union
 
 from app.core.config import settings
-from jose import jwt
+from app.models.user import UserProfile
+from app.services.local_cache import LocalCache
+from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are flagged by verify_and_update, so they get rehashed
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+T = TypeVar("T")
+
+# Verified access token payloads, kept until the token expires
+_verified_tokens = LocalCache(
+    max_entries=settings.AUTH_TOKEN_CACHE_SIZE,
+    default_ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    profile: Optional[UserProfile] = None,
+    profile_version: int = 0
+) -> str:
+    """
+    Create an access token. With a profile, the token also carries the user's
+    role and profile version, so roles can be checked without loading the user.
+    Other profile fields stay out of the token: anyone holding it can read them.
+    """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"exp": expire, "sub": str(subject), "token_type": "access_token"}
+    to_encode = {}
+    if profile is not None:
+        to_encode["role"] = profile.role
+        to_encode["pv"] = profile_version
+    to_encode.update({"exp": expire, "sub": str(subject), "token_type": "access_token"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify an access token and return its payload, or None if it is invalid,
+    expired or not an access token. Verified payloads are cached per worker.
+    """
+    payload = _verified_tokens.get(token)
+    if payload is not None:
+        return payload
+    
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("token_type") != "access_token":
+        return None
+    
+    remaining = int(payload.get("exp", 0) - time.time())
+    if remaining > 0:
+        _verified_tokens.set(token, payload, ttl=remaining)
+    return payload
+
 def create_refresh_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode = {"exp": expire, "sub": str(subject), "token_type": "refresh_token"}
+    # jti keeps tokens unique, so a rotated token never collides with its predecessor
+    to_encode = {"exp": expire, "sub": str(subject), "token_type": "refresh_token", "jti": secrets.token_hex(8)}
     encoded_jwt = jwt.encode(to_encode, settings.REFRESH_TOKEN_SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def token_hash(token: str) -> str:
+    """SHA-256 of a token, used to key stored and blacklisted tokens without keeping them."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool so hashing never blocks the
+    event loop. The pool size caps concurrent bcrypt work; queue time (waiting
+    for a free thread) and run time are tracked per worker process.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.reset_metrics()
+
+    def reset_metrics(self) -> None:
+        self.calls = 0
+        self.pending = 0
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.run_seconds = 0.0
+        self.rehashes = 0
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        submitted = time.perf_counter()
+        started = submitted
+
+        def timed() -> T:
+            nonlocal started
+            started = time.perf_counter()
+            return func(*args)
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            finished = time.perf_counter()
+            self.pending -= 1
+            self.calls += 1
+            queued = started - submitted
+            self.queue_seconds += queued
+            self.max_queue_seconds = max(self.max_queue_seconds, queued)
+            self.run_seconds += finished - started
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password. If it matches but the hash uses an outdated cost,
+        also return a new hash to store in its place.
+        """
+        verified, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        if new_hash:
+            self.rehashes += 1
+        return verified, new_hash
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "rounds": settings.BCRYPT_ROUNDS,
+            "calls": self.calls,
+            "pending": self.pending,
+            "avg_queue_ms": round(self.queue_seconds * 1000 / self.calls, 3) if self.calls else None,
+            "max_queue_ms": round(self.max_queue_seconds * 1000, 3),
+            "avg_run_ms": round(self.run_seconds * 1000 / self.calls, 3) if self.calls else None,
+            "rehashes": self.rehashes,
+        }
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS)
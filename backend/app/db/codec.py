@@ -0,0 +1,175 @@
+"""
+Binary codecs for values stored in the cache.
+
+Every encoded value starts with a two byte header: a NUL marker (which a
+legacy JSON value never starts with) followed by a flags byte holding the
+codec id and a compression bit. Values written before codecs existed are
+still readable as plain JSON or text.
+"""
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional speedup
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+HEADER_MARKER = 0x00
+COMPRESSED_FLAG = 0x80
+CODEC_ID_MASK = 0x7F
+
+# msgpack extension type codes
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_DECIMAL = 3
+
+
+class Codec:
+    """Serializes cache values to bytes and back."""
+
+    codec_id: int = 0
+    name: str = ""
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JSONCodec(Codec):
+    """Standard library JSON, used when no faster codec is installed."""
+
+    codec_id = 1
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    """orjson: fast JSON, datetimes become ISO strings."""
+
+    codec_id = 2
+    name = "orjson"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return msgpack.ExtType(EXT_DATETIME, value.isoformat().encode())
+    if isinstance(value, date):
+        return msgpack.ExtType(EXT_DATE, value.isoformat().encode())
+    if isinstance(value, Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(value).encode())
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == EXT_DATE:
+        return date.fromisoformat(data.decode())
+    if code == EXT_DECIMAL:
+        return Decimal(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+class MsgpackCodec(Codec):
+    """msgpack with extension types, so datetimes and decimals round-trip as-is."""
+
+    codec_id = 3
+    name = "msgpack"
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+
+CODECS: Dict[int, Codec] = {JSONCodec.codec_id: JSONCodec()}
+if orjson is not None:
+    CODECS[OrjsonCodec.codec_id] = OrjsonCodec()
+if msgpack is not None:
+    CODECS[MsgpackCodec.codec_id] = MsgpackCodec()
+
+CODECS_BY_NAME: Dict[str, Codec] = {codec.name: codec for codec in CODECS.values()}
+
+
+def get_codec(name: str) -> Codec:
+    """Look up a codec by name, falling back to the fastest installed one."""
+    codec = CODECS_BY_NAME.get(name)
+    if codec is None:
+        codec = CODECS_BY_NAME.get("msgpack") or CODECS_BY_NAME.get("orjson") or CODECS_BY_NAME["json"]
+        logger.warning(f"Cache codec '{name}' is not available, using '{codec.name}'")
+    return codec
+
+
+class ValueCodec:
+    """Frames values with the codec header and compresses large payloads."""
+
+    def __init__(self, codec: Codec, compression_threshold: int = 4096, compression_level: int = 1):
+        self.codec = codec
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+
+    def encode(self, value: Any) -> bytes:
+        payload = self.codec.dumps(value)
+        flags = self.codec.codec_id
+        if self.compression_threshold and len(payload) > self.compression_threshold:
+            payload = zlib.compress(payload, self.compression_level)
+            flags |= COMPRESSED_FLAG
+        return bytes((HEADER_MARKER, flags)) + payload
+
+    def decode(self, data: Optional[bytes]) -> Any:
+        if data is None:
+            return None
+        if len(data) < 2 or data[0] != HEADER_MARKER:
+            return self._decode_legacy(data)
+
+        flags = data[1]
+        codec = CODECS.get(flags & CODEC_ID_MASK)
+        if codec is None:
+            raise ValueError(f"Unknown cache codec id {flags & CODEC_ID_MASK}")
+        payload = data[2:]
+        if flags & COMPRESSED_FLAG:
+            payload = zlib.decompress(payload)
+        return codec.loads(payload)
+
+    @staticmethod
+    def _decode_legacy(data: bytes) -> Any:
+        """Values written as plain JSON or text before the codec header existed."""
+        try:
+            text = data.decode()
+        except UnicodeDecodeError:
+            logger.warning("Discarding undecodable cache value")
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
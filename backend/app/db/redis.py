@@ -5,20 +5,223 @@ Provides connection pooling, error handling, and utility functions for Redis ope
 import asyncio
 import json
 import logging
-from typing import Any, Optional, Union
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import redis.asyncio as redis
 from app.core.config import settings
+from app.db.codec import ValueCodec, get_codec
 from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.sentinel import Sentinel
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
 
 logger = logging.getLogger(__name__)
 
+# Errors that indicate Redis itself is unreachable (as opposed to a bad command)
+CONNECTIVITY_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError, asyncio.TimeoutError)
+
+# Compare-and-delete, used to release locks without removing someone else's
+DELETE_IF_EQUALS_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+class RedisMode:
+    """Supported Redis deployments."""
+    STANDALONE = "standalone"
+    SENTINEL = "sentinel"
+    CLUSTER = "cluster"
+
+
+class CircuitState:
+    """Connection health states for the Redis circuit breaker."""
+    CLOSED = "closed"        # Healthy, operations go to Redis
+    OPEN = "open"            # Tripped, operations short-circuit without touching the network
+    HALF_OPEN = "half_open"  # Probing whether Redis has recovered
+
 class RedisManager:
     """Redis connection manager with connection pooling and error handling."""
     
     def __init__(self):
         self.redis: Optional[Redis] = None
+        # Second client without response decoding, for codec-encoded cache values
+        self.binary_redis: Optional[Redis] = None
+        # Optional binary client reading from replicas, for reads that tolerate lag
+        self.replica_redis: Optional[Redis] = None
+        self.mode = settings.REDIS_MODE.lower()
+        # Lua scripts registered on the text client, keyed by source
+        self._scripts: Dict[str, Any] = {}
+        # Cluster mode subscribes through a plain connection to one node
+        self._pubsub_client: Optional[Redis] = None
         self._pool = None
+        self.codec = ValueCodec(
+            get_codec(settings.CACHE_CODEC),
+            compression_threshold=settings.CACHE_COMPRESSION_THRESHOLD
+        )
+        
+        # Connection health is tracked in the background so the hot path
+        # only reads a flag instead of sending a PING per operation.
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trip_count = 0
+        self._recovery_count = 0
+        self._transitions: deque = deque(maxlen=50)
+        self._state_listeners: List[Callable[[str, str], None]] = []
+        self._command_listeners: List[Callable[[str, List[str], float, List[int]], None]] = []
+        self._probe_task: Optional[asyncio.Task] = None
+    
+    @property
+    def state(self) -> str:
+        """Current circuit breaker state."""
+        return self._state
+    
+    @property
+    def is_available(self) -> bool:
+        """Whether operations should be sent to Redis. Never touches the network."""
+        return self.redis is not None and self._state == CircuitState.CLOSED
+    
+    def add_state_listener(self, listener: Callable[[str, str], None]) -> None:
+        """Register a callback invoked as listener(old_state, new_state) on every transition."""
+        self._state_listeners.append(listener)
+    
+    def add_command_listener(self, listener: Callable[[str, List[str], float, List[int]], None]) -> None:
+        """
+        Register a callback invoked as listener(operation, keys, seconds, sizes)
+        after each codec read ("read") or write ("write") round trip.
+        """
+        self._command_listeners.append(listener)
+    
+    def _notify_command(self, operation: str, keys: List[str], started: float, sizes: List[int]) -> None:
+        if not self._command_listeners:
+            return
+        elapsed = time.perf_counter() - started
+        for listener in self._command_listeners:
+            try:
+                listener(operation, keys, elapsed, sizes)
+            except Exception as e:
+                logger.error(f"Redis command listener error: {e}")
+    
+    def _transition(self, new_state: str, reason: str = "") -> None:
+        """Move the circuit breaker to a new state and notify listeners."""
+        old_state = self._state
+        if old_state == new_state:
+            return
+        
+        self._state = new_state
+        if new_state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+            self._trip_count += 1
+            logger.error(f"Redis circuit breaker tripped ({old_state} -> open): {reason}")
+        elif new_state == CircuitState.CLOSED:
+            self._opened_at = None
+            self._consecutive_failures = 0
+            if old_state != CircuitState.CLOSED:
+                self._recovery_count += 1
+            logger.info(f"Redis circuit breaker recovered ({old_state} -> closed)")
+        else:
+            logger.info(f"Redis circuit breaker probing ({old_state} -> {new_state})")
+        
+        self._transitions.append({
+            "from": old_state,
+            "to": new_state,
+            "reason": reason,
+            "at": time.time()
+        })
+        for listener in self._state_listeners:
+            try:
+                listener(old_state, new_state)
+            except Exception as e:
+                logger.error(f"Redis state listener error: {e}")
+    
+    def _record_success(self) -> None:
+        """Reset the consecutive failure count after a successful operation."""
+        self._consecutive_failures = 0
+    
+    def _record_failure(self, error: Exception) -> None:
+        """Count a connectivity failure and trip the breaker past the threshold."""
+        if not isinstance(error, CONNECTIVITY_ERRORS):
+            return
+        
+        self._consecutive_failures += 1
+        if self._state == CircuitState.HALF_OPEN:
+            self._transition(CircuitState.OPEN, f"probe failed: {error}")
+        elif (self._state == CircuitState.CLOSED and
+              self._consecutive_failures >= settings.REDIS_CIRCUIT_FAILURE_THRESHOLD):
+            self._transition(
+                CircuitState.OPEN,
+                f"{self._consecutive_failures} consecutive failures, last: {error}"
+            )
+    
+    async def _probe(self) -> None:
+        """Send a single PING and feed the result into the state machine."""
+        if not self.redis:
+            return
+        
+        if self._state == CircuitState.OPEN:
+            elapsed = time.monotonic() - (self._opened_at or 0)
+            if elapsed < settings.REDIS_CIRCUIT_RESET_TIMEOUT:
+                return
+            self._transition(CircuitState.HALF_OPEN, "reset timeout elapsed")
+        
+        try:
+            await asyncio.wait_for(
+                self.redis.ping(),
+                timeout=settings.REDIS_HEALTH_CHECK_TIMEOUT
+            )
+        except Exception as e:
+            # A failed probe always counts, whatever the exception type
+            self._record_failure(e if isinstance(e, CONNECTIVITY_ERRORS) else RedisConnectionError(str(e)))
+            return
+        
+        self._record_success()
+        if self._state == CircuitState.HALF_OPEN:
+            self._transition(CircuitState.CLOSED, "probe succeeded")
+    
+    async def _probe_loop(self) -> None:
+        """Background task that periodically probes Redis health."""
+        while True:
+            try:
+                await asyncio.sleep(settings.REDIS_HEALTH_CHECK_INTERVAL)
+                await self._probe()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis health probe error: {e}")
+    
+    def _start_probe(self) -> None:
+        """Start the background health probe if it is not already running."""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop())
+    
+    async def _stop_probe(self) -> None:
+        """Stop the background health probe."""
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+    
+    def get_health_status(self) -> Dict[str, Any]:
+        """Snapshot of connection health for monitoring endpoints."""
+        return {
+            "connected": self.redis is not None,
+            "state": self._state,
+            "available": self.is_available,
+            "consecutive_failures": self._consecutive_failures,
+            "trip_count": self._trip_count,
+            "recovery_count": self._recovery_count,
+            "opened_at": self._opened_at and time.time() - (time.monotonic() - self._opened_at),
+            "recent_transitions": list(self._transitions),
+        }
+    
     async def connect(self) -> None:
         """Establish connection to Redis with connection pooling."""
         try:
@@ -37,16 +240,17 @@ class RedisManager:
             # Add password if provided
             if settings.REDIS_PASSWORD:
                 connection_params['password'] = settings.REDIS_PASSWORD
-              # Create connection pool
-            self.redis = redis.from_url(
-                settings.REDIS_URL,
-                db=settings.REDIS_DB,
-                **connection_params
-            )
+            
+            self._create_clients(connection_params)
+            self._scripts = {}
             
             # Test connection with longer timeout for Docker startup
             await asyncio.wait_for(self.redis.ping(), timeout=15.0)
-            logger.info(f"Successfully connected to Redis at {settings.REDIS_URL}")
+            logger.info(f"Successfully connected to Redis ({self.mode}) at {self._describe_endpoint()}")
+            
+            self._transition(CircuitState.CLOSED, "connected")
+            self._record_success()
+            self._start_probe()
             
         except asyncio.TimeoutError:
             logger.error("Redis connection timeout - Redis server may be unreachable or starting up")
@@ -57,24 +261,106 @@ class RedisManager:
             # Redis operations will gracefully degrade
             self.redis = None
     
+    def _create_clients(self, connection_params: Dict[str, Any]) -> None:
+        """Create the text, binary and (optional) replica clients for the configured mode."""
+        params = {k: v for k, v in connection_params.items() if k != 'decode_responses'}
+        
+        if self.mode == RedisMode.SENTINEL:
+            sentinel_kwargs = {}
+            if settings.REDIS_SENTINEL_PASSWORD:
+                sentinel_kwargs['password'] = settings.REDIS_SENTINEL_PASSWORD
+            sentinel = Sentinel(
+                self._sentinel_nodes(),
+                sentinel_kwargs=sentinel_kwargs,
+                db=settings.REDIS_DB,
+                **params
+            )
+            master = settings.REDIS_SENTINEL_MASTER
+            self.redis = sentinel.master_for(master, decode_responses=True)
+            self.binary_redis = sentinel.master_for(master, decode_responses=False)
+            if settings.REDIS_READ_FROM_REPLICAS:
+                self.replica_redis = sentinel.slave_for(master, decode_responses=False)
+        
+        elif self.mode == RedisMode.CLUSTER:
+            # The cluster client takes a narrower set of connection options and has no db index
+            cluster_params = {
+                k: v for k, v in params.items()
+                if k not in ('retry_on_timeout', 'retry_on_error')
+            }
+            self.redis = RedisCluster.from_url(settings.REDIS_URL, decode_responses=True, **cluster_params)
+            self.binary_redis = RedisCluster.from_url(settings.REDIS_URL, decode_responses=False, **cluster_params)
+            # Published messages reach every node, so any single node can serve subscriptions
+            self._pubsub_client = redis.from_url(settings.REDIS_URL, decode_responses=True, **params)
+            if settings.REDIS_READ_FROM_REPLICAS:
+                self.replica_redis = RedisCluster.from_url(
+                    settings.REDIS_URL,
+                    decode_responses=False,
+                    read_from_replicas=True,
+                    **cluster_params
+                )
+        
+        else:
+            self.redis = redis.from_url(settings.REDIS_URL, db=settings.REDIS_DB, decode_responses=True, **params)
+            self.binary_redis = redis.from_url(settings.REDIS_URL, db=settings.REDIS_DB, decode_responses=False, **params)
+            if settings.REDIS_READ_FROM_REPLICAS and settings.REDIS_REPLICA_URL:
+                self.replica_redis = redis.from_url(
+                    settings.REDIS_REPLICA_URL,
+                    db=settings.REDIS_DB,
+                    decode_responses=False,
+                    **params
+                )
+    
+    @staticmethod
+    def _sentinel_nodes() -> List[Tuple[str, int]]:
+        """Parse REDIS_SENTINELS ("host:port,host:port")."""
+        nodes = []
+        for node in settings.REDIS_SENTINELS.split(","):
+            node = node.strip()
+            if not node:
+                continue
+            host, _, port = node.rpartition(":")
+            nodes.append((host, int(port)) if host else (port, 26379))
+        return nodes
+    
+    def _describe_endpoint(self) -> str:
+        if self.mode == RedisMode.SENTINEL:
+            return f"sentinels {settings.REDIS_SENTINELS} (master '{settings.REDIS_SENTINEL_MASTER}')"
+        return settings.REDIS_URL
+    
+    def _read_client(self, stale_ok: bool) -> Redis:
+        """Binary client to read from: a replica when allowed and configured."""
+        if stale_ok and self.replica_redis is not None:
+            return self.replica_redis
+        return self.binary_redis
+    
     async def disconnect(self) -> None:
         """Close Redis connection."""
+        await self._stop_probe()
         if self.redis:
             try:
                 await self.redis.close()
+                for client in (self.binary_redis, self.replica_redis, self._pubsub_client):
+                    if client:
+                        await client.close()
                 logger.info("Redis connection closed")
             except Exception as e:
                 logger.error(f"Error closing Redis connection: {e}")
     
     async def is_connected(self) -> bool:
-        """Check if Redis is connected and available."""
+        """Check if Redis is connected and available (reads the health flag, no PING)."""
+        return self.is_available
+    
+    async def ping(self) -> bool:
+        """Actively check Redis with a PING, updating the health state."""
         if not self.redis:
             return False
         try:
             await self.redis.ping()
-            return True
-        except Exception:
+        except Exception as e:
+            self._record_failure(e)
             return False
+        self._record_success()
+        return True
     
     async def get(self, key: str) -> Optional[str]:
         """Get value from Redis with error handling."""
@@ -82,8 +368,11 @@ class RedisManager:
             return None
         
         try:
-            return await self.redis.get(key)
+            value = await self.redis.get(key)
+            self._record_success()
+            return value
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis GET error for key {key}: {e}")
             return None
     
@@ -106,11 +395,169 @@ class RedisManager:
                 await self.redis.setex(key, ttl, value)
             else:
                 await self.redis.set(key, value)
+            self._record_success()
             return True
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis SET error for key {key}: {e}")
             return False
     
+    async def set_if_absent(self, key: str, value: str, ttl: Optional[int] = None) -> Optional[bool]:
+        """
+        SET key value NX EX ttl (without a TTL if ttl is None).
+        Returns True if set, False if the key already exists, None if Redis is unavailable.
+        """
+        if not await self.is_connected():
+            return None
+        
+        try:
+            result = await self.redis.set(key, value, nx=True, ex=ttl)
+            self._record_success()
+            return bool(result)
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis SET NX error for key {key}: {e}")
+            return None
+    
+    async def delete_if_equals(self, key: str, value: str) -> bool:
+        """Atomically delete a key only if it still holds the given value."""
+        if not await self.is_connected():
+            return False
+        
+        try:
+            result = await self.redis.eval(DELETE_IF_EQUALS_SCRIPT, 1, key, value)
+            self._record_success()
+            return result == 1
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis compare-and-delete error for key {key}: {e}")
+            return False
+    
+    async def run_script(self, script: str, keys: List[str], args: List[Any]) -> Optional[Any]:
+        """
+        Run a Lua script by SHA (loading it on first use) in one round trip.
+        Returns None if Redis is unavailable or the script fails.
+        """
+        if not await self.is_connected():
+            return None
+        
+        registered = self._scripts.get(script)
+        if registered is None:
+            registered = self._scripts[script] = self.redis.register_script(script)
+        try:
+            result = await registered(keys=keys, args=args)
+            self._record_success()
+            return result
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis script error for keys {keys}: {e}")
+            return None
+    
+    async def get_value(self, key: str, stale_ok: bool = False) -> Optional[Any]:
+        """
+        Get and decode a codec-encoded value in a single GET.
+        With stale_ok the read may be served by a replica.
+        """
+        if not await self.is_connected():
+            return None
+        
+        try:
+            started = time.perf_counter()
+            data = await self._read_client(stale_ok).get(key)
+            self._record_success()
+            self._notify_command("read", [key], started, [len(data) if data else 0])
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis GET error for key {key}: {e}")
+            return None
+        
+        try:
+            return self.codec.decode(data)
+        except Exception as e:
+            logger.error(f"Cache decode error for key {key}: {e}")
+            return None
+    
+    async def set_value(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Encode a value with the configured codec and store it."""
+        if not await self.is_connected():
+            return False
+        
+        try:
+            data = self.codec.encode(value)
+            started = time.perf_counter()
+            if ttl:
+                await self.binary_redis.setex(key, ttl, data)
+            else:
+                await self.binary_redis.set(key, data)
+            self._record_success()
+            self._notify_command("write", [key], started, [len(data)])
+            return True
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis SET error for key {key}: {e}")
+            return False
+    
+    async def get_values(self, keys: List[str], stale_ok: bool = False) -> List[Optional[Any]]:
+        """
+        Get and decode several codec-encoded values with one MGET.
+        In cluster mode the keys are spread over many slots, so the client
+        sends one MGET per slot.
+        """
+        if not keys:
+            return []
+        if not await self.is_connected():
+            return [None] * len(keys)
+        
+        try:
+            started = time.perf_counter()
+            client = self._read_client(stale_ok)
+            if self.mode == RedisMode.CLUSTER:
+                raw_values = await client.mget_nonatomic(keys)
+            else:
+                raw_values = await client.mget(keys)
+            self._record_success()
+            self._notify_command("read", keys, started, [len(data) if data else 0 for data in raw_values])
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis MGET error for {len(keys)} keys: {e}")
+            return [None] * len(keys)
+        
+        values = []
+        for key, data in zip(keys, raw_values):
+            try:
+                values.append(self.codec.decode(data))
+            except Exception as e:
+                logger.error(f"Cache decode error for key {key}: {e}")
+                values.append(None)
+        return values
+    
+    async def set_values(self, mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Encode and store several values in one pipelined round trip."""
+        if not mapping:
+            return True
+        if not await self.is_connected():
+            return False
+        
+        try:
+            pipeline = self.binary_redis.pipeline(transaction=False)
+            sizes = []
+            for key, value in mapping.items():
+                data = self.codec.encode(value)
+                sizes.append(len(data))
+                if ttl:
+                    pipeline.setex(key, ttl, data)
+                else:
+                    pipeline.set(key, data)
+            started = time.perf_counter()
+            await pipeline.execute()
+            self._record_success()
+            self._notify_command("write", list(mapping), started, sizes)
+            return True
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis pipelined SET error for {len(mapping)} keys: {e}")
+            return False
+    
     async def get_json(self, key: str) -> Optional[Union[dict, list]]:
         """Get and deserialize JSON value from Redis."""
         value = await self.get(key)
@@ -128,19 +575,24 @@ class RedisManager:
         
         try:
             result = await self.redis.delete(key)
+            self._record_success()
             return result > 0
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis DELETE error for key {key}: {e}")
             return False
     
     async def delete_many(self, keys: list) -> int:
-        """Delete multiple keys from Redis."""
+        """Delete multiple keys from Redis (split per slot by the client in cluster mode)."""
         if not await self.is_connected() or not keys:
             return 0
         
         try:
-            return await self.redis.delete(*keys)
+            deleted = await self.redis.delete(*keys)
+            self._record_success()
+            return deleted
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis DELETE_MANY error for {len(keys)} keys: {e}")
             return 0
     
@@ -150,15 +602,18 @@ class RedisManager:
             return 0
         
         try:
-            cursor = "0"
             total_deleted = 0
-            while cursor != 0:
-                cursor, keys = await self.redis.scan(cursor=cursor, match=pattern, count=100)
-                if keys:
-                    deleted_count = await self.redis.delete(*keys)
-                    total_deleted += deleted_count
+            batch = []
+            async for key in self._scan(pattern, count=100):
+                batch.append(key)
+                if len(batch) >= 100:
+                    total_deleted += await self.redis.delete(*batch)
+                    batch = []
+            if batch:
+                total_deleted += await self.redis.delete(*batch)
             return total_deleted
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis DELETE pattern error for pattern {pattern}: {e}")
             return 0
     
@@ -168,8 +623,11 @@ class RedisManager:
             return False
         
         try:
-            return await self.redis.exists(key) > 0
+            exists = await self.redis.exists(key) > 0
+            self._record_success()
+            return exists
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis EXISTS error for key {key}: {e}")
             return False
     
@@ -184,8 +642,10 @@ class RedisManager:
             if ttl:
                 pipeline.expire(key, ttl)
             results = await pipeline.execute()
+            self._record_success()
             return results[0]
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis INCREMENT error for key {key}: {e}")
             return None
     
@@ -195,11 +655,155 @@ class RedisManager:
             return None
         
         try:
-            return await self.redis.ttl(key)
+            ttl = await self.redis.ttl(key)
+            self._record_success()
+            return ttl
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis TTL error for key {key}: {e}")
             return None
     
+    async def hash_set(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """HSET fields (and refresh the key's TTL) in one round trip."""
+        if not await self.is_connected() or not mapping:
+            return False
+        
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.hset(key, mapping={field: str(value) for field, value in mapping.items()})
+            if ttl:
+                pipeline.expire(key, ttl)
+            await pipeline.execute()
+            self._record_success()
+            return True
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis HSET error for key {key}: {e}")
+            return False
+    
+    async def hash_get_all(self, key: str) -> Optional[Dict[str, str]]:
+        """HGETALL. Returns {} for a missing key, None if Redis is unavailable."""
+        if not await self.is_connected():
+            return None
+        
+        try:
+            fields = await self.redis.hgetall(key)
+            self._record_success()
+            return fields
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis HGETALL error for key {key}: {e}")
+            return None
+    
+    async def hash_get_all_many(self, keys: List[str]) -> Optional[List[Dict[str, str]]]:
+        """HGETALL several keys in one pipelined round trip ({} for missing keys)."""
+        if not await self.is_connected():
+            return None
+        if not keys:
+            return []
+        
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipeline.hgetall(key)
+            results = await pipeline.execute()
+            self._record_success()
+            return results
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis HGETALL error for {len(keys)} keys: {e}")
+            return None
+    
+    async def set_add(self, key: str, members: List[str], ttl: Optional[int] = None) -> bool:
+        """
+        SADD members in one round trip. With a TTL the set lives at least that
+        long: its TTL is extended but never shortened, so members added with a
+        longer life are not dropped early.
+        """
+        if not await self.is_connected() or not members:
+            return False
+        
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.sadd(key, *members)
+            if ttl:
+                pipeline.expire(key, ttl, nx=True)
+                pipeline.expire(key, ttl, gt=True)
+            await pipeline.execute()
+            self._record_success()
+            return True
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis SADD error for key {key}: {e}")
+            return False
+    
+    async def set_members(self, key: str) -> Optional[List[str]]:
+        """SMEMBERS. Returns [] for a missing key, None if Redis is unavailable."""
+        if not await self.is_connected():
+            return None
+        
+        try:
+            members = await self.redis.smembers(key)
+            self._record_success()
+            return list(members)
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis SMEMBERS error for key {key}: {e}")
+            return None
+    
+    async def set_remove(self, key: str, members: List[str]) -> int:
+        """SREM members. Returns the number removed."""
+        if not await self.is_connected() or not members:
+            return 0
+        
+        try:
+            removed = await self.redis.srem(key, *members)
+            self._record_success()
+            return removed
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis SREM error for key {key}: {e}")
+            return 0
+    
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish a message to a pub/sub channel. Returns the number of receivers."""
+        if not await self.is_connected():
+            return 0
+
+        try:
+            receivers = await self.redis.publish(channel, message)
+            self._record_success()
+            return receivers
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Redis PUBLISH error for channel {channel}: {e}")
+            return 0
+
+    async def subscribe(self, channel: str, poll_timeout: float = 1.0):
+        """
+        Async generator yielding message payloads published to a channel.
+        Polls with a short timeout so an idle channel does not hit the socket timeout.
+        """
+        if not self.is_available:
+            return
+
+        pubsub = (self._pubsub_client or self.redis).pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel)
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=poll_timeout
+                )
+                if message and message.get("type") == "message":
+                    yield message["data"]
+        finally:
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.close()
+            except Exception as e:
+                logger.debug(f"Error closing pub/sub for channel {channel}: {e}")
+
     async def connect_with_retry(self, max_retries: int = 5, retry_delay: int = 2) -> None:
         """Connect to Redis with retry logic for Docker environments."""
         for attempt in range(max_retries):
@@ -219,6 +823,18 @@ class RedisManager:
         logger.error(f"Failed to connect to Redis after {max_retries} attempts")
         self.redis = None
 
+    async def _scan(self, match: str, count: int):
+        """SCAN over keys; in cluster mode the client walks every primary."""
+        if self.mode == RedisMode.CLUSTER:
+            async for key in self.redis.scan_iter(match=match, count=count):
+                yield key
+            return
+        cursor = "0"
+        while cursor != 0:
+            cursor, keys = await self.redis.scan(cursor=cursor, match=match, count=count)
+            for key in keys:
+                yield key
+
     async def scan_iter(self, pattern: str = "*", count: int = 100):
         """
         Async generator to iterate over keys matching pattern.
@@ -228,12 +844,10 @@ class RedisManager:
             return
 
         try:
-            cursor = "0"
-            while cursor != 0:
-                cursor, keys = await self.redis.scan(cursor=cursor, match=pattern, count=count)
-                for key in keys:
-                    yield key
+            async for key in self._scan(pattern, count=count):
+                yield key
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Redis SCAN_ITER error for pattern {pattern}: {e}")
             return
 
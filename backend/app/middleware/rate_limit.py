@@ -1,183 +1,256 @@
 """
 Rate limiting middleware using Redis for API protection and abuse prevention.
+
+Implemented as a plain ASGI middleware rather than a BaseHTTPMiddleware, so
+requests are not wrapped in an extra task and response streams and
+background tasks pass through untouched.
 """
 import logging
-from typing import Callable
+import math
+from typing import Any, Dict, List, Optional, Pattern, Tuple
 
-from app.services.session import session_service
-from fastapi import HTTPException, Request, Response, status
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.services.rate_limiter import RateLimitDecision, RateLimitWindow, Window, rate_limiter
+from fastapi import Request, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+# Paths that are never rate limited (health checks and docs)
+EXEMPT_PATHS = frozenset({"/health", "/", "/docs", "/redoc", "/openapi.json"})
+
+# Endpoint-specific limits, keyed by route pattern (see RouteTable)
+DEFAULT_ENDPOINT_LIMITS: Dict[str, Dict[str, int]] = {
+    "/api/v1/auth/login": {"requests": 100, "window": 60},  # 100 requests per minute
+    "/api/v1/auth/register": {"requests": 100, "window": 60},  # 100 requests per minute
+    "/api/v1/auth/reset-password": {"requests": 50, "window": 60},  # 50 requests per minute
+    "/api/v1/products": {"requests": 300, "window": 60},  # 300 requests per minute
+    "/api/v1/products/{product_id}": {"requests": 300, "window": 60},  # 300 requests per minute
+}
+
+# Quota consumed by expensive routes (default 1), keyed by "METHOD /pattern" or "/pattern"
+DEFAULT_ROUTE_COSTS: Dict[str, int] = {
+    "GET /api/v1/products/search/{query}": 5,
+    "GET /api/v1/orders/track/{order_id}": 3,
+    "POST /api/v1/orders": 10,
+    "POST /api/v1/payments/aamarpay/initiate": 10,
+}
+
+ANONYMOUS = "anonymous"
+CUSTOMER = "customer"
+
+
+def parse_role_tiers(value: str) -> Dict[str, float]:
+    """Parse "anonymous:1,customer:2,admin:10" into role -> limit multiplier."""
+    tiers: Dict[str, float] = {}
+    for item in value.split(","):
+        role, _, multiplier = item.strip().partition(":")
+        if role and multiplier:
+            tiers[role] = float(multiplier)
+    return tiers
+
+
+class RouteTable:
+    """
+    Looks up per-route values by route pattern ("{param}" matches one path
+    segment, "{param:path}" the rest of the path). Keys may be prefixed with an
+    HTTP method. Trailing slashes are ignored; literal paths win over patterns,
+    and patterns are tried in order.
+    """
+
+    def __init__(self, routes: Dict[str, Any]):
+        self._exact: Dict[Tuple[Optional[str], str], Tuple[str, Any]] = {}
+        self._patterns: List[Tuple[Optional[str], Pattern, str, Any]] = []
+        for route, value in routes.items():
+            method, _, path = route.rpartition(" ")
+            method = method.upper() or None
+            path = self.normalize(path)
+            if "{" in path:
+                self._patterns.append((method, compile_path(path)[0], path, value))
+            else:
+                self._exact.setdefault((method, path), (path, value))
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        """Ignore trailing slashes, so "/api/v1/products/" matches "/api/v1/products"."""
+        return path.rstrip("/") or "/"
+
+    def match(self, method: str, path: str) -> Optional[Tuple[str, Any]]:
+        """Return (pattern, value) of the first route matching the request."""
+        path = self.normalize(path)
+        matched = self._exact.get((method, path)) or self._exact.get((None, path))
+        if matched is not None:
+            return matched
+        for route_method, regex, pattern, value in self._patterns:
+            if (route_method is None or route_method == method) and regex.match(path):
+                return pattern, value
+        return None
+
+
+class RateLimitMiddleware:
     """Rate limiting middleware to prevent API abuse."""
-    
+
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         default_requests_per_minute: int = 60,
         default_requests_per_hour: int = 1000,
-        enable_rate_limiting: bool = True
+        enable_rate_limiting: bool = True,
+        endpoint_limits: Optional[Dict[str, Dict[str, int]]] = None,
+        route_costs: Optional[Dict[str, int]] = None,
+        role_tiers: Optional[Dict[str, float]] = None
     ):
-        super().__init__(app)
+        self.app = app
         self.default_requests_per_minute = default_requests_per_minute
         self.default_requests_per_hour = default_requests_per_hour
         self.enable_rate_limiting = enable_rate_limiting
-        
+
         # Define different rate limits for different endpoints
-        self.endpoint_limits = {
-            "/api/v1/auth/login": {"requests": 100, "window": 60},  # 100 requests per minute
-            "/api/v1/auth/register": {"requests": 100, "window": 60},  # 100 requests per minute
-            "/api/v1/auth/reset-password": {"requests": 50, "window": 60},  # 50 requests per minute
-            "/api/v1/products": {"requests": 300, "window": 60},  # 300 requests per minute
-        }
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        if not self.enable_rate_limiting:
-            return await call_next(request)
-        
-        # Get client identifier
-        client_ip = self.get_client_ip(request)
-        user_id = self.get_user_id(request)
-        identifier = user_id if user_id else client_ip
-        
-        # Check rate limits
-        path = request.url.path
-        method = request.method
-        
+        self.endpoint_limits = dict(endpoint_limits or DEFAULT_ENDPOINT_LIMITS)
+        self.route_costs = dict(route_costs or DEFAULT_ROUTE_COSTS)
+        # Multipliers of the default per-minute and per-hour limits, by role
+        self.role_tiers = role_tiers or parse_role_tiers(settings.RATE_LIMIT_ROLE_TIERS)
+        self._limit_routes = RouteTable(self.endpoint_limits)
+        self._cost_routes = RouteTable(self.route_costs)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enable_rate_limiting:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+
         # Skip rate limiting for health checks and static files
-        if path in ["/health", "/", "/docs", "/redoc", "/openapi.json"]:
-            return await call_next(request)
-        
+        if path in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        # Authenticated users get their own quota; everyone else is keyed by IP
+        request = Request(scope)
+        payload = self.get_token_payload(request)
+        if payload and payload.get("sub"):
+            identifier = f"user:{payload['sub']}"
+            role = payload.get("role") or CUSTOMER
+        else:
+            identifier = f"ip:{self.get_client_ip(request)}"
+            role = ANONYMOUS
+
+        method = scope["method"]
+        windows = self._windows_for(path, method, role)
+        cost = self._cost_for(path, method, windows)
         try:
-            # Apply rate limiting
-            await self._apply_rate_limits(identifier, path, method)
-            
-            # Process request
-            response = await call_next(request)
-            
-            # Add rate limit headers
-            self._add_rate_limit_headers(response, identifier, path)
-            
-            return response
-            
-        except HTTPException as e:
-            return JSONResponse(
-                status_code=e.status_code,
-                content={"detail": e.detail, "type": "rate_limit_exceeded"}
-            )
+            decision = await rate_limiter.check(identifier, windows, cost)
         except Exception as e:
             logger.error(f"Rate limiting error: {e}")
-            # Continue without rate limiting if Redis is down
-            return await call_next(request)
-    
+            # Enforce this worker's share of the limits rather than allowing everything
+            decision = rate_limiter.check_local(identifier, windows, cost)
+
+        if not decision.allowed:
+            response = self._rate_limited_response(decision)
+            await response(scope, receive, send)
+            return
+
+        rate_limit_headers = self._rate_limit_headers(decision.tightest)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in rate_limit_headers.items():
+                    headers.setdefault(name, value)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
     def get_client_ip(self, request: Request) -> str:
         """Extract client IP address."""
         # Check for forwarded headers (from reverse proxy)
         forwarded_for = request.headers.get("X-Forwarded-For")
         if forwarded_for:
             return forwarded_for.split(",")[0].strip()
-        
+
         real_ip = request.headers.get("X-Real-IP")
         if real_ip:
             return real_ip
-        
+
         return request.client.host if request.client else "unknown"
-    
-    def get_user_id(self, request: Request) -> str:
-        """Extract user ID from request if authenticated."""
-        # This would typically extract from JWT token
-        # For now, we'll use a simple approach
+
+    def get_token_payload(self, request: Request) -> Optional[Dict[str, Any]]:
+        """Verified access token payload of the request, if it carries a valid bearer token."""
         auth_header = request.headers.get("Authorization")
         if auth_header and auth_header.startswith("Bearer "):
-            # In a real implementation, you'd decode the JWT token here
-            # For now, we'll return None to use IP-based rate limiting
-            pass
+            return decode_access_token(auth_header[7:])
         return None
-    
-    async def _apply_rate_limits(self, identifier: str, path: str, method: str):
-        """Apply rate limiting rules."""
-        # Check endpoint-specific limits
-        if path in self.endpoint_limits:
-            limit_config = self.endpoint_limits[path]
-            allowed, count, ttl = await session_service.check_rate_limit(
-                f"{identifier}:{path}",
-                limit_config["requests"],
-                limit_config["window"],
-                f"{method}:{path}"
-            )
-            
-            if not allowed:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Rate limit exceeded: {count}/{limit_config['requests']} requests. "
-                           f"Try again in {ttl} seconds.",
-                    headers={
-                        "Retry-After": str(ttl),
-                        "X-RateLimit-Limit": str(limit_config["requests"]),
-                        "X-RateLimit-Remaining": str(max(0, limit_config["requests"] - count)),
-                        "X-RateLimit-Reset": str(ttl)
-                    }
-                )
-        
-        # Apply default per-minute limit
-        allowed, count, ttl = await session_service.check_rate_limit(
-            f"{identifier}:minute",
-            self.default_requests_per_minute,
-            60,
-            "default_minute"
-        )
-        
-        if not allowed:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Rate limit exceeded: {count}/{self.default_requests_per_minute} "
-                       f"requests per minute. Try again in {ttl} seconds.",
-                headers={
-                    "Retry-After": str(ttl),
-                    "X-RateLimit-Limit": str(self.default_requests_per_minute),
-                    "X-RateLimit-Remaining": str(max(0, self.default_requests_per_minute - count)),
-                    "X-RateLimit-Reset": str(ttl)
-                }
-            )
-        
-        # Apply default per-hour limit
-        allowed, count, ttl = await session_service.check_rate_limit(
-            f"{identifier}:hour",
-            self.default_requests_per_hour,
-            3600,
-            "default_hour"
+
+    def get_user_id(self, request: Request) -> Optional[str]:
+        """Extract user ID from request if authenticated."""
+        payload = self.get_token_payload(request)
+        return payload.get("sub") if payload else None
+
+    def match_route(self, path: str, method: str = "GET") -> Optional[Tuple[str, Dict[str, int]]]:
+        """Return (pattern, limit config) of the first endpoint limit matching the request."""
+        return self._limit_routes.match(method, path)
+
+    def _windows_for(self, path: str, method: str, role: str = ANONYMOUS) -> List[Window]:
+        """(name, limit, period) windows that apply to a request."""
+        windows: List[Window] = []
+        matched = self.match_route(path, method)
+        if matched:
+            pattern, limit_config = matched
+            # Windows are per route pattern, so every product ID shares one quota
+            windows.append((f"{method}:{pattern}", limit_config["requests"], limit_config["window"]))
+        multiplier = self.role_tiers.get(role, 1)
+        windows.append(("default_minute", max(1, int(self.default_requests_per_minute * multiplier)), 60))
+        windows.append(("default_hour", max(1, int(self.default_requests_per_hour * multiplier)), 3600))
+        return windows
+
+    def _cost_for(self, path: str, method: str, windows: List[Window]) -> int:
+        """Quota a request consumes, capped so it always fits in its smallest window."""
+        matched = self._cost_routes.match(method, path)
+        cost = matched[1] if matched else 1
+        return min(cost, min(limit for _, limit, _ in windows))
+
+    @staticmethod
+    def _rate_limit_headers(window: RateLimitWindow) -> Dict[str, str]:
+        """X-RateLimit-* headers describing a window."""
+        return {
+            "X-RateLimit-Limit": str(window.limit),
+            "X-RateLimit-Remaining": str(window.remaining),
+            "X-RateLimit-Reset": str(math.ceil(window.reset_after))
+        }
+
+    def _rate_limited_response(self, decision: RateLimitDecision) -> JSONResponse:
+        """429 response describing the window that rejected the request."""
+        blocking = decision.blocking
+        retry_after = max(1, math.ceil(blocking.retry_after))
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={
+                "detail": f"Rate limit exceeded: {blocking.limit} requests per "
+                          f"{blocking.period} seconds. Try again in {retry_after} seconds.",
+                "type": "rate_limit_exceeded"
+            },
+            headers={"Retry-After": str(retry_after), **self._rate_limit_headers(blocking)}
         )
-        
-        if not allowed:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Rate limit exceeded: {count}/{self.default_requests_per_hour} "
-                       f"requests per hour. Try again in {ttl} seconds.",
-                headers={
-                    "Retry-After": str(ttl),
-                    "X-RateLimit-Limit": str(self.default_requests_per_hour),
-                    "X-RateLimit-Remaining": str(max(0, self.default_requests_per_hour - count)),
-                    "X-RateLimit-Reset": str(ttl)
-                }
-            )
-    
-    def _add_rate_limit_headers(self, response: Response, identifier: str, path: str):
-        """Add rate limit information to response headers."""
-        # This is optional and could be implemented to show current rate limit status
-        pass
 
 def create_rate_limit_middleware(
     default_requests_per_minute: int = 60,
     default_requests_per_hour: int = 1000,
-    enable_rate_limiting: bool = True
+    enable_rate_limiting: bool = True,
+    endpoint_limits: Optional[Dict[str, Dict[str, int]]] = None,
+    route_costs: Optional[Dict[str, int]] = None,
+    role_tiers: Optional[Dict[str, float]] = None
 ) -> RateLimitMiddleware:
     """Factory function to create rate limit middleware."""
     return RateLimitMiddleware(
         app=None,  # Will be set by FastAPI
         default_requests_per_minute=default_requests_per_minute,
         default_requests_per_hour=default_requests_per_hour,
-        enable_rate_limiting=enable_rate_limiting
+        enable_rate_limiting=enable_rate_limiting,
+        endpoint_limits=endpoint_limits,
+        route_costs=route_costs,
+        role_tiers=role_tiers
     )
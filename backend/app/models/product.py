@@ -108,6 +108,7 @@ class OrderInDB(OrderBase):
 
 class Order(OrderBase):
     id: str
+    short_id: Optional[str] = None  # Last 8 characters of the ID, used for tracking
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -105,6 +105,13 @@ class TokenPayload(BaseModel):
     sub: Optional[str] = None
     exp: Optional[datetime] = None
     token_type: Optional[str] = None  # To distinguish between access and refresh tokens
+    role: Optional[str] = None  # Access tokens issued with role claims
+    pv: Optional[int] = None  # Profile version the role claim was taken from
+
+class Principal(BaseModel):
+    """The authenticated caller as identified by the access token, without a profile lookup."""
+    id: str
+    role: Optional[str] = None  # As issued; only get_current_admin checks it is current
 
 # Add RefreshToken model for database storage
 class RefreshToken(BaseModel):
@@ -133,6 +140,21 @@ class UserProfile(BaseModel):
         "from_attributes": True
     }
 
+# Customer directory
+class CustomerOrderStats(BaseModel):
+    order_count: int = 0
+    total_spent: float = 0.0  # Excludes cancelled orders
+    last_order_at: Optional[datetime] = None
+
+class CustomerSummary(UserProfile):
+    created_at: Optional[datetime] = None
+    order_stats: CustomerOrderStats = Field(default_factory=CustomerOrderStats)
+
+class CustomerDirectoryPage(BaseModel):
+    data: List[CustomerSummary]
+    next_cursor: Optional[str] = None  # Pass back as cursor to get the next page
+    has_more: bool = False
+
 # GoogleAuth
 class GoogleLoginRequest(BaseModel):
     token: str
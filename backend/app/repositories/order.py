@@ -1,8 +1,11 @@
+import logging
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
+from app.core.config import settings
 from app.db.mongodb import get_database
 from app.models.product import (
     AdminOrderUpdate,
@@ -18,8 +21,29 @@ from app.models.product import (
     OrderWithItems,
 )
 from app.repositories.premium_code import PremiumCodeRepository
+from app.repositories.product import ProductRepository
 from app.services.cache import cache_service, cached
 
+logger = logging.getLogger(__name__)
+
+# Length of the short order ID shown to customers and accepted for tracking
+SHORT_ID_LENGTH = 8
+# Order IDs tried before giving up on a free short ID
+SHORT_ID_ATTEMPTS = 5
+
+
+def short_order_id(order_id: str) -> str:
+    """Short ID of an order: the last 8 characters of its ID, lowercased."""
+    return order_id[-SHORT_ID_LENGTH:].lower()
+
+
+# $group accumulators for a customer's order count, lifetime spend and latest order
+ORDER_STATS_FIELDS = {
+    "order_count": {"$sum": 1},
+    "total_spent": {"$sum": {"$cond": [{"$eq": ["$status", "cancelled"]}, 0, "$total_amount"]}},
+    "last_order_at": {"$max": "$created_at"},
+}
+
 
 class OrderRepository:
     @staticmethod
@@ -29,24 +53,46 @@ class OrderRepository:
         order_dict["user_id"] = ObjectId(order_dict["user_id"])
         order_dict["created_at"] = datetime.utcnow()
         
-        result = await db.orders.insert_one(order_dict)
-        
-        # Invalidate user orders cache
-        await cache_service.delete(f"user_orders:{order.user_id}")
-        
-        return str(result.inserted_id)
+        # The short ID shown in emails and used for tracking is the tail of the
+        # order ID; on the rare clash with an existing order, pick a new ID
+        for attempt in range(SHORT_ID_ATTEMPTS):
+            order_id = ObjectId()
+            order_dict["_id"] = order_id
+            order_dict["short_id"] = short_order_id(str(order_id))
+            try:
+                await db.orders.insert_one(order_dict)
+                break
+            except DuplicateKeyError as e:
+                if "short_id" not in (e.details or {}).get("keyPattern", {}) or attempt == SHORT_ID_ATTEMPTS - 1:
+                    raise
+                logger.warning(f"Short order ID {order_dict['short_id']} already taken, retrying")
+        
+        # Invalidate user orders cache and order lists/aggregates, and clear
+        # not-found tombstones that the new order could now satisfy
+        await cache_service.delete_many([
+            f"user_orders:{order.user_id}",
+            f"order:{order_id}"
+        ])
+        await cache_service.bump_namespaces("orders", "order_track")
+        
+        return str(order_id)
     
     @staticmethod
     async def get_by_id(order_id: str) -> Optional[Order]:
         # Try cache first
-        cached_order = await cache_service.get(f"order:{order_id}")
+        cached_order, not_found = await cache_service.get_entry(f"order:{order_id}")
         if cached_order and isinstance(cached_order, dict):
             return Order(**cached_order)
+        if not_found:
+            return None
         
         # Get from database
         db = await get_database()
         try:
             order = await db.orders.find_one({"_id": ObjectId(order_id)})
+            if not order:
+                # Remember the miss briefly so repeated lookups of unknown IDs skip Mongo
+                await cache_service.set_tombstone(f"order:{order_id}")
             if order:
                 order["user_id"] = str(order["user_id"])
                 order_obj = Order(**order, id=str(order["_id"]))
@@ -69,65 +115,89 @@ class OrderRepository:
         db = await get_database()
         try:
             order = await db.orders.find_one({"_id": ObjectId(order_id)})
-            if not order:
-                return None
-            
-            # Fetch related order items
-            cursor = db.order_items.find({"order_id": ObjectId(order_id)})
-            items = []
-            
-            async for item in cursor:
-                # Get product information for each item
-                product = await db.products.find_one({"_id": ObjectId(item["product_id"])})
-                product_name = product["name"] if product else "Unknown Product"
-                
-                items.append(OrderItemResponse(
-                    id=str(item["_id"]),
-                    product_id=str(item["product_id"]),
-                    product_name=product_name,
-                    quantity=item["quantity"],
-                    price=item["price"]
-                ))
-
-            # Convert ObjectId to string
-            order["user_id"] = str(order["user_id"])
-            
-            # Remove items field if it exists in the order dict to avoid conflict
-            order_data = {k: v for k, v in order.items() if k != "items"}
-            
-            # Return complete order with items
-            return OrderWithItems(**order_data, id=str(order["_id"]), items=items)
         except Exception:
             # Invalid ObjectId format
             return None
-
+        if not order:
+            return None
+        return await OrderRepository._with_items(order)
+    
     @staticmethod
-    async def find_by_partial_id(partial_id: str) -> Optional[OrderWithItems]:
-        """Find an order by partial ID (last 8 characters) and return with items"""
+    async def _with_items(order: dict) -> OrderWithItems:
+        """Attach the items of an order document loaded from Mongo."""
         db = await get_database()
         
+        # Fetch related order items
+        order_items = await db.order_items.find({"order_id": order["_id"]}).to_list(length=None)
+        
+        # Get product information for all items in one batch
+        products = await ProductRepository.get_many(
+            [str(item["product_id"]) for item in order_items]
+        )
+        
+        items = []
+        for item in order_items:
+            product = products.get(str(item["product_id"]))
+            product_name = product.name if product else "Unknown Product"
+            
+            items.append(OrderItemResponse(
+                id=str(item["_id"]),
+                product_id=str(item["product_id"]),
+                product_name=product_name,
+                quantity=item["quantity"],
+                price=item["price"]
+            ))
+
+        # Convert ObjectId to string
+        order["user_id"] = str(order["user_id"])
+        
+        # Remove items field if it exists in the order dict to avoid conflict
+        order_data = {k: v for k, v in order.items() if k != "items"}
+        
+        # Return complete order with items
+        return OrderWithItems(**order_data, id=str(order["_id"]), items=items)
+
+    @staticmethod
+    async def find_for_tracking(tracking_id: str) -> Optional[OrderWithItems]:
+        """
+        Resolve a public tracking ID (full or partial order ID).
+        Unknown IDs are remembered with a short-lived tombstone so that probing
+        random IDs does not reach Mongo on every request.
+        """
+        tracking_key = await cache_service.versioned_key(
+            "order_track", f"order_track:{tracking_id.strip().lower()}"
+        )
+        _, not_found = await cache_service.get_entry(tracking_key)
+        if not_found:
+            return None
+        
+        # Handles both full order IDs and short IDs, with one query either way
+        order = await OrderRepository.find_by_partial_id(tracking_id)
+        
+        if not order:
+            await cache_service.set_tombstone(tracking_key)
+        return order
+    
+    @staticmethod
+    async def find_by_partial_id(partial_id: str) -> Optional[OrderWithItems]:
+        """
+        Find an order by its short ID (last 8 characters of the order ID) and
+        return it with items. Full order IDs are accepted too.
+        """
         # Remove any case and whitespace variations
         partial_id_clean = partial_id.strip().lower()
         
         # If it's a full ObjectId (24 characters), use the regular method
         if len(partial_id_clean) == 24:
-            try:
-                return await OrderRepository.get_with_items(partial_id_clean)
-            except:
-                pass
-        
-        # For partial IDs, search through all orders to find a match.
-        # This is not the most efficient but will work for the use case.
-        cursor = db.orders.find({})
-        async for order_doc in cursor:
-            order_id_str = str(order_doc["_id"]).lower()
-            
-            # Check if the partial ID matches the end of the order ID
-            if order_id_str.endswith(partial_id_clean) or order_id_str[-8:] == partial_id_clean:
-                # Found a match, get the full order with items
-                return await OrderRepository.get_with_items(str(order_doc["_id"]))
+            return await OrderRepository.get_with_items(partial_id_clean)
+        if len(partial_id_clean) != SHORT_ID_LENGTH:
+            return None
         
-        return None
+        db = await get_database()
+        order = await db.orders.find_one({"short_id": partial_id_clean})
+        if not order:
+            return None
+        return await OrderRepository._with_items(order)
     
     @staticmethod
     async def get_by_user(user_id: str) -> List[Order]:
@@ -155,7 +225,7 @@ class OrderRepository:
         return orders
     
     @staticmethod
-    @cached("orders:list:{skip}:{limit}:{status_filter}:{payment_status_filter}:{search}", ttl=300)
+    @cached("orders:list:{skip}:{limit}:{status_filter}:{payment_status_filter}:{search}:{date_from}:{date_to}", ttl=300, namespace="orders")
     async def get_all(
         skip: int = 0, 
         limit: int = 100, 
@@ -222,6 +292,7 @@ class OrderRepository:
                 {"$set": update_data}
             )
         
+        await OrderRepository._invalidate_order_caches(order_id)
         return await OrderRepository.get_by_id(order_id)
     
     @staticmethod
@@ -231,8 +302,16 @@ class OrderRepository:
         if result.deleted_count > 0:
             # Also delete related order items
             await db.order_items.delete_many({"order_id": ObjectId(order_id)})
+            await OrderRepository._invalidate_order_caches(order_id)
             return True
-        return False    
+        return False
+    
+    @staticmethod
+    async def _invalidate_order_caches(order_id: str) -> None:
+        """Drop the cached order and every order list/aggregate."""
+        await cache_service.delete(f"order:{order_id}")
+        await cache_service.bump_namespaces("orders")
+    
     
     @staticmethod
     async def count(
@@ -283,13 +362,45 @@ class OrderRepository:
         return await db.orders.count_documents(query)
     
     @staticmethod
-    @cached("orders:count_by_user:{user_id}", ttl=300)
+    @cached("orders:count_by_user:{user_id}", ttl=300, namespace="orders")
     async def count_by_user(user_id: str) -> int:
         db = await get_database()
         return await db.orders.count_documents({"user_id": ObjectId(user_id)})
     
     @staticmethod
-    @cached("orders:total_revenue", ttl=600)  # Cache revenue for 10 minutes
+    async def get_customer_stats(user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Order count, lifetime spend and latest order date per user. Cached per
+        user in the orders namespace, so any order change refreshes them; misses
+        are computed with one aggregation.
+        """
+        keys = {
+            user_id: await cache_service.versioned_key("orders", f"orders:customer_stats:{user_id}")
+            for user_id in dict.fromkeys(user_ids)
+        }
+        cached_stats = await cache_service.get_many(list(keys.values()))
+        stats = {user_id: cached_stats[key] for user_id, key in keys.items() if key in cached_stats}
+        
+        missing = [user_id for user_id in keys if user_id not in stats]
+        if missing:
+            db = await get_database()
+            pipeline = [
+                {"$match": {"user_id": {"$in": [ObjectId(user_id) for user_id in missing]}}},
+                {"$group": {"_id": "$user_id", **ORDER_STATS_FIELDS}}
+            ]
+            fetched = {user_id: {"order_count": 0, "total_spent": 0.0, "last_order_at": None} for user_id in missing}
+            async for row in db.orders.aggregate(pipeline):
+                fetched[str(row.pop("_id"))] = row
+            await cache_service.set_many(
+                {keys[user_id]: row for user_id, row in fetched.items()},
+                ttl=settings.CACHE_TTL_SECONDS
+            )
+            stats.update(fetched)
+        
+        return stats
+    
+    @staticmethod
+    @cached("orders:total_revenue", ttl=600, namespace="orders", lock=True, stale_ttl=600)  # Fresh for 10 minutes, served stale for 10 more while refreshing
     async def get_total_revenue() -> float:
         db = await get_database()
         pipeline = [{"$group": {"_id": None, "total": {"$sum": "$total_amount"}}}]
@@ -297,7 +408,7 @@ class OrderRepository:
         return result[0]["total"] if result else 0
     
     @staticmethod
-    @cached("orders:revenue_period:{days_ago}", ttl=300)
+    @cached("orders:revenue_period:{days_ago}", ttl=300, namespace="orders", lock=True)
     async def get_revenue_by_period(days_ago: int) -> float:
         """Get total revenue from a specific number of days ago to now"""
         db = await get_database()
@@ -344,6 +455,7 @@ class OrderRepository:
                 {"$set": update_data}
             )
         
+        await OrderRepository._invalidate_order_caches(order_id)
         return await OrderRepository.get_by_id(order_id)
     
     @staticmethod
@@ -6,9 +6,12 @@ from app.models.settings import (DeliveryChargesResponse,
                                  EnabledPaymentMethods, PaymentMethodSettings,
                                  PaymentSettings, PaymentSettingsCreate,
                                  PaymentSettingsInDB, PaymentSettingsUpdate)
+from app.services.cache import cache_service
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from pymongo import ReturnDocument
 
+PAYMENT_SETTINGS_CACHE_KEY = "payment_settings:current"
+
 
 class PaymentSettingsRepository:
     def __init__(self, database: AsyncIOMotorDatabase):
@@ -17,6 +20,10 @@ class PaymentSettingsRepository:
 
     async def get_settings(self) -> Optional[PaymentSettings]:
         """Get payment settings - creates default if none exist"""
+        cached_settings = await cache_service.get(PAYMENT_SETTINGS_CACHE_KEY)
+        if cached_settings and isinstance(cached_settings, dict):
+            return PaymentSettings(**cached_settings)
+        
         settings_doc = await self.collection.find_one()
         
         if not settings_doc:
@@ -28,7 +35,14 @@ class PaymentSettingsRepository:
         # Convert MongoDB document to PaymentSettings model
         settings_doc["id"] = str(settings_doc["_id"])
         del settings_doc["_id"]
-        return PaymentSettings(**settings_doc)
+        payment_settings = PaymentSettings(**settings_doc)
+        
+        await cache_service.set(
+            PAYMENT_SETTINGS_CACHE_KEY,
+            payment_settings.model_dump(),
+            ttl=settings.CACHE_TTL_SECONDS
+        )
+        return payment_settings
 
     async def create_settings(self, settings_data: PaymentSettingsCreate) -> PaymentSettings:
         """Create new payment settings"""
@@ -36,6 +50,7 @@ class PaymentSettingsRepository:
         settings_dict["created_at"] = datetime.utcnow()
         
         result = await self.collection.insert_one(settings_dict)
+        await cache_service.delete(PAYMENT_SETTINGS_CACHE_KEY)
         created_settings = await self.collection.find_one({"_id": result.inserted_id})
           # Convert MongoDB document to PaymentSettings model
         created_settings["id"] = str(created_settings["_id"])
@@ -67,6 +82,7 @@ class PaymentSettingsRepository:
             {"$set": update_data},
             return_document=ReturnDocument.AFTER
         )
+        await cache_service.delete(PAYMENT_SETTINGS_CACHE_KEY)
         
         if updated_doc:
             # Convert MongoDB document to PaymentSettings model
@@ -104,6 +120,7 @@ class PaymentSettingsRepository:
             {"$set": update_data},
             return_document=ReturnDocument.AFTER
         )
+        await cache_service.delete(PAYMENT_SETTINGS_CACHE_KEY)
         
         if updated_doc:
             # Convert MongoDB document to PaymentSettings model
@@ -150,6 +167,7 @@ class PaymentSettingsRepository:
             {"$set": update_data},
             return_document=ReturnDocument.AFTER
         )
+        await cache_service.delete(PAYMENT_SETTINGS_CACHE_KEY)
         
         if updated_doc:
             # Convert MongoDB document to PaymentSettings model
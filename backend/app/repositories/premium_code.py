@@ -15,7 +15,7 @@ from app.models.product import (
     PremiumCodeUpdate,
 )
 from app.repositories.user import UserRepository
-from app.services.cache import cache_invalidate_patterns, cached
+from app.services.cache import cache_invalidate_namespaces, cache_service, cached
 
 
 class PremiumCodeRepository:
@@ -26,7 +26,7 @@ class PremiumCodeRepository:
         return ''.join(secrets.choice(characters) for _ in range(length))
     
     @staticmethod
-    @cache_invalidate_patterns("premium_code:*")
+    @cache_invalidate_namespaces("premium_code")
     async def create(premium_code: PremiumCodeCreate) -> str:
         """Create a single premium code."""
         db = await get_database()
@@ -45,6 +45,7 @@ class PremiumCodeRepository:
         return str(result.inserted_id)
     
     @staticmethod
+    @cache_invalidate_namespaces("premium_code")
     async def generate_bulk(generate_request: PremiumCodeGenerate) -> List[str]:
         """Generate multiple premium codes."""
         db = await get_database()
@@ -73,7 +74,7 @@ class PremiumCodeRepository:
         return created_ids
     
     @staticmethod
-    @cached("premium_code:id:{code_id}", ttl=600)  # Cache for 10 minutes
+    @cached("premium_code:id:{code_id}", ttl=600, namespace="premium_code")  # Cache for 10 minutes
     async def get_by_id(code_id: str) -> Optional[PremiumCode]:
         """Get premium code by ID."""
         db = await get_database()
@@ -98,10 +99,17 @@ class PremiumCodeRepository:
     @staticmethod
     async def get_by_code(code: str) -> Optional[PremiumCode]:
         """Get premium code by code value."""
+        # Tombstones live in the premium_code namespace, so creating codes clears them
+        not_found_key = await cache_service.versioned_key("premium_code", f"premium_code:code:{code}")
+        _, not_found = await cache_service.get_entry(not_found_key)
+        if not_found:
+            return None
+        
         db = await get_database()
         code_doc = await db.premium_codes.find_one({"code": code})
         
         if not code_doc:
+            await cache_service.set_tombstone(not_found_key)
             return None
         
         # Get bound user email if exists
@@ -130,19 +138,20 @@ class PremiumCodeRepository:
         
         cursor = db.premium_codes.find(query).skip(skip).limit(limit).sort("created_at", -1)
         
+        docs = await cursor.to_list(length=limit)
+        
+        # Resolve bound user emails in one batch
+        users = await UserRepository.get_many(
+            [str(doc["bound_user_id"]) for doc in docs if doc.get("bound_user_id")]
+        )
+        
         codes = []
-        async for doc in cursor:
-            # Get bound user email if exists
-            bound_user_email = None
-            if doc.get("bound_user_id"):
-                user = await UserRepository.get_by_id(doc["bound_user_id"])
-                if user:
-                    bound_user_email = user.email
-            
+        for doc in docs:
+            user = users.get(str(doc["bound_user_id"])) if doc.get("bound_user_id") else None
             codes.append(PremiumCode(
                 **doc,
                 id=str(doc["_id"]),
-                bound_user_email=bound_user_email
+                bound_user_email=user.email if user else None
             ))
         
         return codes
@@ -153,11 +162,11 @@ class PremiumCodeRepository:
         db = await get_database()
         cursor = db.premium_codes.find({"bound_user_id": user_id}).sort("created_at", -1)
         
+        user = await UserRepository.get_by_id(user_id)
+        bound_user_email = user.email if user else None
+        
         codes = []
         async for doc in cursor:
-            user = await UserRepository.get_by_id(user_id)
-            bound_user_email = user.email if user else None
-            
             codes.append(PremiumCode(
                 **doc,
                 id=str(doc["_id"]),
@@ -190,6 +199,7 @@ class PremiumCodeRepository:
         if result.modified_count == 0:
             return None
         
+        await cache_service.bump_namespaces("premium_code")
         return await PremiumCodeRepository.get_by_id(code_id)
     
     @staticmethod
@@ -210,6 +220,7 @@ class PremiumCodeRepository:
         if result.modified_count == 0:
             return None
         
+        await cache_service.bump_namespaces("premium_code")
         return await PremiumCodeRepository.get_by_id(code_id)
     
     @staticmethod
@@ -225,10 +236,12 @@ class PremiumCodeRepository:
                 {"_id": ObjectId(code_id)},
                 {"$set": update_data}
             )
+            await cache_service.bump_namespaces("premium_code")
         
         return await PremiumCodeRepository.get_by_id(code_id)
     
     @staticmethod
+    @cache_invalidate_namespaces("premium_code")
     async def delete(code_id: str) -> bool:
         """Delete a premium code."""
         db = await get_database()
@@ -271,7 +284,10 @@ class PremiumCodeRepository:
             }
         )
         
-        return result.modified_count > 0
+        if result.modified_count > 0:
+            await cache_service.bump_namespaces("premium_code")
+            return True
+        return False
     @staticmethod
     async def count(active_only: bool = False, bound_only: bool = False) -> int:
         """Count premium codes with optional filtering."""
@@ -331,7 +347,7 @@ class PremiumCodeRepository:
         if len(available_codes) < quantity:
             raise ValueError(f"Not enough premium codes available. Requested: {quantity}, Available: {len(available_codes)}")
         
-        distributed_codes = []
+        distributed_ids = []
         
         # Mark codes as distributed
         for code in available_codes:
@@ -348,10 +364,17 @@ class PremiumCodeRepository:
             )
             
             if result.modified_count > 0:
-                # Get updated code
-                updated_code = await PremiumCodeRepository.get_by_id(code.id)
-                if updated_code:
-                    distributed_codes.append(updated_code)
+                distributed_ids.append(code.id)
+        
+        if distributed_ids:
+            await cache_service.bump_namespaces("premium_code")
+        
+        distributed_codes = []
+        for code_id in distributed_ids:
+            # Get updated code
+            updated_code = await PremiumCodeRepository.get_by_id(code_id)
+            if updated_code:
+                distributed_codes.append(updated_code)
         
         return distributed_codes
     
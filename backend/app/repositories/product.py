@@ -1,38 +1,39 @@
 import hashlib
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from bson import ObjectId
 
+from app.core.config import settings
 from app.db.mongodb import get_database
 from app.models.product import Product, ProductCreate, ProductInDB, ProductUpdate
 from app.models.user import PyObjectId
-from app.services.cache import cache_invalidate, cache_service, cached
+from app.services.cache import cache_invalidate_namespaces, cache_service, cached
 from app.utils.timing import profile_operation
 
 
 class ProductRepository:
     @staticmethod
-    @cache_invalidate("products:*")  # Invalidate all product list caches
+    @cache_invalidate_namespaces("products")  # Invalidate all product list and count caches
     @profile_operation("db_create_product")
     async def create(product: ProductCreate) -> str:
         db = await get_database()
         product_dict = product.model_dump()
         product_dict["created_at"] = datetime.utcnow()
         result = await db.products.insert_one(product_dict)
-        
-        # Also invalidate count caches
-        await cache_service.delete_patterns("count_*")
-        
+        # Clear any not-found tombstone for this ID
+        await cache_service.invalidate_product(str(result.inserted_id))
         return str(result.inserted_id)
     
     @staticmethod
     @profile_operation("db_get_product_by_id")
     async def get_by_id(product_id: str) -> Optional[Product]:
         # Try to get from cache first
-        cached_product = await cache_service.get_product(product_id)
+        cached_product, not_found = await cache_service.get_entry(f"product:{product_id}")
         if cached_product:
             return Product(**cached_product)
+        if not_found:
+            return None
         
         # Get from database
         db = await get_database()
@@ -44,32 +45,45 @@ class ProductRepository:
             await cache_service.set_product(product_id, product_obj.model_dump())
             
             return product_obj
+        
+        # Remember the miss briefly so repeated lookups of unknown IDs skip Mongo
+        await cache_service.set_tombstone(f"product:{product_id}")
         return None
     
     @staticmethod
+    @profile_operation("db_get_products_by_ids")
+    async def get_many(product_ids: List[str]) -> Dict[str, Product]:
+        """Get several products by ID: one cache round trip, then one query for the misses."""
+        product_ids = [pid for pid in dict.fromkeys(product_ids) if ObjectId.is_valid(pid)]
+        if not product_ids:
+            return {}
+        
+        cached_products = await cache_service.get_products(product_ids)
+        products = {pid: Product(**data) for pid, data in cached_products.items()}
+        
+        missing = [pid for pid in product_ids if pid not in products]
+        if missing:
+            db = await get_database()
+            cursor = db.products.find({"_id": {"$in": [ObjectId(pid) for pid in missing]}})
+            fetched = {}
+            async for doc in cursor:
+                product_obj = Product(**doc, id=str(doc["_id"]))
+                products[product_obj.id] = product_obj
+                fetched[product_obj.id] = product_obj.model_dump()
+            await cache_service.set_products(fetched)
+        
+        return products
+    
+    @staticmethod
+    @cached("products:all_{skip}_{limit}_{active_only}", ttl=settings.CACHE_TTL_PRODUCTS, namespace="products", stale_ttl=300)
     @profile_operation("db_get_all_products")
     async def get_all(skip: int = 0, limit: int = 100, active_only: bool = False) -> List[Product]:
-        # Create cache key based on parameters
-        cache_key = f"all_{skip}_{limit}_{active_only}"
-        
-        # Try to get from cache first
-        cached_products = await cache_service.get_products_list(cache_key)
-        if cached_products:
-            return [Product(**p) for p in cached_products]
-        
-        # Get from database
         db = await get_database()
         query = {"is_active": True} if active_only else {}
         cursor = db.products.find(query).skip(skip).limit(limit).sort("created_at", -1)
         products = []
         async for doc in cursor:
             products.append(Product(**doc, id=str(doc["_id"])))
-          # Cache the results
-        if products:
-            await cache_service.set_products_list(
-                cache_key, 
-                [p.model_dump() for p in products]
-            )
         
         return products
     
@@ -88,8 +102,8 @@ class ProductRepository:
         
         # Invalidate caches - more targeted invalidation
         await cache_service.invalidate_product(product_id)
-        # Invalidate all list caches (including search and category)
-        await cache_service.delete_patterns("products:*", "count_*")
+        # Invalidate all list caches (including search, category and counts)
+        await cache_service.invalidate_products_lists()
         
         return await ProductRepository.get_by_id(product_id)
     
@@ -102,13 +116,13 @@ class ProductRepository:
         if result.deleted_count > 0:
             # Invalidate caches - more targeted invalidation
             await cache_service.invalidate_product(product_id)
-            # Invalidate all list caches (including search and category)
-            await cache_service.delete_patterns("products:*", "count_*")
+            # Invalidate all list caches (including search, category and counts)
+            await cache_service.invalidate_products_lists()
             return True
         return False
 
     @staticmethod
-    @cached("product_count_{active_only}", ttl=300)  # Cache for 5 minutes
+    @cached("products:count_{active_only}", ttl=300, namespace="products")  # Cache for 5 minutes
     @profile_operation("db_count_products")
     async def count(active_only: bool = False) -> int:
         db = await get_database()
@@ -164,7 +178,7 @@ class ProductRepository:
         cache_key = f"count_search_{hashlib.md5(query.encode()).hexdigest()}_{active_only}"
         
         # Try cache first
-        cached_count = await cache_service.get(cache_key)
+        cached_count = await cache_service.get_products_list(cache_key)
         if cached_count is not None:
             return cached_count
         
@@ -182,12 +196,12 @@ class ProductRepository:
             
         count = await db.products.count_documents(search_filter)
         
-        # Cache for 5 minutes
-        await cache_service.set(cache_key, count, ttl=300)
+        await cache_service.set_products_list(cache_key, count)
         
         return count
     
     @staticmethod
+    @cached("products:category_{category}_{skip}_{limit}_{active_only}", ttl=settings.CACHE_TTL_PRODUCTS, namespace="products", stale_ttl=300)
     @profile_operation("db_get_products_by_category")
     async def get_by_category(
         category: str, 
@@ -196,13 +210,6 @@ class ProductRepository:
         active_only: bool = False
     ) -> List[Product]:
         """Get products by category with proper pagination support."""
-        cache_key = f"category_{category}_{skip}_{limit}_{active_only}"
-        
-        # Try to get from cache first
-        cached_products = await cache_service.get_products_list(cache_key)
-        if cached_products:
-            return [Product(**p) for p in cached_products]
-        
         # Get from database using compound index (category, is_active)
         db = await get_database()
         query = {"category": category}
@@ -214,13 +221,6 @@ class ProductRepository:
         async for doc in cursor:
             products.append(Product(**doc, id=str(doc["_id"])))
         
-        # Cache the results
-        if products:
-            await cache_service.set_products_list(
-                cache_key, 
-                [p.model_dump() for p in products]
-            )
-        
         return products
     
     @staticmethod
@@ -230,7 +230,7 @@ class ProductRepository:
         cache_key = f"count_category_{category}_{active_only}"
         
         # Try cache first
-        cached_count = await cache_service.get(cache_key)
+        cached_count = await cache_service.get_products_list(cache_key)
         if cached_count is not None:
             return cached_count
         
@@ -241,7 +241,6 @@ class ProductRepository:
             
         count = await db.products.count_documents(query)
         
-        # Cache for 5 minutes
-        await cache_service.set(cache_key, count, ttl=300)
+        await cache_service.set_products_list(cache_key, count)
         
         return count
@@ -16,18 +16,13 @@ from app.models.quiz import (
     QuestionUpdate,
     QuestionWithOptions,
 )
-from app.services.cache import (
-    cache_invalidate,
-    cache_invalidate_patterns,
-    cache_service,
-    cached,
-)
+from app.services.cache import cache_invalidate_namespaces, cached
 
 
 class QuestionRepository:
     
     @staticmethod
-    @cache_invalidate_patterns("quiz_question:*", "quiz_topic:*", "quiz_stats:*")
+    @cache_invalidate_namespaces("quiz_question", "quiz_topic", "quiz_stats")
     async def create(question: QuestionCreate) -> str:
         """Create a new question with options"""
         db = await get_database()
@@ -54,7 +49,7 @@ class QuestionRepository:
         return question_id
 
     @staticmethod
-    @cached("quiz_question:{question_id}:{include_options}", ttl=300)
+    @cached("quiz_question:{question_id}:{include_options}", ttl=300, namespace="quiz_question")
     async def get_by_id(question_id: str, include_options: bool = True) -> Optional[Question]:
         """Get question by ID with or without options"""
         db = await get_database()
@@ -89,20 +84,19 @@ class QuestionRepository:
         if not question:
             return None
 
-        get = lambda k: question[k] if isinstance(question, dict) else getattr(question, k)
         user_question_data = {
-            "id": get("id"),
-            "topic_id": get("topic_id"),
-            "title": get("title"),
-            "image_url": get("image_url"),
-            "difficulty": get("difficulty"),
-            "question_type": get("question_type"),
-            "topic_name": get("topic_name"),
+            "id": question.id,
+            "topic_id": question.topic_id,
+            "title": question.title,
+            "image_url": question.image_url,
+            "difficulty": question.difficulty,
+            "question_type": question.question_type,
+            "topic_name": question.topic_name,
         }
 
         # Always fetch options from DB if missing
-        options = get("options")
-        if not options and get("question_type") == QuestionType.MULTIPLE_CHOICE:
+        options = question.options
+        if not options and question.question_type == QuestionType.MULTIPLE_CHOICE:
             db = await get_database()
             options_cursor = db.quiz_question_options.find({"question_id": question_id})
             options = []
@@ -125,7 +119,7 @@ class QuestionRepository:
         return QuestionForUser(**user_question_data)
 
     @staticmethod
-    @cached("quiz_question:list:{skip}:{limit}:{topic_id}:{difficulty}:{question_type}:{active_only}:{search}:{include_options}", ttl=300)
+    @cached("quiz_question:list:{skip}:{limit}:{topic_id}:{difficulty}:{question_type}:{active_only}:{search}:{include_options}", ttl=300, namespace="quiz_question")
     async def get_all(
         skip: int = 0,
         limit: int = 100,
@@ -189,7 +183,7 @@ class QuestionRepository:
         return questions
 
     @staticmethod
-    @cached("quiz_question:count:{topic_id}:{difficulty}:{question_type}:{active_only}:{search}", ttl=300)
+    @cached("quiz_question:count:{topic_id}:{difficulty}:{question_type}:{active_only}:{search}", ttl=300, namespace="quiz_question")
     async def count(
         topic_id: Optional[str] = None,
         difficulty: Optional[DifficultyLevel] = None,
@@ -215,7 +209,7 @@ class QuestionRepository:
         return await db.quiz_questions.count_documents(query_filter)
 
     @staticmethod
-    @cache_invalidate_patterns("quiz_question:*", "quiz_topic:*", "quiz_stats:*")
+    @cache_invalidate_namespaces("quiz_question", "quiz_topic", "quiz_stats")
     async def update(question_id: str, question_update: QuestionUpdate) -> Optional[Question]:
         """Update question and its options"""
         db = await get_database()
@@ -249,7 +243,7 @@ class QuestionRepository:
         return await QuestionRepository.get_by_id(question_id)
 
     @staticmethod
-    @cache_invalidate_patterns("quiz_question:*", "quiz_topic:*", "quiz_stats:*")
+    @cache_invalidate_namespaces("quiz_question", "quiz_topic", "quiz_stats")
     async def delete(question_id: str) -> bool:
         """Delete question and its options"""
         db = await get_database()
@@ -281,7 +275,7 @@ class QuestionRepository:
             return await QuestionRepository.get_all(topic_id=topic_id, active_only=True)
 
     @staticmethod
-    @cached("quiz_question:random:{topic_id}:{difficulty}:{question_type}:{limit}", ttl=60)  # Short cache for randomness
+    @cached("quiz_question:random:{topic_id}:{difficulty}:{question_type}:{limit}", ttl=60, namespace="quiz_question")  # Short cache for randomness
     async def get_random_questions(
         topic_id: Optional[str] = None,
         difficulty: Optional[DifficultyLevel] = None,
@@ -14,13 +14,13 @@ from app.models.quiz_score import (
     UserQuizScoreInDB,
     UserQuizScoreUpdate,
 )
-from app.services.cache import cache_invalidate_patterns, cached
+from app.services.cache import cache_invalidate_namespaces, cached
 
 
 class UserQuizScoreRepository:
     
     @staticmethod
-    @cache_invalidate_patterns("user_quiz_score:*")
+    @cache_invalidate_namespaces("user_quiz_score")
     async def create(score: UserQuizScoreCreate) -> str:
         """Create a new user quiz score"""
         db = await get_database()
@@ -32,7 +32,7 @@ class UserQuizScoreRepository:
         return str(result.inserted_id)
     
     @staticmethod
-    @cached("user_quiz_score:user:{user_id}", ttl=300)
+    @cached("user_quiz_score:user:{user_id}", ttl=300, namespace="user_quiz_score")
     async def get_by_user_id(user_id: str) -> Optional[UserQuizScore]:
         """Get user quiz score by user ID"""
         db = await get_database()
@@ -45,7 +45,7 @@ class UserQuizScoreRepository:
         return UserQuizScore(**doc)
     
     @staticmethod
-    @cache_invalidate_patterns("user_quiz_score:*")
+    @cache_invalidate_namespaces("user_quiz_score")
     async def update(user_id: str, score_update: UserQuizScoreUpdate) -> Optional[UserQuizScore]:
         """Update user quiz score"""
         db = await get_database()
@@ -67,7 +67,7 @@ class UserQuizScoreRepository:
         return await UserQuizScoreRepository.get_by_user_id(user_id)
     
     @staticmethod
-    @cache_invalidate_patterns("user_quiz_score:*")
+    @cache_invalidate_namespaces("user_quiz_score")
     async def upsert(user_id: str, score_update: UserQuizScoreUpdate) -> UserQuizScore:
         """Update or insert user quiz score"""
         db = await get_database()
@@ -87,7 +87,7 @@ class UserQuizScoreRepository:
 class DailyScoreRepository:
     
     @staticmethod
-    @cache_invalidate_patterns("daily_score:*")
+    @cache_invalidate_namespaces("daily_score")
     async def create(score: DailyScoreCreate) -> str:
         """Create a new daily score"""
         db = await get_database()
@@ -99,7 +99,7 @@ class DailyScoreRepository:
         return str(result.inserted_id)
     
     @staticmethod
-    @cached("daily_score:user:{user_id}:date:{date}", ttl=300)
+    @cached("daily_score:user:{user_id}:date:{date}", ttl=300, namespace="daily_score")
     async def get_by_user_and_date(user_id: str, date: str) -> Optional[DailyScore]:
         """Get daily score by user ID and date"""
         db = await get_database()
@@ -112,7 +112,7 @@ class DailyScoreRepository:
         return DailyScore(**doc)
     
     @staticmethod
-    @cached("daily_score:leaderboard:date:{date}", ttl=300)
+    @cached("daily_score:leaderboard:date:{date}", ttl=300, namespace="daily_score")
     async def get_daily_leaderboard(date: str, limit: int = 3) -> List[DailyScore]:
         """Get top users for a specific date"""
         db = await get_database()
@@ -127,7 +127,7 @@ class DailyScoreRepository:
         return scores
     
     @staticmethod
-    @cache_invalidate_patterns("daily_score:*")
+    @cache_invalidate_namespaces("daily_score")
     async def update(user_id: str, date: str, score_update: DailyScoreUpdate) -> Optional[DailyScore]:
         """Update daily score"""
         db = await get_database()
@@ -149,7 +149,7 @@ class DailyScoreRepository:
         return await DailyScoreRepository.get_by_user_and_date(user_id, date)
     
     @staticmethod
-    @cache_invalidate_patterns("daily_score:*")
+    @cache_invalidate_namespaces("daily_score")
     async def upsert(user_id: str, user_email: str, user_name: str, date: str, score_update: DailyScoreUpdate) -> DailyScore:
         """Update or insert daily score"""
         db = await get_database()
@@ -11,13 +11,12 @@ from app.models.quiz_session import (
     QuizSessionStatus,
     QuizSessionUpdate,
 )
-from app.services.cache import cache_invalidate_patterns, cached
+from app.services.cache import cache_invalidate, cached
 
 
 class QuizSessionRepository:
     
     @staticmethod
-    @cache_invalidate_patterns("quiz_session:*")
     async def create(session: QuizSessionCreate) -> str:
         """Create a new quiz session"""
         db = await get_database()
@@ -45,7 +44,7 @@ class QuizSessionRepository:
         return QuizSession(**session_data)
     
     @staticmethod
-    @cache_invalidate_patterns("quiz_session:*")
+    @cache_invalidate("quiz_session:{session_id}")
     async def update(session_id: str, session_update: QuizSessionUpdate) -> Optional[QuizSession]:
         """Update quiz session"""
         db = await get_database()
@@ -15,7 +15,7 @@ from app.services.cache import cached
 class QuizStatsRepository:
     
     @staticmethod
-    @cached("quiz_stats:overall", ttl=600)  # Cache for 10 minutes
+    @cached("quiz_stats:overall", ttl=600, namespace="quiz_stats", lock=True, stale_ttl=600)  # Fresh for 10 minutes, served stale for 10 more while refreshing
     async def get_overall_stats() -> QuizStatsResponse:
         """Get overall quiz statistics"""
         db = await get_database()
@@ -73,7 +73,7 @@ class QuizStatsRepository:
         return topics_with_stats
     
     @staticmethod
-    @cached("quiz_stats:topic:{topic_id}", ttl=300)
+    @cached("quiz_stats:topic:{topic_id}", ttl=300, namespace="quiz_stats", lock=True)
     async def get_topic_stats(topic_id: str) -> TopicStatsResponse:
         """Get statistics for a specific topic"""
         db = await get_database()
@@ -5,18 +5,13 @@ from bson import ObjectId
 
 from app.db.mongodb import get_database
 from app.models.quiz import Topic, TopicCreate, TopicInDB, TopicUpdate
-from app.services.cache import (
-    cache_invalidate,
-    cache_invalidate_patterns,
-    cache_service,
-    cached,
-)
+from app.services.cache import cache_invalidate_namespaces, cache_service, cached
 
 
 class TopicRepository:
     
     @staticmethod
-    @cache_invalidate_patterns("quiz_question:*", "quiz_topic:*", "quiz_stats:*")
+    @cache_invalidate_namespaces("quiz_question", "quiz_topic", "quiz_stats")
     async def create(topic: TopicCreate) -> str:
         """Create a new topic"""
         db = await get_database()
@@ -26,7 +21,7 @@ class TopicRepository:
         return str(result.inserted_id)
 
     @staticmethod
-    @cached("quiz_topic:{topic_id}", ttl=300)  # Cache for 5 minutes
+    @cached("quiz_topic:{topic_id}", ttl=300, namespace="quiz_topic")  # Cache for 5 minutes
     async def get_by_id(topic_id: str) -> Optional[Topic]:
         # Get from database
         db = await get_database()
@@ -41,7 +36,7 @@ class TopicRepository:
         return None
 
     @staticmethod
-    @cached("quiz_topic:list:{skip}:{limit}:{active_only}:{search}", ttl=300)  # Cache for 5 minutes
+    @cached("quiz_topic:list:{skip}:{limit}:{active_only}:{search}", ttl=300, namespace="quiz_topic", lock=True, stale_ttl=300)  # Fresh for 5 minutes, served stale for 5 more while refreshing
     async def get_all(
         skip: int = 0, 
         limit: int = 100, 
@@ -93,7 +88,7 @@ class TopicRepository:
         return topics
 
     @staticmethod
-    @cached("quiz_topic:count:{active_only}:{search}", ttl=300)  # Cache for 5 minutes
+    @cached("quiz_topic:count:{active_only}:{search}", ttl=300, namespace="quiz_topic")  # Cache for 5 minutes
     async def count(active_only: bool = False, search: Optional[str] = None) -> int:
         """Count total topics"""
         db = await get_database()
@@ -107,7 +102,7 @@ class TopicRepository:
         return await db.quiz_topics.count_documents(query_filter)
 
     @staticmethod
-    @cache_invalidate_patterns("quiz_question:*", "quiz_topic:*", "quiz_stats:*")
+    @cache_invalidate_namespaces("quiz_question", "quiz_topic", "quiz_stats")
     async def update(topic_id: str, topic_update: TopicUpdate) -> Optional[Topic]:
         """Update topic"""
         db = await get_database()
@@ -127,7 +122,7 @@ class TopicRepository:
         return None
 
     @staticmethod
-    @cache_invalidate_patterns("quiz_question:*", "quiz_topic:*", "quiz_stats:*")
+    @cache_invalidate_namespaces("quiz_question", "quiz_topic", "quiz_stats")
     async def delete(topic_id: str) -> bool:
         """Delete topic (soft delete by setting is_active=False)"""
         db = await get_database()
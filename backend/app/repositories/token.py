@@ -1,86 +1,258 @@
+"""
+Refresh token store.
+
+Active refresh tokens live in Redis, keyed by a SHA-256 hash of the token,
+and expire natively with the token. Each user has a set of their token hashes
+so every session can be revoked at once. Tokens are rotated on refresh; for a
+short grace period the replaced token can still be rotated into a fresh token,
+so concurrent refreshes (several tabs) do not log the user out. Only the hash
+of its successor is kept, never the successor itself. A replaced token
+presented after its grace period is treated as stolen and every token of its
+user is revoked.
+
+Mongo is only written to when REFRESH_TOKEN_AUDIT_ENABLED is set, as an audit
+trail that stores hashes, never raw tokens.
+"""
+import logging
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 
 from app.core.config import settings
+from app.core.security import token_hash
 from app.db.mongodb import get_database
+from app.db.redis import redis_manager
 from app.models.user import RefreshToken
 from bson import ObjectId
 
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_KEY = "refresh_token:{}"
+USER_REFRESH_TOKENS_KEY = "user_refresh_tokens:{}"
+# Owner of a rotated token, kept for the token's original lifetime to detect reuse
+ROTATED_REFRESH_TOKEN_KEY = "rotated_refresh_token:{}"
+
+# KEYS[1]: token hash key, ARGV[1]: grace period in seconds, ARGV[2]: successor token hash
+# Marks the token as rotated, records its successor and shortens its life to
+# the grace period; a token that was already rotated is returned unchanged, so
+# only the first caller's successor is recorded.
+ROTATE_SCRIPT = """
+local fields = redis.call("HGETALL", KEYS[1])
+if #fields == 0 then
+    return fields
+end
+if redis.call("HGET", KEYS[1], "rotated") ~= "1" then
+    redis.call("HSET", KEYS[1], "rotated", "1", "successor", ARGV[2])
+    redis.call("EXPIRE", KEYS[1], tonumber(ARGV[1]))
+    return redis.call("HGETALL", KEYS[1])
+end
+return fields
+"""
+
 
 class RefreshTokenRepository:
     @staticmethod
-    async def create(user_id: str, token: str, expires_delta: Optional[timedelta] = None) -> str:
-        db = await get_database()
-        
-        # Calculate expiration time
-        if expires_delta:
-            expires_at = datetime.utcnow() + expires_delta
-        else:
-            expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-        
-        # Create refresh token document
-        refresh_token = {
-            "user_id": ObjectId(user_id),
-            "token": token,
-            "expires_at": expires_at,
-            "created_at": datetime.utcnow(),
-            "is_revoked": False
+    def _fields(flat: list) -> Dict[str, str]:
+        return dict(zip(flat[::2], flat[1::2]))
+
+    @staticmethod
+    async def create(
+        user_id: str,
+        token: str,
+        expires_delta: Optional[timedelta] = None,
+        rotated_from: Optional[str] = None
+    ) -> str:
+        """Store a refresh token, optionally noting the hash of the token it replaces. Returns its hash."""
+        expires_delta = expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        created_at = datetime.utcnow()
+        expires_at = created_at + expires_delta
+        digest = token_hash(token)
+        ttl = int(expires_delta.total_seconds())
+
+        fields = {
+            "user_id": user_id,
+            "expires_at": expires_at.isoformat(),
+            "created_at": created_at.isoformat(),
         }
-        
-        result = await db.refresh_tokens.insert_one(refresh_token)
-        return str(result.inserted_id)
-    
+        if rotated_from:
+            fields["rotated_from"] = rotated_from
+        stored = await redis_manager.hash_set(REFRESH_TOKEN_KEY.format(digest), fields, ttl=ttl)
+        if not stored:
+            logger.error(f"Could not store refresh token for user {user_id}")
+        # The set's TTL is only ever extended, so it outlives every token it lists
+        await redis_manager.set_add(USER_REFRESH_TOKENS_KEY.format(user_id), [digest], ttl=ttl)
+
+        if settings.REFRESH_TOKEN_AUDIT_ENABLED:
+            db = await get_database()
+            await db.refresh_token_audit.insert_one({
+                "user_id": ObjectId(user_id),
+                "token_hash": digest,
+                "expires_at": expires_at,
+                "created_at": created_at,
+                "is_revoked": False
+            })
+        return digest
+
     @staticmethod
     async def get_by_token(token: str) -> Optional[RefreshToken]:
-        db = await get_database()
-        token_data = await db.refresh_tokens.find_one({"token": token})
-        
-        if token_data:
-            return RefreshToken(
-                user_id=str(token_data["user_id"]),
-                token=token_data["token"],
-                expires_at=token_data["expires_at"],
-                created_at=token_data["created_at"],
-                is_revoked=token_data["is_revoked"]
-            )
-        return None
-    
+        fields = await redis_manager.hash_get_all(REFRESH_TOKEN_KEY.format(token_hash(token)))
+        if not fields:
+            return None
+        return RefreshToken(
+            user_id=fields["user_id"],
+            token=token,
+            expires_at=datetime.fromisoformat(fields["expires_at"]),
+            created_at=datetime.fromisoformat(fields["created_at"]),
+            is_revoked=False
+        )
+
     @staticmethod
-    async def revoke(token: str) -> bool:
+    async def rotate(
+        token: str,
+        new_token: str,
+        expires_delta: Optional[timedelta] = None
+    ) -> Optional[str]:
+        """
+        Replace a refresh token with new_token.
+        Returns the user ID, or None if the token is not valid. Within the grace
+        period a rotated token can be rotated again, as long as the successor it
+        was first replaced with has not been revoked; after it, reuse revokes all
+        the user's tokens.
+        """
+        digest = token_hash(token)
+        key = REFRESH_TOKEN_KEY.format(digest)
+        fields = await redis_manager.hash_get_all(key)
+        if not fields:
+            if await RefreshTokenRepository._detect_reuse(digest):
+                return None
+            user_id = await RefreshTokenRepository._consume_legacy(token)
+            if user_id is None:
+                return None
+            await RefreshTokenRepository.create(user_id, new_token, expires_delta)
+            return user_id
+
+        user_id = fields["user_id"]
+        if fields.get("rotated") == "1":
+            # A concurrent refresh within the grace period
+            if not await RefreshTokenRepository._successor_alive(fields):
+                return None
+            await RefreshTokenRepository.create(user_id, new_token, expires_delta, rotated_from=digest)
+            return user_id
+
+        new_digest = await RefreshTokenRepository.create(user_id, new_token, expires_delta, rotated_from=digest)
+        result = await redis_manager.run_script(
+            ROTATE_SCRIPT,
+            [key],
+            [settings.REFRESH_TOKEN_ROTATION_GRACE, new_digest]
+        )
+        rotated = RefreshTokenRepository._fields(result) if result else {}
+        if rotated.get("successor") != new_digest:
+            # Revoked meanwhile, or a concurrent refresh rotated it first
+            if not await RefreshTokenRepository._successor_alive(rotated):
+                await RefreshTokenRepository._discard(user_id, new_digest)
+                return None
+            return user_id
+
+        # Remember the owner for the rest of the old token's life, so its reuse
+        # after the grace period is recognised
+        remaining = int((datetime.fromisoformat(fields["expires_at"]) - datetime.utcnow()).total_seconds())
+        if remaining > 0:
+            await redis_manager.set(ROTATED_REFRESH_TOKEN_KEY.format(digest), user_id, ttl=remaining)
+        # The old token stays listed until its grace period is over; the one it
+        # replaced has expired by now
+        if fields.get("rotated_from"):
+            await redis_manager.set_remove(USER_REFRESH_TOKENS_KEY.format(user_id), [fields["rotated_from"]])
+        if settings.REFRESH_TOKEN_AUDIT_ENABLED:
+            await RefreshTokenRepository._audit_revoke({"token_hash": digest})
+        return user_id
+
+    @staticmethod
+    async def _successor_alive(fields: Dict[str, str]) -> bool:
+        """Whether a rotated token's first successor is still valid (not revoked since)."""
+        successor = fields.get("successor")
+        return bool(successor) and await redis_manager.exists(REFRESH_TOKEN_KEY.format(successor))
+
+    @staticmethod
+    async def _discard(user_id: str, digest: str) -> None:
+        """Drop a token that was stored but never handed out."""
+        await redis_manager.delete(REFRESH_TOKEN_KEY.format(digest))
+        await redis_manager.set_remove(USER_REFRESH_TOKENS_KEY.format(user_id), [digest])
+
+    @staticmethod
+    async def _detect_reuse(digest: str) -> bool:
+        """
+        Whether an unknown token was rotated earlier. A rotated token presented
+        after its grace period was most likely stolen, so every token of its
+        user is revoked.
+        """
+        user_id = await redis_manager.get(ROTATED_REFRESH_TOKEN_KEY.format(digest))
+        if not user_id:
+            return False
+        logger.warning(f"Rotated refresh token reused for user {user_id}, revoking all their refresh tokens")
+        await RefreshTokenRepository.revoke_all_for_user(user_id)
+        return True
+
+    @staticmethod
+    async def _consume_legacy(token: str) -> Optional[str]:
+        """Accept (once) a still-valid token issued while tokens were stored in Mongo."""
         db = await get_database()
-        result = await db.refresh_tokens.update_one(
-            {"token": token},
+        legacy = await db.refresh_tokens.find_one_and_update(
+            {"token": token, "is_revoked": False, "expires_at": {"$gt": datetime.utcnow()}},
             {"$set": {"is_revoked": True}}
         )
-        return result.modified_count > 0
-    
+        return str(legacy["user_id"]) if legacy else None
+
+    @staticmethod
+    async def revoke(token: str) -> bool:
+        digest = token_hash(token)
+        key = REFRESH_TOKEN_KEY.format(digest)
+        fields = await redis_manager.hash_get_all(key)
+        if not fields:
+            return False
+
+        await redis_manager.delete(key)
+        await redis_manager.set_remove(USER_REFRESH_TOKENS_KEY.format(fields["user_id"]), [digest])
+        if settings.REFRESH_TOKEN_AUDIT_ENABLED:
+            await RefreshTokenRepository._audit_revoke({"token_hash": digest})
+        return True
+
     @staticmethod
     async def revoke_all_for_user(user_id: str) -> int:
+        set_key = USER_REFRESH_TOKENS_KEY.format(user_id)
+        digests = await redis_manager.set_members(set_key) or []
+        revoked = await redis_manager.delete_many([REFRESH_TOKEN_KEY.format(digest) for digest in digests])
+        await redis_manager.delete(set_key)
+
+        if settings.REFRESH_TOKEN_AUDIT_ENABLED:
+            await RefreshTokenRepository._audit_revoke({"user_id": ObjectId(user_id)})
+        # Tokens issued before the move to Redis
         db = await get_database()
-        result = await db.refresh_tokens.update_many(
-            {"user_id": ObjectId(user_id)},
+        await db.refresh_tokens.update_many(
+            {"user_id": ObjectId(user_id), "is_revoked": False},
             {"$set": {"is_revoked": True}}
         )
-        return result.modified_count
-    
+        return revoked
+
+    @staticmethod
+    async def _audit_revoke(query: dict) -> None:
+        db = await get_database()
+        await db.refresh_token_audit.update_many(
+            {**query, "is_revoked": False},
+            {"$set": {"is_revoked": True, "revoked_at": datetime.utcnow()}}
+        )
+
     @staticmethod
     async def cleanup_expired_tokens() -> int:
-        """Remove tokens that have expired to keep the database clean"""
+        """
+        Remove expired tokens left in the legacy Mongo store. Redis entries expire
+        on their own and the audit collection has a TTL index.
+        """
         db = await get_database()
         result = await db.refresh_tokens.delete_many({
             "expires_at": {"$lt": datetime.utcnow()}
         })
         return result.deleted_count
-    
+
     @staticmethod
     async def is_token_valid(token: str) -> bool:
         """Check if a token is valid (exists, not expired, not revoked)"""
-        refresh_token = await RefreshTokenRepository.get_by_token(token)
-        if not refresh_token:
-            return False
-            
-        current_time = datetime.utcnow()
-        if refresh_token.expires_at < current_time or refresh_token.is_revoked:
-            return False
-            
-        return True
+        return await redis_manager.exists(REFRESH_TOKEN_KEY.format(token_hash(token)))
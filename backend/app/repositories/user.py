@@ -1,11 +1,17 @@
+import base64
+import re
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from bson import ObjectId
 
-from app.core.security import get_password_hash, verify_password
+from app.core.config import settings
+from app.core.security import password_hasher
 from app.db.mongodb import get_database
 from app.models.user import (
+    CustomerDirectoryPage,
+    CustomerOrderStats,
+    CustomerSummary,
     FirebaseUserCreate,
     PyObjectId,
     User,
@@ -19,6 +25,25 @@ from app.models.user import (
 )
 from app.services.cache import cache_service, cached
 
+PROFILE_VERSION_KEY = "user_profile_version:{}"
+
+DEFAULT_ROLE = "customer"
+
+
+def encode_directory_cursor(created_at: Optional[datetime], user_id: ObjectId) -> str:
+    """Opaque keyset cursor for the customer directory."""
+    created = created_at.isoformat() if created_at else ""
+    return base64.urlsafe_b64encode(f"{created}|{user_id}".encode()).decode()
+
+
+def decode_directory_cursor(cursor: str) -> Tuple[Optional[datetime], ObjectId]:
+    """Raises ValueError for a cursor that was not made by encode_directory_cursor."""
+    try:
+        created_at, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return (datetime.fromisoformat(created_at) if created_at else None), ObjectId(user_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
 
 class UserRepository:
     @staticmethod
@@ -31,20 +56,16 @@ class UserRepository:
         
         # Create the user
         user_dict = user.model_dump()
-        hashed_password = get_password_hash(user_dict.pop("password"))
+        hashed_password = await password_hasher.hash(user_dict.pop("password"))
         user_dict["email"] = user_dict["email"].lower()
         user_dict["hashed_password"] = hashed_password
         user_dict["created_at"] = datetime.utcnow()
         user_dict["email_verified"] = False  # Default for regular users
+        user_dict["role"] = DEFAULT_ROLE
+        user_dict["full_name_lower"] = (user_dict.get("full_name") or "").lower()
         
         result = await db.users.insert_one(user_dict)
-        user_id = result.inserted_id
-        
-        # Create default role for the user
-        role = UserRoleCreate(user_id=str(user_id), role="customer")
-        await UserRoleRepository.create(role)
-        
-        return str(user_id)
+        return str(result.inserted_id)
     
     @staticmethod
     async def create_firebase_user(firebase_user: FirebaseUserCreate) -> str:
@@ -70,39 +91,83 @@ class UserRepository:
         user_dict = firebase_user.model_dump()
         user_dict["email"] = user_dict["email"].lower()
         user_dict["created_at"] = datetime.utcnow()
+        user_dict["role"] = DEFAULT_ROLE
+        user_dict["full_name_lower"] = (user_dict.get("full_name") or "").lower()
         # No hashed_password for Firebase users
         
         result = await db.users.insert_one(user_dict)
-        user_id = result.inserted_id
-        # Create default role for the user
-        role = UserRoleCreate(user_id=str(user_id), role="customer")
-        await UserRoleRepository.create(role)
+        return str(result.inserted_id)
+    
+    @staticmethod
+    async def _role_of(user: dict) -> str:
+        """
+        Role embedded in a user document. Users the role migration has not
+        reached yet still have it in user_roles; it is copied over on first read.
+        """
+        role = user.get("role")
+        if role is not None:
+            return role
         
-        return str(user_id)
+        db = await get_database()
+        legacy_role = await db.user_roles.find_one({"user_id": user["_id"]})
+        role = legacy_role["role"] if legacy_role else DEFAULT_ROLE
+        await db.users.update_one(
+            {"_id": user["_id"], "role": {"$exists": False}},
+            {"$set": {"role": role}}
+        )
+        user["role"] = role
+        return role
+    
+    @staticmethod
+    async def _profile_from_doc(user: dict) -> UserProfile:
+        return UserProfile(
+            id=str(user["_id"]),
+            email=user["email"],
+            full_name=user.get("full_name"),
+            phone=user.get("phone"),
+            avatar_url=user.get("avatar_url"),
+            firebase_uid=user.get("firebase_uid"),
+            email_verified=user.get("email_verified", False),
+            role=await UserRepository._role_of(user)
+        )
+    
+    @staticmethod
+    async def _invalidate(user_id: str) -> None:
+        """Drop every cached view of a user after their profile or role changed."""
+        await cache_service.invalidate_user_profile(user_id)
+        await cache_service.delete(PROFILE_VERSION_KEY.format(user_id))
     
     @staticmethod
     async def get_by_id(user_id: str) -> Optional[User]:
-        # Try to get from cache first
-        cached_user = await cache_service.get_user_profile(user_id)
-        if cached_user:
-            return User(**cached_user)
-          # Get from database
-        db = await get_database()
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
-        if user:
-            user_obj = User(
-                **{k: v for k, v in user.items() if k not in ['hashed_password', '_id', 'firebase_uid', 'email_verified']}, 
-                id=str(user["_id"]),
-                firebase_uid=user.get("firebase_uid"),
-                email_verified=user.get("email_verified", False)
-            )
-            
-            # Cache the user profile
-            await cache_service.set_user_profile(user_id, user_obj.model_dump())
-            
-            return user_obj
+        profile = await UserRepository.get_profile(user_id)
+        if profile:
+            return User(**profile.model_dump())
         return None
     
+    @staticmethod
+    async def get_many(user_ids: List[str]) -> Dict[str, User]:
+        """Get several users by ID: one cache round trip, then one query for the misses."""
+        user_ids = [uid for uid in dict.fromkeys(user_ids) if ObjectId.is_valid(uid)]
+        if not user_ids:
+            return {}
+        
+        cached_users = await cache_service.get_user_profiles(user_ids)
+        # Entries cached before roles were embedded are refetched
+        users = {uid: User(**data) for uid, data in cached_users.items() if "role" in data}
+        
+        missing = [uid for uid in user_ids if uid not in users]
+        if missing:
+            db = await get_database()
+            cursor = db.users.find({"_id": {"$in": [ObjectId(uid) for uid in missing]}})
+            fetched = {}
+            async for user in cursor:
+                profile = await UserRepository._profile_from_doc(user)
+                users[profile.id] = User(**profile.model_dump())
+                fetched[profile.id] = profile.model_dump()
+            await cache_service.set_user_profiles(fetched)
+        
+        return users
+    
     @staticmethod
     async def get_by_email(email: str) -> Optional[UserInDB]:
         db = await get_database()
@@ -138,9 +203,20 @@ class UserRepository:
             )
         
         # For regular users, verify password
-        if not user.hashed_password or not verify_password(password, user.hashed_password):
+        if not user.hashed_password:
+            return None
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
         
+        # Upgrade hashes made with an outdated bcrypt cost while the plain password is at hand
+        if new_hash:
+            db = await get_database()
+            await db.users.update_one(
+                {"_id": user.id, "hashed_password": user.hashed_password},
+                {"$set": {"hashed_password": new_hash}}
+            )
+        
         return User(
             id=str(user.id),
             email=user.email,
@@ -171,23 +247,26 @@ class UserRepository:
         db = await get_database()
         update_data = {k: v for k, v in user_update.model_dump(exclude_unset=True).items() if v is not None}
         update_data["updated_at"] = datetime.utcnow()
+        if "full_name" in update_data:
+            # Lowercased copy backs the indexed name prefix search
+            update_data["full_name_lower"] = update_data["full_name"].lower()
         
         if update_data:
+            # Bumping the version retires profile claims in access tokens issued before
             await db.users.update_one(
                 {"_id": ObjectId(user_id)},
-                {"$set": update_data}
+                {"$set": update_data, "$inc": {"profile_version": 1}}
             )
         
         # Invalidate user cache
-        await cache_service.invalidate_user_profile(user_id)
-        await cache_service.invalidate_user_session(user_id)
+        await UserRepository._invalidate(user_id)
         
         return await UserRepository.get_by_id(user_id)
     
     @staticmethod
     async def update_password(user_id: str, new_password: str) -> bool:
         db = await get_database()
-        hashed_password = get_password_hash(new_password)
+        hashed_password = await password_hasher.hash(new_password)
         result = await db.users.update_one(
             {"_id": ObjectId(user_id)},
             {"$set": {"hashed_password": hashed_password, "updated_at": datetime.utcnow()}}
@@ -210,13 +289,103 @@ class UserRepository:
             ))
         return users
     
+    @staticmethod
+    async def get_profiles(skip: int = 0, limit: int = 100) -> List[UserProfile]:
+        """Page of user profiles, roles included, from a single query."""
+        db = await get_database()
+        # Sorted so pages do not shift or overlap between requests
+        cursor = db.users.find().sort([("created_at", -1), ("_id", -1)]).skip(skip).limit(limit)
+        return [await UserRepository._profile_from_doc(doc) async for doc in cursor]
+    
+    @staticmethod
+    async def get_customer_directory(
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        search: Optional[str] = None,
+        cached_stats: bool = False
+    ) -> CustomerDirectoryPage:
+        """
+        Page of users, newest first, with their role and order stats.
+
+        Pages are keyed on (created_at, _id) rather than skipped, so deep pages
+        cost the same as the first. Users without a created_at (the initializer
+        backfills it) sort last, as MongoDB orders missing values, and page on
+        _id alone. search matches a prefix of the email or
+        (case-insensitively) the full name, using their indexes. Order stats
+        come from the same aggregation, or with cached_stats from the per-user
+        cached summary.
+        """
+        # Imported here: the order repositories import this module
+        from app.repositories.order import ORDER_STATS_FIELDS, OrderRepository
+        
+        conditions = []
+        if cursor:
+            created_at, last_id = decode_directory_cursor(cursor)
+            if created_at is None:
+                conditions.append({"created_at": None, "_id": {"$lt": last_id}})
+            else:
+                conditions.append({"$or": [
+                    {"created_at": {"$lt": created_at}},
+                    {"created_at": created_at, "_id": {"$lt": last_id}},
+                    {"created_at": None}
+                ]})
+        if search and search.strip():
+            # Anchored, case-sensitive regexes become index range scans
+            prefix = "^" + re.escape(search.strip().lower())
+            conditions.append({"$or": [
+                {"email": {"$regex": prefix}},
+                {"full_name_lower": {"$regex": prefix}}
+            ]})
+        
+        pipeline = [
+            {"$match": {"$and": conditions} if conditions else {}},
+            {"$sort": {"created_at": -1, "_id": -1}},
+            {"$limit": limit + 1},
+            {"$project": {"hashed_password": 0}}
+        ]
+        if not cached_stats:
+            pipeline.append({"$lookup": {
+                "from": "orders",
+                "localField": "_id",
+                "foreignField": "user_id",
+                "pipeline": [{"$group": {"_id": None, **ORDER_STATS_FIELDS}}],
+                "as": "order_stats"
+            }})
+        
+        db = await get_database()
+        docs = await db.users.aggregate(pipeline).to_list(length=limit + 1)
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        
+        if cached_stats:
+            stats = await OrderRepository.get_customer_stats([str(doc["_id"]) for doc in docs])
+        else:
+            stats = {str(doc["_id"]): (doc["order_stats"] or [{}])[0] for doc in docs}
+        
+        customers = []
+        for doc in docs:
+            profile = await UserRepository._profile_from_doc(doc)
+            customers.append(CustomerSummary(
+                **profile.model_dump(),
+                created_at=doc.get("created_at"),
+                order_stats=CustomerOrderStats(**{
+                    k: v for k, v in stats.get(profile.id, {}).items() if k in CustomerOrderStats.model_fields
+                })
+            ))
+        
+        next_cursor = None
+        if has_more and docs:
+            next_cursor = encode_directory_cursor(docs[-1].get("created_at"), docs[-1]["_id"])
+        return CustomerDirectoryPage(data=customers, next_cursor=next_cursor, has_more=has_more)
+    
     @staticmethod
     async def delete(user_id: str) -> bool:
         db = await get_database()
         result = await db.users.delete_one({"_id": ObjectId(user_id)})
         if result.deleted_count > 0:
-            # Also delete any user roles
+            # Also delete any roles left from before roles were embedded
             await db.user_roles.delete_many({"user_id": ObjectId(user_id)})
+            await UserRepository._invalidate(user_id)
             return True
         return False
     
@@ -225,86 +394,83 @@ class UserRepository:
         db = await get_database()
         return await db.users.count_documents({})
     
+    @staticmethod
+    async def get_profile_version(user_id: str) -> Optional[int]:
+        """
+        Current profile version of a user (None if the user does not exist).
+        Access tokens carry the version their profile claims were taken from.
+        """
+        key = PROFILE_VERSION_KEY.format(user_id)
+        version = await cache_service.get(key)
+        if version is not None:
+            return int(version)
+        
+        db = await get_database()
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, {"profile_version": 1})
+        if not user:
+            return None
+        version = user.get("profile_version", 0)
+        await cache_service.set(key, version, ttl=settings.CACHE_TTL_USER_SESSIONS)
+        return version
+    
+    @staticmethod
+    async def bump_profile_version(user_id: str) -> None:
+        """Mark profile claims in previously issued access tokens as stale."""
+        db = await get_database()
+        await db.users.update_one({"_id": ObjectId(user_id)}, {"$inc": {"profile_version": 1}})
+        await cache_service.delete(PROFILE_VERSION_KEY.format(user_id))
+    
     @staticmethod
     async def get_profile(user_id: str) -> Optional[UserProfile]:
+        # Try to get from cache first; entries cached before roles were embedded are refetched
+        cached_profile = await cache_service.get_user_profile(user_id)
+        if cached_profile and "role" in cached_profile:
+            return UserProfile(**cached_profile)
+        
+        # Get from database
         db = await get_database()
         user = await db.users.find_one({"_id": ObjectId(user_id)})
         if not user:
             return None
         
-        # Get user role
-        role = await UserRoleRepository.get_by_user_id(user_id)
-        role_name = role.role if role else "customer"
-        
-        return UserProfile(
-            id=str(user["_id"]),
-            email=user["email"],
-            full_name=user.get("full_name"),
-            phone=user.get("phone"),
-            avatar_url=user.get("avatar_url"),
-            firebase_uid=user.get("firebase_uid"),
-            email_verified=user.get("email_verified", False),
-            role=role_name
-        )
+        profile = await UserRepository._profile_from_doc(user)
+        # Cache the user profile
+        await cache_service.set_user_profile(user_id, profile.model_dump())
+        return profile
 
 
 class UserRoleRepository:
+    """Roles are embedded in the user document; a role's ID is its user's ID."""
+    
     @staticmethod
     async def create(user_role: UserRoleCreate) -> str:
-        db = await get_database()
-        
-        # Check if a role already exists for this user
-        existing_role = await db.user_roles.find_one({"user_id": ObjectId(user_role.user_id)})
-        if existing_role:
-            # If exists, update it
-            result = await db.user_roles.update_one(
-                {"user_id": ObjectId(user_role.user_id)},
-                {"$set": {"role": user_role.role}}
-            )
-            return str(existing_role["_id"])
-        
-        # Otherwise create a new role
-        role_dict = user_role.model_dump()
-        role_dict["user_id"] = ObjectId(role_dict["user_id"])
-        role_dict["created_at"] = datetime.utcnow()
-        
-        result = await db.user_roles.insert_one(role_dict)
-        return str(result.inserted_id)
+        await UserRoleRepository.update(user_role.user_id, user_role.role)
+        return user_role.user_id
     
     @staticmethod
     async def get_by_id(role_id: str) -> Optional[UserRole]:
-        db = await get_database()
-        role = await db.user_roles.find_one({"_id": ObjectId(role_id)})
-        if role:
-            return UserRole(
-                id=str(role["_id"]),
-                user_id=str(role["user_id"]),
-                role=role["role"]
-            )
-        return None
+        return await UserRoleRepository.get_by_user_id(role_id)
     
     @staticmethod
     async def get_by_user_id(user_id: str) -> Optional[UserRole]:
-        db = await get_database()
-        role = await db.user_roles.find_one({"user_id": ObjectId(user_id)})
-        if role:
-            return UserRole(
-                id=str(role["_id"]),
-                user_id=str(role["user_id"]),
-                role=role["role"]
-            )
+        profile = await UserRepository.get_profile(user_id)
+        if profile:
+            return UserRole(id=profile.id, user_id=profile.id, role=profile.role)
         return None
     
     @staticmethod
     async def update(user_id: str, role: str) -> bool:
         db = await get_database()
-        result = await db.user_roles.update_one(
-            {"user_id": ObjectId(user_id)},
-            {"$set": {"role": role}}
+        # Bumping the version retires role claims in access tokens issued before
+        result = await db.users.update_one(
+            {"_id": ObjectId(user_id), "role": {"$ne": role}},
+            {"$set": {"role": role, "updated_at": datetime.utcnow()}, "$inc": {"profile_version": 1}}
         )
+        if result.modified_count > 0:
+            await UserRepository._invalidate(user_id)
         return result.modified_count > 0
     
     @staticmethod
     async def is_admin(user_id: str) -> bool:
-        role = await UserRoleRepository.get_by_user_id(user_id)
-        return role is not None and role.role == "admin"
+        profile = await UserRepository.get_profile(user_id)
+        return profile is not None and profile.role == "admin"
@@ -5,8 +5,9 @@ import uuid
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-import requests
+import httpx
 from app.core.config import settings
+from app.services.http_client import http_client
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -41,7 +42,7 @@ class AamarPayService:
         random_suffix = str(uuid.uuid4())[:8]
         return f"TXN{timestamp}{random_suffix}"
     
-    def create_payment(
+    async def create_payment(
         self,
         order_id: str,
         amount: float,
@@ -110,11 +111,11 @@ class AamarPayService:
             logger.info(f"Sending payment request to AamarPay for order {order_id}")
             logger.debug(f"Payload: {json.dumps(payload, indent=2)}")
             
-            response = requests.post(
+            # Only retried if the gateway could not be reached, so a payment is never created twice
+            response = await http_client.post(
                 self.get_payment_url(), 
                 headers=headers,
-                json=payload,  # Use json parameter instead of data
-                timeout=30
+                json=payload  # Use json parameter instead of data
             )
             
             logger.info(f"AamarPay response status: {response.status_code}")
@@ -158,7 +159,7 @@ class AamarPayService:
                     "raw_response": response.text
                 }
                 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             return {
                 "success": False,
                 "error": f"Network error: {str(e)}"
@@ -231,7 +232,7 @@ class AamarPayService:
                 "payment_status": "failed"
             }
     
-    def check_payment_status(self, transaction_id: str) -> Dict[str, Any]:
+    async def check_payment_status(self, transaction_id: str) -> Dict[str, Any]:
         """
         Check payment status using AamarPay API
         
@@ -252,7 +253,8 @@ class AamarPayService:
                 "tran_id": transaction_id
             }
             
-            response = requests.post(status_url, data=payload, timeout=30)
+            # A status check is read-only, so it is safe to retry
+            response = await http_client.post(status_url, data=payload, retry_unsafe=True)
             
             if response.status_code == 200:
                 try:
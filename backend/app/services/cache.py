@@ -2,22 +2,60 @@
 Cache service for managing application-level caching with Redis.
 Provides decorators and utility functions for common caching patterns.
 """
+import asyncio
 import inspect
 import json
 import logging
+import string
+import time
+import typing
+import uuid
 from functools import wraps
-from typing import Any, Callable, Optional, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from pydantic import BaseModel, TypeAdapter
 
 from app.core.config import settings
-from app.db.redis import get_redis
+from app.db.redis import get_redis, redis_manager
+from app.services.cache_metrics import cache_metrics
+from app.services.local_cache import LocalCache
 
 logger = logging.getLogger(__name__)
 
+GENERATION_KEY_PREFIX = "cache_gen:"
+LOCK_KEY_PREFIX = "lock:"
+
+# Envelope fields for stale-while-revalidate entries
+SWR_FRESH_UNTIL = "__swr_fresh_until__"
+SWR_VALUE = "__swr_value__"
+
+# Value stored in place of an entity that is known not to exist
+TOMBSTONE_FIELD = "__not_found__"
+TOMBSTONE = {TOMBSTONE_FIELD: True}
+
 class CacheService:
     """High-level cache service with application-specific functionality."""
     
     def __init__(self):
         self.redis_manager = None
+        # In-process tier for near-static key families; kept coherent across
+        # workers through Redis pub/sub invalidation messages.
+        self.local_cache = LocalCache(
+            max_entries=settings.CACHE_L1_MAX_ENTRIES,
+            default_ttl=settings.CACHE_L1_TTL_SECONDS
+        )
+        self.local_prefixes = tuple(
+            prefix.strip() for prefix in settings.CACHE_L1_PREFIXES.split(",") if prefix.strip()
+        )
+        self.instance_id = uuid.uuid4().hex
+        self._listener_task: Optional[asyncio.Task] = None
+        # Namespace generation counters, cached locally for a few seconds
+        self._generations = LocalCache(
+            max_entries=256,
+            default_ttl=settings.CACHE_GENERATION_LOCAL_TTL
+        )
+        if cache_metrics.enabled:
+            redis_manager.add_command_listener(cache_metrics.record_redis)
     
     async def _get_redis(self):
         """Get Redis manager instance."""
@@ -25,16 +63,154 @@ class CacheService:
             self.redis_manager = await get_redis()
         return self.redis_manager
     
+    def _is_local(self, key: str) -> bool:
+        """Check whether a key belongs to a family served from the in-process tier."""
+        return settings.CACHE_L1_ENABLED and key.startswith(self.local_prefixes)
+    
+    # Cross-worker L1 invalidation
+    async def _publish_invalidation(
+        self,
+        keys: Optional[list] = None,
+        patterns: Optional[list] = None,
+        namespaces: Optional[list] = None
+    ) -> None:
+        """Tell other workers to evict keys/patterns/namespace generations from their in-process tier."""
+        if not settings.CACHE_L1_ENABLED:
+            return
+        
+        keys = [key for key in (keys or []) if self._is_local(key)]
+        patterns = list(patterns or [])
+        namespaces = list(namespaces or [])
+        if not keys and not patterns and not namespaces:
+            return
+        
+        redis = await self._get_redis()
+        message = json.dumps({
+            "origin": self.instance_id,
+            "keys": keys,
+            "patterns": patterns,
+            "namespaces": namespaces
+        })
+        await redis.publish(settings.CACHE_INVALIDATION_CHANNEL, message)
+    
+    def _handle_invalidation(self, raw_message: str) -> None:
+        """Apply an invalidation message received from another worker."""
+        try:
+            message = json.loads(raw_message)
+        except (TypeError, json.JSONDecodeError):
+            logger.warning(f"Ignoring malformed cache invalidation message: {raw_message!r}")
+            return
+        
+        if message.get("origin") == self.instance_id:
+            return
+        
+        self.local_cache.delete_many(message.get("keys", []))
+        for pattern in message.get("patterns", []):
+            self.local_cache.delete_pattern(pattern)
+        for namespace in message.get("namespaces", []):
+            self._generations.delete(namespace)
+            self.local_cache.delete_pattern(f"{namespace}:*")
+    
+    async def _listen_for_invalidations(self) -> None:
+        """Consume invalidation messages, resubscribing if the connection drops."""
+        redis = await self._get_redis()
+        while True:
+            try:
+                async for raw_message in redis.subscribe(settings.CACHE_INVALIDATION_CHANNEL):
+                    self._handle_invalidation(raw_message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Subscription dropped; anything published meanwhile was missed
+                logger.warning(f"Cache invalidation listener error: {e}")
+                self.local_cache.clear()
+            
+            await asyncio.sleep(5)
+    
+    async def start_invalidation_listener(self) -> None:
+        """Start the background pub/sub listener that keeps the L1 tier coherent."""
+        if not settings.CACHE_L1_ENABLED or self._listener_task:
+            return
+        self._listener_task = asyncio.create_task(self._listen_for_invalidations())
+        logger.info("Cache invalidation listener started")
+    
+    async def stop_invalidation_listener(self) -> None:
+        """Stop the background pub/sub listener."""
+        if not self._listener_task:
+            return
+        self._listener_task.cancel()
+        try:
+            await self._listener_task
+        except asyncio.CancelledError:
+            pass
+        self._listener_task = None
+        logger.info("Cache invalidation listener stopped")
+    
+    # Namespace generations
+    @staticmethod
+    def _new_generation() -> int:
+        """
+        A generation no earlier key can have used: the current time in
+        microseconds. Counters may be evicted under allkeys-lru, so they are
+        never restarted from a number that old entries were written under.
+        """
+        return time.time_ns() // 1000
+    
+    async def get_generation(self, namespace: str) -> int:
+        """Get the current generation of a key namespace."""
+        generation = self._generations.get(namespace)
+        if generation is not None:
+            return generation
+        
+        redis = await self._get_redis()
+        key = f"{GENERATION_KEY_PREFIX}{namespace}"
+        value = await redis.get(key)
+        if value is None and redis.is_available:
+            # First use, or the counter was evicted: start a new generation
+            generation = self._new_generation()
+            if not await redis.set_if_absent(key, str(generation)):
+                value = await redis.get(key)
+        if value is not None:
+            generation = int(value)
+        if generation is None or not redis.is_available:
+            # Don't pin a guessed generation while Redis is unreachable
+            return generation or 0
+        self._generations.set(namespace, generation)
+        return generation
+    
+    async def versioned_key(self, namespace: str, key: str) -> str:
+        """
+        Fold the namespace generation into a key.
+        "quiz_topic:list:0:100" becomes "quiz_topic:g<gen>:list:0:100".
+        """
+        generation = await self.get_generation(namespace)
+        prefix = f"{namespace}:"
+        rest = key[len(prefix):] if key.startswith(prefix) else key
+        return f"{prefix}g{generation}:{rest}"
+    
+    async def bump_namespaces(self, *namespaces: str) -> None:
+        """
+        Invalidate every key in the given namespaces in O(1) by moving them to a
+        new generation. Entries under old generations expire via their TTL.
+        """
+        redis = await self._get_redis()
+        for namespace in namespaces:
+            generation = self._new_generation()
+            if await redis.set(f"{GENERATION_KEY_PREFIX}{namespace}", str(generation)):
+                self._generations.set(namespace, generation)
+            else:
+                self._generations.delete(namespace)
+            self.local_cache.delete_pattern(f"{namespace}:*")
+        await self._publish_invalidation(namespaces=list(namespaces))
+    
     # Product caching methods
     async def get_product(self, product_id: str) -> Optional[dict]:
         """Get cached product by ID."""
-        redis = await self._get_redis()
-        return await redis.get_json(f"product:{product_id}")
+        return await self.get(f"product:{product_id}")
     
     async def set_product(self, product_id: str, product_data: dict) -> bool:
         """Cache product data."""
-        redis = await self._get_redis()
-        return await redis.set(
+        return await self.set(
             f"product:{product_id}", 
             product_data, 
             ttl=settings.CACHE_TTL_PRODUCTS
@@ -42,60 +218,79 @@ class CacheService:
     
     async def invalidate_product(self, product_id: str) -> bool:
         """Remove product from cache."""
-        redis = await self._get_redis()
-        return await redis.delete(f"product:{product_id}")
+        return await self.delete(f"product:{product_id}")
     
-    async def get_products_list(self, cache_key: str) -> Optional[list]:
-        """Get cached products list (for pagination, filtering, etc.)."""
-        redis = await self._get_redis()
-        return await redis.get_json(f"products:{cache_key}")
+    async def get_products(self, product_ids: List[str]) -> Dict[str, dict]:
+        """Get several cached products in one round trip, keyed by product ID."""
+        cached = await self.get_many([f"product:{product_id}" for product_id in product_ids])
+        return {key[len("product:"):]: value for key, value in cached.items()}
     
-    async def set_products_list(self, cache_key: str, products_data: list) -> bool:
-        """Cache products list."""
-        redis = await self._get_redis()
-        return await redis.set(
-            f"products:{cache_key}", 
+    async def set_products(self, products: Dict[str, dict]) -> bool:
+        """Cache several products, keyed by product ID."""
+        return await self.set_many(
+            {f"product:{product_id}": data for product_id, data in products.items()},
+            ttl=settings.CACHE_TTL_PRODUCTS
+        )
+    
+    async def get_products_list(self, cache_key: str) -> Optional[Union[list, int]]:
+        """Get cached products list or count (for pagination, filtering, etc.)."""
+        return await self.get(await self.versioned_key("products", cache_key))
+    
+    async def set_products_list(self, cache_key: str, products_data: Union[list, int]) -> bool:
+        """Cache products list or count."""
+        return await self.set(
+            await self.versioned_key("products", cache_key), 
             products_data, 
             ttl=settings.CACHE_TTL_PRODUCTS
         )
     
+    async def invalidate_products_lists(self) -> None:
+        """Invalidate every cached product list, search and count."""
+        await self.bump_namespaces("products")
+    
     async def invalidate_all_products(self) -> int:
         """Invalidate all product-related cache entries."""
-        redis = await self._get_redis()
-        count = await redis.delete_pattern("product:*")
-        count += await redis.delete_pattern("products:*")
-        return count
-    
-    # User session caching
-    async def get_user_session(self, user_id: str) -> Optional[dict]:
-        """Get cached user session data."""
-        redis = await self._get_redis()
-        return await redis.get_json(f"user_session:{user_id}")
+        await self.invalidate_products_lists()
+        return await self.delete_patterns("product:*")
     
-    async def set_user_session(self, user_id: str, session_data: dict) -> bool:
-        """Cache user session data."""
+    # User profile caching
+    async def get_user_profile(self, user_id: str) -> Optional[dict]:
+        """Get cached user profile."""
+        key = f"user_profile:{user_id}"
         redis = await self._get_redis()
-        return await redis.set(
-            f"user_session:{user_id}", 
-            session_data, 
-            ttl=settings.CACHE_TTL_USER_SESSIONS
-        )
+        profile = await redis.get_value(key)
+        if profile is None:
+            cache_metrics.record_miss(key)
+        else:
+            cache_metrics.record_hit(key)
+        return profile
     
-    async def invalidate_user_session(self, user_id: str) -> bool:
-        """Remove user session from cache."""
+    async def get_user_profiles(self, user_ids: List[str]) -> Dict[str, dict]:
+        """Get several cached user profiles in one round trip, keyed by user ID."""
         redis = await self._get_redis()
-        return await redis.delete(f"user_session:{user_id}")
+        keys = [f"user_profile:{user_id}" for user_id in user_ids]
+        values = await redis.get_values(keys)
+        profiles = {}
+        for user_id, key, value in zip(user_ids, keys, values):
+            if value is None:
+                cache_metrics.record_miss(key)
+            else:
+                cache_metrics.record_hit(key)
+                profiles[user_id] = value
+        return profiles
     
-    # User profile caching
-    async def get_user_profile(self, user_id: str) -> Optional[dict]:
-        """Get cached user profile."""
+    async def set_user_profiles(self, profiles: Dict[str, dict]) -> bool:
+        """Cache several user profiles, keyed by user ID."""
         redis = await self._get_redis()
-        return await redis.get_json(f"user_profile:{user_id}")
+        return await redis.set_values(
+            {f"user_profile:{user_id}": data for user_id, data in profiles.items()},
+            ttl=settings.CACHE_TTL_SECONDS
+        )
     
     async def set_user_profile(self, user_id: str, profile_data: dict) -> bool:
         """Cache user profile data."""
         redis = await self._get_redis()
-        return await redis.set(
+        return await redis.set_value(
             f"user_profile:{user_id}", 
             profile_data, 
             ttl=settings.CACHE_TTL_SECONDS
@@ -127,31 +322,177 @@ class CacheService:
         return current <= limit, current
     
     # General caching with TTL
-    async def get(self, key: str) -> Optional[Union[str, dict, list]]:
-        """Get value from cache."""
+    async def _get_raw(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Get the stored value, checking the in-process tier first for eligible keys.
+        Returns (value, served_from_local_tier).
+        """
+        is_local = self._is_local(key)
+        if is_local:
+            result = self.local_cache.get(key)
+            if result is not None:
+                return result, True
+        
         redis = await self._get_redis()
-        # Try to get as JSON first, then as string
-        result = await redis.get_json(key)
+        # Near-static families already tolerate L1 staleness, so replicas may serve them
+        result = await redis.get_value(key, stale_ok=is_local)
+        
+        if is_local and result is not None:
+            self.local_cache.set(key, result)
+        return result, False
+    
+    async def get(self, key: str) -> Optional[Union[str, dict, list]]:
+        """Get value from cache (stale-while-revalidate entries are returned even if stale)."""
+        value, _ = await self.get_swr(key)
+        return value
+    
+    async def get_swr(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Get value from cache along with whether it is past its fresh TTL.
+        Only entries written with stale_ttl can be stale. Tombstones read as None.
+        """
+        value, is_stale, _ = await self._lookup(key)
+        return value, is_stale
+    
+    async def get_entry(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Get value from cache along with whether the key holds a not-found tombstone,
+        so callers can skip the database for entities known to be missing.
+        """
+        value, _, is_tombstone = await self._lookup(key)
+        return value, is_tombstone
+    
+    async def _lookup(self, key: str) -> Tuple[Optional[Any], bool, bool]:
+        """Returns (value, is_stale, is_tombstone) and records metrics for the lookup."""
+        result, from_local = await self._get_raw(key)
         if result is None:
-            result = await redis.get(key)
-        return result
+            cache_metrics.record_miss(key)
+            return None, False, False
+        if self._is_tombstone(result):
+            cache_metrics.record_negative_hit(key)
+            return None, False, True
+        
+        is_stale = False
+        if isinstance(result, dict) and SWR_FRESH_UNTIL in result:
+            is_stale = result[SWR_FRESH_UNTIL] <= time.time()
+            result = result.get(SWR_VALUE)
+        cache_metrics.record_hit(key, local=from_local, stale=is_stale)
+        return result, is_stale, False
+    
+    @staticmethod
+    def _is_tombstone(value: Any) -> bool:
+        return isinstance(value, dict) and value.get(TOMBSTONE_FIELD) is True
+    
+    async def set_tombstone(self, key: str, ttl: Optional[int] = None) -> bool:
+        """Remember for a short time that the entity behind key does not exist."""
+        cache_metrics.record_negative_write(key)
+        return await self.set(key, TOMBSTONE, ttl or settings.CACHE_NEGATIVE_TTL)
     
     async def set(
         self, 
         key: str, 
         value: Union[str, dict, list], 
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None
     ) -> bool:
-        """Set value in cache."""
+        """
+        Set value in cache.
+        With stale_ttl, the entry is kept for ttl + stale_ttl seconds but is
+        reported stale by get_swr() once ttl has elapsed.
+        """
+        redis = await self._get_redis()
+        ttl = ttl or settings.CACHE_TTL_SECONDS
+        if stale_ttl:
+            value = {SWR_FRESH_UNTIL: time.time() + ttl, SWR_VALUE: value}
+            ttl += stale_ttl
+        success = await redis.set_value(key, value, ttl)
+        if self._is_local(key):
+            self.local_cache.set(key, value, ttl)
+            await self._publish_invalidation(keys=[key])
+        return success
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Get several keys at once: eligible keys from the in-process tier,
+        everything else with a single MGET. Missing keys are left out.
+        """
+        found: Dict[str, Any] = {}
+        remote_keys = []
+        for key in dict.fromkeys(keys):
+            value = self.local_cache.get(key) if self._is_local(key) else None
+            if value is not None:
+                if self._is_tombstone(value):
+                    cache_metrics.record_negative_hit(key)
+                    continue
+                found[key] = value
+                cache_metrics.record_hit(key, local=True)
+            else:
+                remote_keys.append(key)
+        
+        if remote_keys:
+            redis = await self._get_redis()
+            values = await redis.get_values(
+                remote_keys,
+                stale_ok=all(self._is_local(key) for key in remote_keys)
+            )
+            for key, value in zip(remote_keys, values):
+                if value is None:
+                    cache_metrics.record_miss(key)
+                    continue
+                if self._is_local(key):
+                    self.local_cache.set(key, value)
+                if self._is_tombstone(value):
+                    cache_metrics.record_negative_hit(key)
+                    continue
+                cache_metrics.record_hit(key)
+                found[key] = value
+        
+        return {
+            key: value.get(SWR_VALUE) if isinstance(value, dict) and SWR_FRESH_UNTIL in value else value
+            for key, value in found.items()
+        }
+    
+    async def set_many(self, mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Set several keys with one pipelined round trip."""
+        if not mapping:
+            return True
         redis = await self._get_redis()
-        return await redis.set(key, value, ttl or settings.CACHE_TTL_SECONDS)    
+        ttl = ttl or settings.CACHE_TTL_SECONDS
+        success = await redis.set_values(mapping, ttl)
+        
+        local_keys = [key for key in mapping if self._is_local(key)]
+        for key in local_keys:
+            self.local_cache.set(key, mapping[key], ttl)
+        if local_keys:
+            await self._publish_invalidation(keys=local_keys)
+        return success
+    
+    async def delete_many(self, keys: List[str]) -> int:
+        """Delete several keys with one DEL."""
+        if not keys:
+            return 0
+        local_keys = [key for key in keys if self._is_local(key)]
+        if local_keys:
+            self.local_cache.delete_many(local_keys)
+            await self._publish_invalidation(keys=local_keys)
+        redis = await self._get_redis()
+        return await redis.delete_many(list(keys))
+    
     async def delete(self, key: str) -> bool:
         """Delete key from cache."""
+        if self._is_local(key):
+            self.local_cache.delete(key)
+            await self._publish_invalidation(keys=[key])
         redis = await self._get_redis()
         return await redis.delete(key)
     
     async def delete_patterns(self, *patterns: str) -> int:
         """Delete all keys matching the given patterns."""
+        if settings.CACHE_L1_ENABLED:
+            for pattern in patterns:
+                self.local_cache.delete_pattern(pattern)
+            await self._publish_invalidation(patterns=list(patterns))
+        
         redis = await self._get_redis()
         total_deleted = 0
         for pattern in patterns:
@@ -169,55 +510,253 @@ class CacheService:
         """Check if key exists in cache."""
         redis = await self._get_redis()
         return await redis.exists(key)
+    
+    # Distributed recompute locks
+    async def acquire_lock(self, name: str, ttl: int) -> Optional[str]:
+        """
+        Try to take a short-lived lock. Returns a release token, or None if
+        another holder has it. Without Redis there is nothing to coordinate
+        with, so the caller gets a token and proceeds.
+        """
+        redis = await self._get_redis()
+        token = uuid.uuid4().hex
+        acquired = await redis.set_if_absent(f"{LOCK_KEY_PREFIX}{name}", token, ttl)
+        return None if acquired is False else token
+    
+    async def release_lock(self, name: str, token: str) -> bool:
+        """Release a lock, only if it is still held with the given token."""
+        redis = await self._get_redis()
+        return await redis.delete_if_equals(f"{LOCK_KEY_PREFIX}{name}", token)
+    
+    async def wait_for(self, key: str, timeout: float, interval: float = 0.05) -> Tuple[Optional[Any], bool]:
+        """
+        Poll for a key populated by another worker, giving up after timeout seconds.
+        Returns (value, found); a tombstone is found with a None value. Polls
+        read the raw entry, so they are not recorded as cache misses.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            result, _ = await self._get_raw(key)
+            if result is not None:
+                if self._is_tombstone(result):
+                    return None, True
+                if isinstance(result, dict) and SWR_FRESH_UNTIL in result:
+                    result = result.get(SWR_VALUE)
+                return result, True
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, 0.5)
+        return None, False
 
 # Global cache service instance
 cache_service = CacheService()
 
-def cached(key_pattern: str, ttl: Optional[int] = None):
+class SingleFlight:
     """
-    Decorator for caching function results.
-    Converts Pydantic model(s) to dict(s) before caching, and restores them after retrieval.
+    Per-process request coalescing: concurrent callers asking for the same key
+    share one in-flight computation instead of each running it.
     """
-    def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        async def wrapper(*args, **kwargs) -> Any:
-            import inspect
+    
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or join the call already in flight."""
+        task = self._calls.get(key)
+        if task is None:
+            # Run as a separate task so a cancelled caller doesn't cancel the others
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+    
+    def __len__(self) -> int:
+        return len(self._calls)
 
-            from pydantic import BaseModel
+single_flight = SingleFlight()
 
-            # Generate cache key
-            sig = inspect.signature(func)
-            bound_args = sig.bind(*args, **kwargs)
+# Strong references to background refreshes so they are not garbage collected mid-flight
+_background_refreshes: Set[asyncio.Task] = set()
+
+def _refresh_in_background(cache_key: str, fn: Callable[[], Awaitable[Any]]) -> None:
+    """Recompute a stale entry without making the current caller wait."""
+    async def refresh() -> None:
+        try:
+            await single_flight.do(cache_key, fn)
+        except Exception as e:
+            logger.error(f"Background refresh failed for {cache_key}: {e}")
+    
+    task = asyncio.create_task(refresh())
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+
+def _compile_key_builder(func: Callable, key_pattern: str) -> Callable[[tuple, dict], str]:
+    """
+    Build a function that formats key_pattern from call arguments.
+    The signature is inspected once here instead of bound on every call.
+    """
+    signature = inspect.signature(func)
+    params = list(signature.parameters.values())
+    fields = {
+        field.split(".")[0].split("[")[0]
+        for _, field, _, _ in string.Formatter().parse(key_pattern)
+        if field
+    }
+    uses_args = "args" in fields
+    
+    if any(p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in params):
+        def build_from_signature(args: tuple, kwargs: dict) -> str:
+            bound_args = signature.bind(*args, **kwargs)
             bound_args.apply_defaults()
-            format_dict = {
-                'args': '_'.join(str(arg) for arg in args),
-                **bound_args.arguments
-            }
-            cache_key = key_pattern.format(**format_dict)
-            # Try to get from cache
-            cached_result = await cache_service.get(cache_key)
-            if cached_result is not None:
-                # If the function returns a list of models, reconstruct them
-                if hasattr(func, '__annotations__') and 'return' in func.__annotations__:
-                    return_type = func.__annotations__['return']
-                    # Handle List[Model] return type
-                    if (getattr(return_type, '__origin__', None) is list and
-                        hasattr(return_type, '__args__') and
-                        hasattr(return_type.__args__[0], 'parse_obj')):
-                        model_cls = return_type.__args__[0]
-                        return [model_cls.parse_obj(item) for item in cached_result]
+            format_dict = {'args': '_'.join(str(arg) for arg in args), **bound_args.arguments}
+            return key_pattern.format_map(format_dict)
+        return build_from_signature
+    
+    names = [p.name for p in params]
+    defaults = {p.name: p.default for p in params if p.default is not p.empty}
+    
+    def build(args: tuple, kwargs: dict) -> str:
+        format_dict = dict(defaults)
+        format_dict.update(zip(names, args))
+        format_dict.update(kwargs)
+        if uses_args:
+            format_dict['args'] = '_'.join(str(arg) for arg in args)
+        return key_pattern.format_map(format_dict)
+    return build
+
+def _compile_return_adapter(func: Callable) -> Optional[TypeAdapter]:
+    """TypeAdapter for the annotated return type, or None if there is nothing to rebuild."""
+    try:
+        return_type = typing.get_type_hints(func).get("return")
+    except Exception as e:
+        logger.warning(f"Could not resolve return type of {func.__qualname__}: {e}")
+        return None
+    if return_type is None or return_type is Any:
+        return None
+    try:
+        return TypeAdapter(return_type)
+    except Exception as e:
+        logger.warning(f"No TypeAdapter for return type of {func.__qualname__}: {e}")
+        return None
+
+def cached(
+    key_pattern: str,
+    ttl: Optional[int] = None,
+    namespace: Optional[str] = None,
+    lock: bool = False,
+    lock_timeout: Optional[int] = None,
+    stale_ttl: Optional[int] = None
+):
+    """
+    Decorator for caching function results.
+    Serializes the result through a TypeAdapter for the annotated return type
+    and validates it back on a hit, so Optional[Model], List[Model] and
+    primitives come back as the declared types.
+    Concurrent misses for the same key within a worker share one computation.
+    
+    Args:
+        key_pattern: Cache key pattern, formatted with the call arguments
+        ttl: Time to live in seconds
+        namespace: Generation namespace folded into the key so the whole family
+            can be invalidated with cache_invalidate_namespaces()
+        lock: Also take a Redis lock on a miss so only one worker across the
+            fleet recomputes; the others wait for the value to appear. A None
+            result is published as a short-lived tombstone
+        lock_timeout: Lock expiry and maximum wait in seconds
+        stale_ttl: Keep serving an expired entry for this many extra seconds
+            while it is refreshed in the background (stale-while-revalidate)
+    """
+    def decorator(func: Callable) -> Callable:
+        build_key = _compile_key_builder(func, key_pattern)
+        # Resolved on first call so annotations may reference names defined later
+        adapters: List[Optional[TypeAdapter]] = []
+        
+        def return_adapter() -> Optional[TypeAdapter]:
+            if not adapters:
+                adapters.append(_compile_return_adapter(func))
+            return adapters[0]
+        
+        def restore(cached_result: Any) -> Any:
+            adapter = return_adapter()
+            if adapter is None:
                 return cached_result
-            # Execute function
-            result = await func(*args, **kwargs)
-            # Convert Pydantic models to dicts before caching
-            to_cache = result
+            return adapter.validate_python(cached_result)
+        
+        def dump(result: Any) -> Any:
+            adapter = return_adapter()
+            if adapter is not None:
+                return adapter.dump_python(result)
+            # Unannotated: convert Pydantic models to dicts before caching
             if isinstance(result, BaseModel):
-                to_cache = result.model_dump()
-            elif isinstance(result, list) and result and isinstance(result[0], BaseModel):
-                to_cache = [item.model_dump() for item in result]
-            if to_cache is not None:
-                await cache_service.set(cache_key, to_cache, ttl)
+                return result.model_dump()
+            if isinstance(result, list) and result and isinstance(result[0], BaseModel):
+                return [item.model_dump() for item in result]
             return result
+        
+        async def compute(cache_key: str, args: tuple, kwargs: dict) -> Any:
+            lock_token = None
+            if lock:
+                timeout = lock_timeout or settings.CACHE_LOCK_TIMEOUT
+                lock_token = await cache_service.acquire_lock(cache_key, timeout)
+                if lock_token is None:
+                    # Another worker is recomputing; wait for it to publish the value
+                    cached_result, found = await cache_service.wait_for(cache_key, timeout)
+                    if found:
+                        if cached_result is None:
+                            return None
+                        try:
+                            return restore(cached_result)
+                        except Exception as e:
+                            logger.warning(f"Discarding unreadable cache entry {cache_key}: {e}")
+                    else:
+                        logger.warning(f"Timed out waiting for {cache_key}, computing locally")
+            
+            try:
+                # Execute function
+                started = time.perf_counter()
+                result = await func(*args, **kwargs)
+                cache_metrics.record_compute(cache_key, time.perf_counter() - started)
+                to_cache = dump(result)
+                if to_cache is not None:
+                    await cache_service.set(cache_key, to_cache, ttl, stale_ttl=stale_ttl)
+                elif lock_token:
+                    # Tell workers waiting on the lock that there is no value,
+                    # rather than leaving them to time out and recompute
+                    await cache_service.set_tombstone(cache_key)
+                return result
+            finally:
+                if lock_token:
+                    await cache_service.release_lock(cache_key, lock_token)
+        
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            cache_key = build_key(args, kwargs)
+            if namespace:
+                cache_key = await cache_service.versioned_key(namespace, cache_key)
+            # Try to get from cache; a tombstone records a recent None result
+            cached_result, is_stale, not_found = await cache_service._lookup(cache_key)
+            if not_found:
+                return None
+            if cached_result is not None:
+                if is_stale:
+                    _refresh_in_background(
+                        cache_key,
+                        lambda: compute(cache_key, args, kwargs)
+                    )
+                try:
+                    return restore(cached_result)
+                except Exception as e:
+                    # Entry written for an older return type; recompute it
+                    logger.warning(f"Discarding unreadable cache entry {cache_key}: {e}")
+            # Coalesce concurrent misses into one computation
+            return await single_flight.do(
+                cache_key,
+                lambda: compute(cache_key, args, kwargs)
+            )
         return wrapper
     return decorator
 
@@ -268,4 +807,21 @@ def cache_invalidate_patterns(*key_patterns: str):
             logger.debug(f"Invalidated cache patterns: {key_patterns}")
             return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+def cache_invalidate_namespaces(*namespaces: str):
+    """
+    Decorator for invalidating whole key namespaces after function execution.
+    Bumps each namespace generation instead of scanning the keyspace.
+    Args:
+        *namespaces: Namespaces used with cached(..., namespace=...)
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            result = await func(*args, **kwargs)
+            await cache_service.bump_namespaces(*namespaces)
+            logger.debug(f"Invalidated cache namespaces: {namespaces}")
+            return result
+        return wrapper
+    return decorator
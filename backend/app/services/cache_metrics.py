@@ -0,0 +1,153 @@
+"""
+Per key-family cache metrics.
+Counts hits, misses and stale serves, bytes moved and Redis latency for each
+family of keys so TTLs can be tuned and unprofitable caches spotted.
+Metrics are kept in memory and are per worker process.
+"""
+import re
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List
+
+from app.core.config import settings
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+_GENERATION_SEGMENT = re.compile(r"^g\d+$")
+_WORD_SEGMENT = re.compile(r"^[a-z_]+$")
+
+
+def key_family(key: str) -> str:
+    """
+    Reduce a cache key to its family.
+    "product:<id>" -> "product", "orders:g3:list:0:100:..." -> "orders:list".
+    """
+    parts = [part for part in key.split(":") if not _GENERATION_SEGMENT.match(part)]
+    if len(parts) > 2 and _WORD_SEGMENT.match(parts[1]):
+        return f"{parts[0]}:{parts[1]}"
+    return parts[0]
+
+
+class FamilyStats:
+    """Counters for a single key family."""
+
+    def __init__(self):
+        self.hits = 0
+        self.local_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.negative_writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.compute_count = 0
+        self.compute_seconds = 0.0
+        self.redis_calls = 0
+        self.redis_seconds = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe_latency(self, seconds: float) -> None:
+        self.redis_calls += 1
+        self.redis_seconds += seconds
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "hits": self.hits,
+            "local_hits": self.local_hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "negative_writes": self.negative_writes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "computes": self.compute_count,
+            "avg_compute_ms": round(self.compute_seconds * 1000 / self.compute_count, 3) if self.compute_count else None,
+            "redis_calls": self.redis_calls,
+            "avg_redis_ms": round(self.redis_seconds * 1000 / self.redis_calls, 3) if self.redis_calls else None,
+            "redis_latency_ms": dict(zip(labels, self.latency_buckets)),
+        }
+
+
+class CacheMetrics:
+    """Registry of per-family cache statistics."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._families: Dict[str, FamilyStats] = {}
+        self._started_at = time.time()
+
+    def _stats(self, key: str) -> FamilyStats:
+        family = key_family(key)
+        stats = self._families.get(family)
+        if stats is None:
+            stats = self._families[family] = FamilyStats()
+        return stats
+
+    def record_hit(self, key: str, local: bool = False, stale: bool = False) -> None:
+        if not self.enabled:
+            return
+        stats = self._stats(key)
+        stats.hits += 1
+        if local:
+            stats.local_hits += 1
+        if stale:
+            stats.stale_hits += 1
+
+    def record_miss(self, key: str) -> None:
+        if not self.enabled:
+            return
+        self._stats(key).misses += 1
+
+    def record_negative_hit(self, key: str) -> None:
+        """A lookup answered by a not-found tombstone (not counted as a hit)."""
+        if not self.enabled:
+            return
+        self._stats(key).negative_hits += 1
+
+    def record_negative_write(self, key: str) -> None:
+        if not self.enabled:
+            return
+        self._stats(key).negative_writes += 1
+
+    def record_compute(self, key: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        stats = self._stats(key)
+        stats.compute_count += 1
+        stats.compute_seconds += seconds
+
+    def record_redis(self, operation: str, keys: List[str], seconds: float, sizes: List[int]) -> None:
+        """Command listener for RedisManager: latency per call, bytes per key."""
+        if not self.enabled or not keys:
+            return
+        # A multi-key call is one round trip; attribute its latency to each family once
+        for family_key in {key_family(key): key for key in keys}.values():
+            self._stats(family_key).observe_latency(seconds)
+        for key, size in zip(keys, sizes):
+            if operation == "read":
+                self._stats(key).bytes_read += size
+            else:
+                self._stats(key).bytes_written += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "since": self._started_at,
+            "families": {
+                family: stats.to_dict()
+                for family, stats in sorted(self._families.items())
+            },
+        }
+
+    def reset(self) -> None:
+        self._families.clear()
+        self._started_at = time.time()
+
+
+# Global cache metrics instance
+cache_metrics = CacheMetrics(enabled=settings.CACHE_METRICS_ENABLED)
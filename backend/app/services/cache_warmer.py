@@ -0,0 +1,162 @@
+"""
+Cache warming for the read paths that are expensive on a cold cache.
+Runs at startup and from `python redis_utils.py warm`, so the first users
+after a deploy do not pay for the product lists, topic lookups and stats
+aggregations.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+from app.db.redis import redis_manager
+from app.repositories.order import OrderRepository
+from app.repositories.payment_settings import PaymentSettingsRepository
+from app.repositories.product import ProductRepository
+from app.repositories.quiz_stats import QuizStatsRepository
+from app.repositories.quiz_topic import TopicRepository
+
+logger = logging.getLogger(__name__)
+
+# Page size used by the list endpoints when the client does not pass one
+DEFAULT_PAGE_SIZE = 20
+
+WarmJob = Tuple[str, Callable[[], Awaitable[Any]]]
+ProgressCallback = Callable[[int, int, str, bool], None]
+
+
+async def _product_jobs() -> List[WarmJob]:
+    jobs: List[WarmJob] = []
+    for active_only in (True, False):
+        jobs.append((f"products:count:{active_only}", lambda a=active_only: ProductRepository.count(active_only=a)))
+        for page in range(settings.CACHE_WARM_PAGES):
+            skip = page * DEFAULT_PAGE_SIZE
+            jobs.append((
+                f"products:all:{skip}:{active_only}",
+                lambda s=skip, a=active_only: ProductRepository.get_all(skip=s, limit=DEFAULT_PAGE_SIZE, active_only=a)
+            ))
+    return jobs
+
+
+async def _product_category_jobs() -> List[WarmJob]:
+    db = await get_database()
+    categories = [c for c in await db.products.distinct("category", {"is_active": True}) if c]
+    jobs: List[WarmJob] = []
+    for category in categories:
+        # The endpoint defaults to active_only=False; the storefront asks for active products
+        for active_only in (False, True):
+            jobs.append((
+                f"products:category:{category}:{active_only}",
+                lambda c=category, a=active_only: ProductRepository.get_by_category(
+                    c, skip=0, limit=DEFAULT_PAGE_SIZE, active_only=a
+                )
+            ))
+            jobs.append((
+                f"products:count_category:{category}:{active_only}",
+                lambda c=category, a=active_only: ProductRepository.count_by_category(c, active_only=a)
+            ))
+    return jobs
+
+
+async def _quiz_topic_jobs() -> List[WarmJob]:
+    return [
+        ("quiz_topic:list", lambda: TopicRepository.get_all(skip=0, limit=DEFAULT_PAGE_SIZE, active_only=True, search=None)),
+        ("quiz_topic:count", lambda: TopicRepository.count(active_only=True, search=None)),
+        # Topic list used by the quiz stats dashboard
+        ("quiz_topic:list:stats", lambda: TopicRepository.get_all(active_only=True, limit=100)),
+    ]
+
+
+async def _payment_settings_jobs() -> List[WarmJob]:
+    async def warm_settings():
+        db = await get_database()
+        return await PaymentSettingsRepository(db).get_settings()
+
+    return [("payment_settings", warm_settings)]
+
+
+async def _quiz_stats_jobs() -> List[WarmJob]:
+    return [("quiz_stats:overall", QuizStatsRepository.get_overall_stats)]
+
+
+async def _dashboard_jobs() -> List[WarmJob]:
+    return [("orders:total_revenue", OrderRepository.get_total_revenue)]
+
+
+# Families that can be warmed, in the order they are scheduled
+WARMERS: Dict[str, Callable[[], Awaitable[List[WarmJob]]]] = {
+    "products": _product_jobs,
+    "product_categories": _product_category_jobs,
+    "quiz_topics": _quiz_topic_jobs,
+    "payment_settings": _payment_settings_jobs,
+    "quiz_stats": _quiz_stats_jobs,
+    "dashboard": _dashboard_jobs,
+}
+
+
+def configured_families() -> List[str]:
+    """Families listed in CACHE_WARM_FAMILIES."""
+    return [name.strip() for name in settings.CACHE_WARM_FAMILIES.split(",") if name.strip()]
+
+
+async def warm_cache(
+    families: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Preload the given cache families, running at most `concurrency` loads at once.
+    `progress(done, total, job_name, ok)` is called after each load.
+    Returns a summary with counts of warmed and failed loads.
+    """
+    families = families or configured_families()
+    concurrency = concurrency or settings.CACHE_WARM_CONCURRENCY
+    started = time.perf_counter()
+
+    if not redis_manager.is_available:
+        logger.warning("Skipping cache warm-up: Redis is not available")
+        return {"warmed": 0, "failed": 0, "failed_jobs": [], "skipped": True, "seconds": 0.0}
+
+    jobs: List[WarmJob] = []
+    for family in families:
+        build_jobs = WARMERS.get(family)
+        if build_jobs is None:
+            logger.warning(f"Unknown cache warm family '{family}', skipping")
+            continue
+        try:
+            jobs.extend(await build_jobs())
+        except Exception as e:
+            logger.error(f"Could not plan cache warm-up for {family}: {e}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(jobs)
+    done = 0
+    failed: List[str] = []
+
+    async def run(name: str, load: Callable[[], Awaitable[Any]]) -> None:
+        nonlocal done
+        async with semaphore:
+            ok = True
+            try:
+                await load()
+            except Exception as e:
+                ok = False
+                failed.append(name)
+                logger.error(f"Cache warm-up failed for {name}: {e}")
+            done += 1
+            if progress:
+                progress(done, total, name, ok)
+
+    await asyncio.gather(*(run(name, load) for name, load in jobs))
+
+    summary = {
+        "warmed": total - len(failed),
+        "failed": len(failed),
+        "failed_jobs": failed,
+        "skipped": False,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Cache warm-up finished: {summary['warmed']}/{total} loaded in {summary['seconds']}s")
+    return summary
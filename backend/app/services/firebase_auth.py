@@ -2,16 +2,20 @@ import logging
 from typing import Any, Dict, Optional
 
 import firebase_admin
-import httpx
 from firebase_admin import auth, credentials
 
 from app.core.config import settings
+from app.services.firebase_tokens import (ExpiredFirebaseTokenError,
+                                          FirebaseTokenVerifier,
+                                          InvalidFirebaseTokenError)
+from app.services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
 class FirebaseAuthService:
     _instance = None
     _app = None
+    _verifier = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -44,6 +48,10 @@ class FirebaseAuthService:
         except Exception as e:
             logger.error(f"Failed to initialize Firebase: {str(e)}")
             self._app = None
+
+        project_id = settings.FIREBASE_PROJECT_ID or getattr(self._app, "project_id", None)
+        if self._app and project_id:
+            self._verifier = FirebaseTokenVerifier(project_id, cache_size=settings.AUTH_TOKEN_CACHE_SIZE)
     
     async def verify_id_token(self, id_token: str) -> Optional[Dict[str, Any]]:
         """
@@ -55,13 +63,13 @@ class FirebaseAuthService:
         Returns:
             Dict containing user data if valid, None otherwise
         """
-        if not self._app:
+        if not self._verifier:
             logger.error("Firebase not initialized")
             return None
             
         try:
-            # Verify the ID token
-            decoded_token = auth.verify_id_token(id_token)
+            # Verified off the event loop; repeat tokens come from the verifier's cache
+            decoded_token = await self._verifier.verify(id_token)
             
             # Extract user information
             user_data = {
@@ -76,10 +84,10 @@ class FirebaseAuthService:
             logger.info(f"Successfully verified Firebase token for user: {user_data['email']}")
             return user_data
             
-        except auth.ExpiredIdTokenError:
+        except ExpiredFirebaseTokenError:
             logger.warning("Firebase ID token has expired")
             return None
-        except auth.InvalidIdTokenError:
+        except InvalidFirebaseTokenError:
             logger.warning("Firebase ID token is invalid")
             return None
         except Exception as e:
@@ -162,18 +170,18 @@ class FirebaseAuthService:
             "password": password,
             "returnSecureToken": True
         }
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.post(url, json=payload)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return data
-                else:
-                    logger.warning(f"Firebase email/password login failed: {resp.text}")
-                    return None
-            except Exception as e:
-                logger.error(f"Error authenticating with Firebase REST API: {str(e)}")
+        try:
+            # Signing in has no side effects, so it is safe to retry
+            resp = await http_client.post(url, json=payload, retry_unsafe=True)
+            if resp.status_code == 200:
+                data = resp.json()
+                return data
+            else:
+                logger.warning(f"Firebase email/password login failed: {resp.text}")
                 return None
+        except Exception as e:
+            logger.error(f"Error authenticating with Firebase REST API: {str(e)}")
+            return None
     
     async def register_with_email_password(self, email: str, password: str, display_name: str = None) -> Optional[dict]:
         """
@@ -191,18 +199,17 @@ class FirebaseAuthService:
         }
         if display_name:
             payload["displayName"] = display_name
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.post(url, json=payload)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return data
-                else:
-                    logger.warning(f"Firebase registration failed: {resp.text}")
-                    return None
-            except Exception as e:
-                logger.error(f"Error registering with Firebase REST API: {str(e)}")
+        try:
+            resp = await http_client.post(url, json=payload)
+            if resp.status_code == 200:
+                data = resp.json()
+                return data
+            else:
+                logger.warning(f"Firebase registration failed: {resp.text}")
                 return None
+        except Exception as e:
+            logger.error(f"Error registering with Firebase REST API: {str(e)}")
+            return None
     
     async def update_password_with_email(self, email: str, new_password: str) -> bool:
         """
@@ -0,0 +1,165 @@
+"""
+Firebase ID token verification that never blocks the event loop.
+
+Google's signing certificates are fetched asynchronously and kept until the
+expiry given in the response's Cache-Control header. Signatures are checked on
+the default thread pool, and decoded tokens are cached by token hash until
+they expire, so repeat logins with the same ID token skip verification.
+
+The certificate source is injectable, so verification can run offline against
+locally generated keys.
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from jose import ExpiredSignatureError, JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from app.core.security import token_hash
+from app.services.http_client import http_client
+from app.services.local_cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+# Used when the certificate response carries no max-age
+DEFAULT_KEYS_MAX_AGE = 300
+# Minimum time between refetches triggered by an unknown key ID or a failed fetch
+MIN_REFRESH_INTERVAL = 60
+# Allowed clock difference with Google's servers, in seconds
+CLOCK_SKEW = 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+# Returns ({key ID: PEM certificate}, seconds the certificates may be cached)
+KeySource = Callable[[], Awaitable[Tuple[Dict[str, str], int]]]
+
+
+class InvalidFirebaseTokenError(Exception):
+    """The ID token is malformed, wrongly signed or not meant for this project."""
+
+
+class ExpiredFirebaseTokenError(InvalidFirebaseTokenError):
+    """The ID token has expired."""
+
+
+def parse_max_age(cache_control: Optional[str]) -> int:
+    """Seconds a response may be cached according to its Cache-Control header."""
+    match = _MAX_AGE.search(cache_control or "")
+    return int(match.group(1)) if match else DEFAULT_KEYS_MAX_AGE
+
+
+async def fetch_google_certs() -> Tuple[Dict[str, str], int]:
+    """Fetch Google's current ID token signing certificates."""
+    response = await http_client.get(GOOGLE_CERTS_URL)
+    response.raise_for_status()
+    return response.json(), parse_max_age(response.headers.get("Cache-Control"))
+
+
+class FirebaseTokenVerifier:
+    """Verifies Firebase ID tokens for one project."""
+
+    def __init__(self, project_id: str, key_source: Optional[KeySource] = None, cache_size: int = 4096):
+        self.project_id = project_id
+        self.key_source = key_source or fetch_google_certs
+        self._keys: Dict[str, Key] = {}
+        self._keys_expire_at = 0.0
+        self._keys_fetched_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        # Decoded tokens by token hash; an ID token lives for at most an hour
+        self._verified = LocalCache(max_entries=cache_size, default_ttl=3600)
+
+    async def verify(self, id_token: str) -> Dict[str, Any]:
+        """
+        Verify an ID token and return its claims, with "uid" set to the subject.
+        Raises ExpiredFirebaseTokenError or InvalidFirebaseTokenError.
+        """
+        digest = token_hash(id_token)
+        claims = self._verified.get(digest)
+        if claims is not None:
+            return claims
+
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except JWTError:
+            raise InvalidFirebaseTokenError("ID token is malformed")
+        if header.get("alg") != "RS256":
+            raise InvalidFirebaseTokenError("ID token has an unexpected algorithm")
+
+        key = await self._get_key(header.get("kid"))
+        if key is None:
+            raise InvalidFirebaseTokenError("ID token was signed with an unknown key")
+
+        loop = asyncio.get_running_loop()
+        claims = await loop.run_in_executor(None, self._decode, id_token, key)
+
+        remaining = int(claims["exp"] - time.time())
+        if remaining > 0:
+            self._verified.set(digest, claims, ttl=remaining)
+        return claims
+
+    def _decode(self, id_token: str, key: Key) -> Dict[str, Any]:
+        try:
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=ISSUER_PREFIX + self.project_id,
+                options={"leeway": CLOCK_SKEW}
+            )
+        except ExpiredSignatureError:
+            raise ExpiredFirebaseTokenError("ID token has expired")
+        except JWTError as e:
+            raise InvalidFirebaseTokenError(f"ID token is invalid: {e}")
+
+        now = time.time() + CLOCK_SKEW
+        subject = claims.get("sub")
+        if not subject or len(subject) > 128:
+            raise InvalidFirebaseTokenError("ID token has an invalid subject")
+        if claims.get("iat", now + 1) > now or claims.get("auth_time", now + 1) > now:
+            raise InvalidFirebaseTokenError("ID token was issued in the future")
+
+        claims["uid"] = subject
+        return claims
+
+    async def _get_key(self, kid: Optional[str]) -> Optional[Key]:
+        if not kid:
+            return None
+        now = time.monotonic()
+        if now >= self._keys_expire_at or (kid not in self._keys and self._may_refresh(now)):
+            await self._refresh_keys()
+        return self._keys.get(kid)
+
+    def _may_refresh(self, now: float) -> bool:
+        return now - self._keys_fetched_at >= MIN_REFRESH_INTERVAL
+
+    async def _refresh_keys(self) -> None:
+        async with self._refresh_lock:
+            now = time.monotonic()
+            # Another request refreshed the keys while this one waited
+            if self._keys_fetched_at and not self._may_refresh(now) and now < self._keys_expire_at:
+                return
+
+            self._keys_fetched_at = now
+            try:
+                certs, max_age = await self.key_source()
+                self._keys = {kid: jwk.construct(cert, "RS256") for kid, cert in certs.items()}
+                self._keys_expire_at = now + max_age
+                logger.debug(f"Loaded {len(self._keys)} Firebase signing keys for {max_age}s")
+            except Exception as e:
+                # Keep using the previous keys, and try again shortly
+                logger.error(f"Failed to fetch Firebase signing keys: {e}")
+                self._keys_expire_at = now + MIN_REFRESH_INTERVAL
+
+    def clear(self) -> None:
+        """Forget cached keys and verified tokens."""
+        self._keys = {}
+        self._keys_expire_at = 0.0
+        self._keys_fetched_at = 0.0
+        self._verified.clear()
@@ -0,0 +1,234 @@
+"""
+Shared outbound HTTP client.
+
+One httpx.AsyncClient lives for the lifetime of the app, so calls to payment
+gateways and Google APIs reuse keep-alive connections instead of paying for a
+TCP and TLS handshake each time. Connections per upstream host are capped,
+every request has a total time budget across its retries, and transient
+failures are retried with jittered exponential backoff.
+
+Per-host request, error, retry and latency metrics are kept per worker process.
+"""
+import asyncio
+import logging
+import random
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Failures where the request never reached the server, so it is always safe to retry
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Failures that may happen after the server received the request
+TRANSIENT_ERRORS = (httpx.TransportError,)
+
+
+class HostStats:
+    """Counters for a single upstream host."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.statuses: Dict[str, int] = {}
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, seconds: float, status_code: Optional[int]) -> None:
+        self.requests += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+        if status_code is None:
+            self.errors += 1
+        else:
+            status_class = f"{status_code // 100}xx"
+            self.statuses[status_class] = self.statuses.get(status_class, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "statuses": dict(self.statuses),
+            "avg_ms": round(self.seconds * 1000 / self.requests, 3) if self.requests else None,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "latency_ms": dict(zip(labels, self.latency_buckets)),
+        }
+
+
+class HttpClient:
+    """App-lifetime pooled async HTTP client with retries and per-host limits."""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_connections_per_host: int = 20,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+        total_timeout: float = 30.0,
+        retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.stats: Dict[str, HostStats] = {}
+
+    def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            transport=self.transport
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The underlying client, created on first use if start() was not called."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    async def start(self) -> None:
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        logger.info("Outbound HTTP client started")
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Outbound HTTP client closed")
+        self._client = None
+
+    def _host_slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return slot
+
+    def _host_stats(self, host: str) -> HostStats:
+        stats = self.stats.get(host)
+        if stats is None:
+            stats = self.stats[host] = HostStats()
+        return stats
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff, so retrying workers do not move in lockstep."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        retries: Optional[int] = None,
+        retry_unsafe: bool = False,
+        timeout: Optional[float] = None,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """
+        Send a request and return its response, retrying transient failures.
+
+        Requests that are not idempotent are only retried when the connection
+        could not be made, unless retry_unsafe is set. The total time spent,
+        including retries and backoff, is capped by timeout (defaults to the
+        configured total budget). Raises httpx.HTTPError once retries run out.
+        """
+        method = method.upper()
+        retries = self.retries if retries is None else retries
+        retry_sent = retry_unsafe or method in IDEMPOTENT_METHODS
+        deadline = time.monotonic() + (timeout or self.total_timeout)
+        host = httpx.URL(url).host
+        stats = self._host_stats(host)
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise httpx.TimeoutException(f"{method} {host} exceeded its time budget")
+
+            started = time.perf_counter()
+            try:
+                async with self._host_slot(host):
+                    response = await asyncio.wait_for(self.client.request(method, url, **kwargs), timeout=remaining)
+            except asyncio.TimeoutError:
+                stats.observe(time.perf_counter() - started, None)
+                raise httpx.TimeoutException(f"{method} {host} exceeded its time budget")
+            except TRANSIENT_ERRORS as e:
+                stats.observe(time.perf_counter() - started, None)
+                if attempt >= retries or not (retry_sent or isinstance(e, CONNECT_ERRORS)):
+                    raise
+                logger.warning(f"{method} {host} failed ({e.__class__.__name__}), retrying")
+            else:
+                stats.observe(time.perf_counter() - started, response.status_code)
+                if attempt >= retries or not retry_sent or response.status_code not in retry_statuses:
+                    return response
+                logger.warning(f"{method} {host} returned {response.status_code}, retrying")
+                await response.aclose()
+
+            delay = self._backoff(attempt)
+            if time.monotonic() + delay >= deadline:
+                raise httpx.TimeoutException(f"{method} {host} exceeded its time budget")
+            attempt += 1
+            stats.retries += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-host metrics for this worker process."""
+        return {
+            "max_connections": self.max_connections,
+            "max_connections_per_host": self.max_connections_per_host,
+            "hosts": {host: stats.to_dict() for host, stats in sorted(self.stats.items())},
+        }
+
+    def reset_metrics(self) -> None:
+        self.stats = {}
+
+
+# Global HTTP client instance
+http_client = HttpClient(
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    max_connections_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+    read_timeout=settings.HTTP_READ_TIMEOUT,
+    total_timeout=settings.HTTP_TOTAL_TIMEOUT,
+    retries=settings.HTTP_RETRIES,
+    backoff_base=settings.HTTP_RETRY_BACKOFF
+)
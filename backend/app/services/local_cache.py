@@ -0,0 +1,66 @@
+"""
+In-process LRU cache used as the first tier in front of Redis.
+Entries are bounded by count and expire after a short TTL so that a missed
+invalidation message can only serve stale data briefly.
+"""
+import fnmatch
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+
+
+class LocalCache:
+    """Bounded LRU cache with per-entry TTL, local to a single worker process."""
+
+    def __init__(self, max_entries: int = 2048, default_ttl: int = 30):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Store a value, evicting the least recently used entries when full."""
+        if self.max_entries <= 0:
+            return
+
+        ttl = min(ttl, self.default_ttl) if ttl else self.default_ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> bool:
+        """Remove a single key."""
+        return self._entries.pop(key, None) is not None
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove several keys."""
+        return sum(1 for key in keys if self.delete(key))
+
+    def delete_pattern(self, pattern: str) -> int:
+        """Remove all keys matching a glob-style pattern (same syntax as Redis MATCH)."""
+        matching = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+        for key in matching:
+            del self._entries[key]
+        return len(matching)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,368 @@
+"""
+Rate limiting using GCRA (generic cell rate algorithm) in Redis, fronted by
+per-worker token buckets.
+
+All windows that apply to a request are checked and updated by one Lua
+script, so a Redis check costs a single round trip and concurrent requests
+cannot race between reading and writing the counters.
+
+Most identifiers are far below their limits, so each worker leases a share
+of the remaining global quota at every Redis check and admits requests from
+that lease without talking to Redis. Tokens spent locally are pushed to
+Redis on the next check or by the background sync, which keeps global
+limits roughly enforced. When Redis is unavailable the local buckets alone
+enforce the limits.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.db.redis import redis_manager
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = "rate_limit:"
+
+# KEYS: one theoretical-arrival-time key per window
+# ARGV: cost, then (limit, period_seconds, pending) for each key, where pending
+#       is the number of tokens a worker already spent locally
+# Returns: allowed, then (remaining, reset_after_ms, retry_after_ms) for each key.
+# Pending tokens are always recorded; cost is only consumed if every window allows it.
+GCRA_SCRIPT = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local allowed = 1
+local windows = {}
+
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[i * 3 - 1])
+    local period = tonumber(ARGV[i * 3]) * 1000
+    local pending = tonumber(ARGV[i * 3 + 1])
+    local interval = period / limit
+    local tat = tonumber(redis.call("GET", KEYS[i])) or now
+    if tat < now then
+        tat = now
+    end
+    if pending > 0 then
+        tat = math.min(tat + interval * pending, now + period)
+        redis.call("SET", KEYS[i], string.format("%.3f", tat), "PX", math.ceil(tat - now))
+    end
+    local new_tat = tat + interval * cost
+    local retry_after = new_tat - period - now
+    if retry_after > 0 then
+        allowed = 0
+    else
+        retry_after = 0
+    end
+    windows[i] = {tat = tat, new_tat = new_tat, interval = interval, period = period, retry_after = retry_after}
+end
+
+local result = {allowed}
+for i = 1, #KEYS do
+    local window = windows[i]
+    local tat = window.tat
+    if allowed == 1 and cost > 0 then
+        tat = window.new_tat
+        redis.call("SET", KEYS[i], string.format("%.3f", tat), "PX", math.ceil(tat - now))
+    end
+    local remaining = math.floor((window.period - (tat - now)) / window.interval)
+    if remaining < 0 then
+        remaining = 0
+    end
+    table.insert(result, remaining)
+    table.insert(result, math.ceil(tat - now))
+    table.insert(result, math.ceil(window.retry_after))
+end
+return result
+"""
+
+Window = Tuple[str, int, int]  # (name, limit, period_seconds)
+
+
+class RateLimitWindow:
+    """State of one window after a check."""
+
+    __slots__ = ("name", "limit", "period", "remaining", "reset_after", "retry_after")
+
+    def __init__(self, name: str, limit: int, period: int, remaining: int, reset_after: float, retry_after: float):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.remaining = remaining
+        self.reset_after = reset_after  # Seconds until the window is fully replenished
+        self.retry_after = retry_after  # Seconds until this window admits the request (0 if it did)
+
+
+class RateLimitDecision:
+    """Outcome of checking every window that applies to a request."""
+
+    __slots__ = ("allowed", "windows", "local")
+
+    def __init__(self, allowed: bool, windows: List[RateLimitWindow], local: bool = False):
+        self.allowed = allowed
+        self.windows = windows
+        # True when the decision was made from the worker's buckets without Redis
+        self.local = local
+
+    @property
+    def blocking(self) -> Optional[RateLimitWindow]:
+        """The window that rejected the request (longest wait), if any."""
+        rejected = [w for w in self.windows if w.retry_after > 0]
+        return max(rejected, key=lambda w: w.retry_after) if rejected else None
+
+    @property
+    def tightest(self) -> RateLimitWindow:
+        """The window with the least remaining quota, reported in response headers."""
+        return self.blocking or min(self.windows, key=lambda w: w.remaining)
+
+
+class LocalBucket:
+    """A worker's token bucket for one window, plus its lease of the global quota."""
+
+    __slots__ = ("limit", "period", "tokens", "updated_at", "pending", "budget", "remaining", "synced_at")
+
+    def __init__(self, limit: int, period: int, now: float):
+        self.limit = limit
+        self.period = period
+        self.tokens = float(limit)
+        self.updated_at = now
+        self.pending = 0  # Tokens spent locally and not yet pushed to Redis
+        self.budget = 0  # Tokens this worker may spend locally before asking Redis again
+        self.remaining = limit  # Global remaining quota at the last sync
+        self.synced_at = float("-inf")
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.limit, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def to_window(self, name: str, cost: int) -> RateLimitWindow:
+        short = cost - self.tokens
+        remaining = max(0, min(int(self.tokens), self.remaining - self.pending))
+        return RateLimitWindow(
+            name, self.limit, self.period,
+            remaining=remaining,
+            reset_after=(self.limit - remaining) / self.rate,
+            retry_after=short / self.rate if short > 0 else 0.0
+        )
+
+
+class RateLimiter:
+    """Checks named (limit, period) windows for an identifier."""
+
+    def __init__(
+        self,
+        local_enabled: bool = True,
+        local_share: float = 0.1,
+        sync_interval: float = 1.0,
+        max_keys: int = 10000
+    ):
+        self.local_enabled = local_enabled
+        self.local_share = local_share
+        self.sync_interval = sync_interval
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[str, str], LocalBucket]" = OrderedDict()
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def key(self, identifier: str, name: str) -> str:
+        # The identifier is hash-tagged so all of its windows share one cluster slot
+        return f"{RATE_LIMIT_KEY_PREFIX}{{{identifier}}}:{name}"
+
+    def _bucket(self, identifier: str, name: str, limit: int, period: int, now: float) -> LocalBucket:
+        bucket_key = (identifier, name)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None or bucket.limit != limit or bucket.period != period:
+            bucket = self._buckets[bucket_key] = LocalBucket(limit, period, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+            bucket.refill(now)
+        return bucket
+
+    def _buckets_for(self, identifier: str, windows: Sequence[Window]) -> List[LocalBucket]:
+        now = time.monotonic()
+        return [self._bucket(identifier, name, limit, period, now) for name, limit, period in windows]
+
+    async def check(self, identifier: str, windows: Sequence[Window], cost: int = 1) -> RateLimitDecision:
+        """
+        Consume `cost` from every (name, limit, period_seconds) window, or from none
+        if any of them is exhausted.
+        """
+        if not windows:
+            return RateLimitDecision(True, [], local=True)
+
+        buckets = self._buckets_for(identifier, windows)
+
+        # A worker never admits more than the full limit on its own
+        if any(bucket.tokens < cost for bucket in buckets):
+            return self._deny_locally(identifier, windows, buckets, cost)
+
+        now = time.monotonic()
+        if self.local_enabled and all(
+            bucket.pending + cost <= bucket.budget and now - bucket.synced_at < self.sync_interval
+            for bucket in buckets
+        ):
+            return self._admit_locally(windows, buckets, cost, lease=True)
+
+        decision = await self._check_redis(identifier, windows, buckets, cost)
+        if decision is None:
+            # Redis unavailable: the local buckets alone enforce the limits
+            return self._admit_locally(windows, buckets, cost, lease=False)
+        return decision
+
+    def check_local(self, identifier: str, windows: Sequence[Window], cost: int = 1) -> RateLimitDecision:
+        """Decide from the worker's buckets alone, for when Redis cannot be consulted."""
+        if not windows:
+            return RateLimitDecision(True, [], local=True)
+
+        buckets = self._buckets_for(identifier, windows)
+        if any(bucket.tokens < cost for bucket in buckets):
+            return self._deny_locally(identifier, windows, buckets, cost)
+        return self._admit_locally(windows, buckets, cost, lease=False)
+
+    def _admit_locally(
+        self,
+        windows: Sequence[Window],
+        buckets: List[LocalBucket],
+        cost: int,
+        lease: bool
+    ) -> RateLimitDecision:
+        for bucket in buckets:
+            bucket.tokens -= cost
+            if lease:
+                bucket.pending += cost
+        return RateLimitDecision(
+            True,
+            [bucket.to_window(name, 0) for (name, _, _), bucket in zip(windows, buckets)],
+            local=True
+        )
+
+    def _deny_locally(
+        self,
+        identifier: str,
+        windows: Sequence[Window],
+        buckets: List[LocalBucket],
+        cost: int
+    ) -> RateLimitDecision:
+        decision = RateLimitDecision(
+            False,
+            [bucket.to_window(name, cost) for (name, _, _), bucket in zip(windows, buckets)],
+            local=True
+        )
+        blocking = decision.blocking
+        logger.warning(
+            f"Rate limit exceeded for {identifier}: {blocking.name} "
+            f"({blocking.limit}/{blocking.period}s, local)"
+        )
+        return decision
+
+    async def _check_redis(
+        self,
+        identifier: str,
+        windows: Sequence[Window],
+        buckets: List[LocalBucket],
+        cost: int
+    ) -> Optional[RateLimitDecision]:
+        """Push pending local tokens and check `cost` against Redis. None if Redis is unavailable."""
+        keys = [self.key(identifier, name) for name, _, _ in windows]
+        flushed = [bucket.pending for bucket in buckets]
+        args: List[int] = [cost]
+        for (_, limit, period), pending in zip(windows, flushed):
+            args.extend((limit, period, pending))
+
+        result = await redis_manager.run_script(GCRA_SCRIPT, keys, args)
+        if result is None:
+            return None
+
+        now = time.monotonic()
+        allowed = bool(result[0])
+        states = []
+        for index, ((name, limit, period), bucket) in enumerate(zip(windows, buckets)):
+            remaining, reset_ms, retry_ms = (int(value) for value in result[1 + index * 3:4 + index * 3])
+            states.append(RateLimitWindow(
+                name, limit, period,
+                remaining=remaining,
+                reset_after=reset_ms / 1000,
+                retry_after=retry_ms / 1000
+            ))
+            # Requests admitted locally while the script ran stay pending
+            bucket.pending -= flushed[index]
+            bucket.remaining = remaining
+            bucket.budget = int(remaining * self.local_share)
+            bucket.synced_at = now
+            if allowed:
+                bucket.tokens -= cost
+            # Other workers' traffic counts against this worker's bucket too
+            bucket.tokens = min(bucket.tokens, remaining)
+
+        decision = RateLimitDecision(allowed, states)
+        if not allowed:
+            blocking = decision.blocking
+            logger.warning(
+                f"Rate limit exceeded for {identifier}: {blocking.name} "
+                f"({blocking.limit}/{blocking.period}s)"
+            )
+        return decision
+
+    async def sync(self) -> int:
+        """Push every bucket's pending tokens to Redis. Returns the number of identifiers synced."""
+        pending: Dict[str, List[Tuple[str, LocalBucket]]] = {}
+        for (identifier, name), bucket in list(self._buckets.items()):
+            if bucket.pending > 0:
+                pending.setdefault(identifier, []).append((name, bucket))
+
+        synced = 0
+        for identifier, entries in pending.items():
+            windows = [(name, bucket.limit, bucket.period) for name, bucket in entries]
+            buckets = [bucket for _, bucket in entries]
+            if await self._check_redis(identifier, windows, buckets, cost=0) is None:
+                break
+            synced += 1
+        return synced
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            if not redis_manager.is_available:
+                continue
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Rate limit sync error: {e}")
+
+    async def start_sync(self) -> None:
+        """Start the background task that pushes locally spent tokens to Redis."""
+        if not self.local_enabled or self._sync_task:
+            return
+        self._sync_task = asyncio.create_task(self._sync_loop())
+        logger.info("Rate limit sync started")
+
+    async def stop_sync(self) -> None:
+        """Stop the background sync after a final push."""
+        if not self._sync_task:
+            return
+        self._sync_task.cancel()
+        try:
+            await self._sync_task
+        except asyncio.CancelledError:
+            pass
+        self._sync_task = None
+        await self.sync()
+        logger.info("Rate limit sync stopped")
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter(
+    local_enabled=settings.RATE_LIMIT_LOCAL_ENABLED,
+    local_share=settings.RATE_LIMIT_LOCAL_SHARE,
+    sync_interval=settings.RATE_LIMIT_SYNC_INTERVAL,
+    max_keys=settings.RATE_LIMIT_LOCAL_MAX_KEYS
+)
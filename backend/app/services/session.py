@@ -4,21 +4,59 @@ Provides secure session storage, token blacklisting, and rate limiting.
 """
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+import math
+import secrets
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from app.core.config import settings
+from app.core.security import token_hash
+from app.db.redis import redis_manager
 from app.services.cache import cache_service
+from app.services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
+SESSION_KEY = "session:{{{}}}:{}"
+USER_SESSIONS_KEY = "user_sessions:{{{}}}"
+
+# Fields every session carries besides the caller's data
+SESSION_METADATA = ("user_id", "session_id", "created_at", "last_activity")
+
+
 class SessionService:
     """Service for managing user sessions and authentication tokens."""
     
-    def __init__(self):
-        self.session_prefix = "session:"
+    def __init__(self, touch_interval: int = 60):
         self.token_blacklist_prefix = "blacklist:"
         self.rate_limit_prefix = "rate_limit:"
+        # Reads bump last_activity (and the session's TTL) at most this often
+        self.touch_interval = touch_interval
+    
+    @staticmethod
+    def _user_id_of(session_id: str) -> str:
+        # Session IDs start with the user ID
+        return session_id.partition("_")[0]
+    
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        # The hash tag keeps a user's sessions and their index in one cluster
+        # slot, so they can be deleted with a single command
+        return SESSION_KEY.format(SessionService._user_id_of(session_id), session_id)
+    
+    @staticmethod
+    async def _index(user_id: str, session_id: str, ttl: int) -> None:
+        # set_add only ever extends the index TTL, so the index outlives every
+        # session it lists and bulk revocation can always find them
+        await redis_manager.set_add(USER_SESSIONS_KEY.format(user_id), [session_id], ttl=ttl)
+    
+    @staticmethod
+    def _encode(session_data: Dict[str, Any]) -> Dict[str, str]:
+        return {field: json.dumps(value, default=str) for field, value in session_data.items()}
+    
+    @staticmethod
+    def _decode(fields: Dict[str, str]) -> Dict[str, Any]:
+        return {field: json.loads(value) for field, value in fields.items()}
     
     async def create_session(
         self, 
@@ -27,7 +65,8 @@ class SessionService:
         expires_in: Optional[int] = None
     ) -> str:
         """
-        Create a new user session.
+        Create a new user session. A user can hold several sessions at once
+        (one per device).
         
         Args:
             user_id: User ID
@@ -37,55 +76,85 @@ class SessionService:
         Returns:
             Session ID
         """
-        session_id = f"{user_id}_{datetime.utcnow().timestamp()}"
+        session_id = f"{user_id}_{secrets.token_urlsafe(16)}"
+        now = datetime.utcnow().isoformat()
         
         # Add metadata
-        session_data.update({
+        session_data = {
+            **session_data,
             "user_id": user_id,
-            "created_at": datetime.utcnow().isoformat(),
-            "last_activity": datetime.utcnow().isoformat(),
+            "created_at": now,
+            "last_activity": now,
             "session_id": session_id
-        })
+        }
         
         # Store session
         ttl = expires_in or settings.CACHE_TTL_USER_SESSIONS
-        await cache_service.set(
-            f"{self.session_prefix}{session_id}",
-            session_data,
-            ttl=ttl
-        )
+        await redis_manager.hash_set(self._session_key(session_id), self._encode(session_data), ttl=ttl)
         
-        # Also store user -> session mapping
-        await cache_service.set(
-            f"user_session:{user_id}",
-            session_id,
-            ttl=ttl
-        )
+        # Index it under the user
+        await self._index(user_id, session_id, ttl)
         
         logger.info(f"Created session {session_id} for user {user_id}")
         return session_id
     
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get session data by session ID."""
-        session_data = await cache_service.get(f"{self.session_prefix}{session_id}")
-        
-        if session_data and isinstance(session_data, dict):
-            # Update last activity
-            session_data["last_activity"] = datetime.utcnow().isoformat()
-            await cache_service.set(
-                f"{self.session_prefix}{session_id}",
-                session_data,
-                ttl=settings.CACHE_TTL_USER_SESSIONS
-            )
-            return session_data
+        """
+        Get session data by session ID. Sliding expiry: last_activity and the
+        TTL are refreshed, but at most once per touch interval, so most reads
+        are a single HGETALL with no write.
+        """
+        fields = await redis_manager.hash_get_all(self._session_key(session_id))
+        if not fields:
+            return None
         
-        return None
+        session_data = self._decode(fields)
+        now = datetime.utcnow()
+        last_activity = datetime.fromisoformat(session_data["last_activity"])
+        if (now - last_activity).total_seconds() >= self.touch_interval:
+            await self._touch(session_id, session_data["user_id"], now)
+            session_data["last_activity"] = now.isoformat()
+        
+        return session_data
+    
+    async def _touch(self, session_id: str, user_id: str, now: datetime, ttl: Optional[int] = None) -> None:
+        ttl = ttl or settings.CACHE_TTL_USER_SESSIONS
+        await redis_manager.hash_set(
+            self._session_key(session_id),
+            self._encode({"last_activity": now.isoformat()}),
+            ttl=ttl
+        )
+        await self._index(user_id, session_id, ttl)
+    
+    async def get_user_sessions(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get every active session of a user, most recently active first."""
+        set_key = USER_SESSIONS_KEY.format(user_id)
+        session_ids = await redis_manager.set_members(set_key) or []
+        
+        results = await redis_manager.hash_get_all_many([self._session_key(session_id) for session_id in session_ids])
+        if results is None:
+            return []
+        
+        sessions = []
+        expired = []
+        for session_id, fields in zip(session_ids, results):
+            if fields:
+                sessions.append(self._decode(fields))
+            else:
+                expired.append(session_id)
+        
+        # Sessions expire on their own; drop them from the index as they are noticed
+        if expired:
+            await redis_manager.set_remove(set_key, expired)
+        
+        sessions.sort(key=lambda session: session["last_activity"], reverse=True)
+        return sessions
     
     async def get_user_session(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get active session for a user."""
-        session_id = await cache_service.get(f"user_session:{user_id}")
-        if session_id:
-            return await self.get_session(session_id)
+        """Get the most recently active session of a user."""
+        sessions = await self.get_user_sessions(user_id)
+        if sessions:
+            return await self.get_session(sessions[0]["session_id"])
         return None
     
     async def update_session(
@@ -93,56 +162,55 @@ class SessionService:
         session_id: str, 
         session_data: Dict[str, Any]
     ) -> bool:
-        """Update session data."""
-        existing_session = await cache_service.get(f"{self.session_prefix}{session_id}")
-        if existing_session and isinstance(existing_session, dict):
-            # Merge data
-            existing_session.update(session_data)
-            existing_session["last_activity"] = datetime.utcnow().isoformat()
-            
-            return await cache_service.set(
-                f"{self.session_prefix}{session_id}",
-                existing_session,
-                ttl=settings.CACHE_TTL_USER_SESSIONS
-            )
-        return False
+        """Update session fields; only the given fields are written."""
+        key = self._session_key(session_id)
+        if not await redis_manager.exists(key):
+            return False
+        
+        # Session metadata is managed here, not by callers
+        updates = {field: value for field, value in session_data.items() if field not in SESSION_METADATA}
+        updates["last_activity"] = datetime.utcnow().isoformat()
+        ttl = settings.CACHE_TTL_USER_SESSIONS
+        updated = await redis_manager.hash_set(key, self._encode(updates), ttl=ttl)
+        await self._index(self._user_id_of(session_id), session_id, ttl)
+        return updated
     
     async def delete_session(self, session_id: str) -> bool:
         """Delete a session."""
-        session_data = await cache_service.get(f"{self.session_prefix}{session_id}")
-        if session_data and isinstance(session_data, dict):
-            user_id = session_data.get("user_id")
-            
-            # Delete session
-            await cache_service.delete(f"{self.session_prefix}{session_id}")
-            
-            # Delete user session mapping
-            if user_id:
-                await cache_service.delete(f"user_session:{user_id}")
-            
-            logger.info(f"Deleted session {session_id}")
-            return True
-        return False
+        key = self._session_key(session_id)
+        fields = await redis_manager.hash_get_all(key)
+        if not fields:
+            return False
+        
+        user_id = self._decode(fields)["user_id"]
+        await redis_manager.delete(key)
+        await redis_manager.set_remove(USER_SESSIONS_KEY.format(user_id), [session_id])
+        
+        logger.info(f"Deleted session {session_id}")
+        return True
     
     async def delete_user_sessions(self, user_id: str) -> bool:
-        """Delete all sessions for a user."""
-        session_id = await cache_service.get(f"user_session:{user_id}")
-        if session_id:
-            await self.delete_session(session_id)
-            return True
-        return False
+        """Delete all sessions for a user: one SMEMBERS, then a single DEL."""
+        set_key = USER_SESSIONS_KEY.format(user_id)
+        session_ids = await redis_manager.set_members(set_key)
+        if not session_ids:
+            return False
+        
+        deleted = await redis_manager.delete_many(
+            [self._session_key(session_id) for session_id in session_ids] + [set_key]
+        )
+        logger.info(f"Deleted {len(session_ids)} sessions for user {user_id}")
+        return deleted > 0
     
     async def extend_session(self, session_id: str, extend_by: int = None) -> bool:
         """Extend session TTL."""
-        session_data = await cache_service.get(f"{self.session_prefix}{session_id}")
-        if session_data:
-            ttl = extend_by or settings.CACHE_TTL_USER_SESSIONS
-            return await cache_service.set(
-                f"{self.session_prefix}{session_id}",
-                session_data,
-                ttl=ttl
-            )
-        return False
+        fields = await redis_manager.hash_get_all(self._session_key(session_id))
+        if not fields:
+            return False
+        
+        user_id = self._decode(fields)["user_id"]
+        await self._touch(session_id, user_id, datetime.utcnow(), ttl=extend_by)
+        return True
     
     async def blacklist_token(self, token: str, expires_in: int = None) -> bool:
         """
@@ -154,14 +222,14 @@ class SessionService:
         """
         ttl = expires_in or settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
         return await cache_service.set(
-            f"{self.token_blacklist_prefix}{token}",
+            f"{self.token_blacklist_prefix}{token_hash(token)}",
             {"blacklisted_at": datetime.utcnow().isoformat()},
             ttl=ttl
         )
     
     async def is_token_blacklisted(self, token: str) -> bool:
         """Check if a token is blacklisted."""
-        return await cache_service.exists(f"{self.token_blacklist_prefix}{token}")
+        return await cache_service.exists(f"{self.token_blacklist_prefix}{token_hash(token)}")
     
     async def check_rate_limit(
         self, 
@@ -180,34 +248,14 @@ class SessionService:
             action: Action type for logging
             
         Returns:
-            (is_allowed, current_count, ttl_seconds)
+            (is_allowed, current_count, ttl_seconds); when denied, ttl_seconds
+            is how long until the request would be admitted.
         """
-        key = f"{self.rate_limit_prefix}{identifier}:{action}"
-        
-        # Get current count
-        current_count = await cache_service.get(key)
-        if current_count is None:
-            current_count = 0
-        else:
-            current_count = int(current_count)
-        
-        # Increment counter
-        new_count = current_count + 1
-        await cache_service.set(key, new_count, ttl=window_seconds)
-        
-        # Check if limit exceeded
-        is_allowed = new_count <= limit
-        
-        # Get TTL
-        redis_manager = await cache_service._get_redis()
-        ttl = await redis_manager.get_ttl(key)
-        if ttl is None or ttl < 0:
-            ttl = window_seconds
-        
-        if not is_allowed:
-            logger.warning(f"Rate limit exceeded for {identifier}: {new_count}/{limit}")
-        
-        return is_allowed, new_count, ttl
+        decision = await rate_limiter.check(identifier, [(action, limit, window_seconds)])
+        window = decision.windows[0]
+        current_count = limit - window.remaining
+        ttl = max(1, math.ceil(window.retry_after if not decision.allowed else window.reset_after))
+        return decision.allowed, current_count, ttl
     
     async def cleanup_expired_sessions(self) -> int:
         """Clean up expired sessions (for maintenance)."""
@@ -217,4 +265,4 @@ class SessionService:
         return 0
 
 # Global session service instance
-session_service = SessionService()
+session_service = SessionService(touch_interval=settings.SESSION_TOUCH_INTERVAL)
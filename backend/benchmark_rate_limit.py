@@ -0,0 +1,212 @@
+"""
+Benchmark the rate limiting middleware against the implementation it replaced:
+a BaseHTTPMiddleware that kept a read-modify-write counter in Redis for every
+window.
+
+Requests are driven straight through the ASGI interface of a minimal FastAPI
+app, so the numbers reflect middleware overhead rather than networking.
+Without --redis the current limiter runs on its per-worker buckets alone and
+the baseline's cache calls return immediately, so only the middleware style
+differs; with --redis both pay for their Redis round trips.
+
+    python benchmark_rate_limit.py [--requests N] [--concurrency N] [--redis]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.db.redis import redis_manager
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.services.cache import cache_service
+from app.services.rate_limiter import rate_limiter
+
+# High enough that no benchmark request is rejected
+BENCH_LIMIT = 10_000_000
+
+
+async def baseline_check_rate_limit(identifier: str, limit: int, window_seconds: int, action: str):
+    """The previous SessionService.check_rate_limit: a read, a write and a TTL lookup."""
+    key = f"rate_limit:{identifier}:{action}"
+    current_count = await cache_service.get(key)
+    new_count = (int(current_count) if current_count is not None else 0) + 1
+    await cache_service.set(key, new_count, ttl=window_seconds)
+    ttl = await redis_manager.get_ttl(key)
+    if ttl is None or ttl < 0:
+        ttl = window_seconds
+    return new_count <= limit, new_count, ttl
+
+
+class BaselineRateLimitMiddleware(BaseHTTPMiddleware):
+    """
+    The dispatch path of the middleware before the rewrite, kept here for
+    comparison: BaseHTTPMiddleware checking each window with the fixed-window
+    counter above.
+    """
+
+    endpoint_limits = {
+        "/api/v1/auth/login": {"requests": 100, "window": 60},
+        "/api/v1/auth/register": {"requests": 100, "window": 60},
+        "/api/v1/auth/reset-password": {"requests": 50, "window": 60},
+        "/api/v1/products": {"requests": 300, "window": 60},
+    }
+
+    def __init__(self, app, default_requests_per_minute: int = 60, default_requests_per_hour: int = 1000):
+        super().__init__(app)
+        self.default_requests_per_minute = default_requests_per_minute
+        self.default_requests_per_hour = default_requests_per_hour
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        identifier = self.get_client_ip(request)
+        path = request.url.path
+        if path in ["/health", "/", "/docs", "/redoc", "/openapi.json"]:
+            return await call_next(request)
+        try:
+            await self._apply_rate_limits(identifier, path, request.method)
+            return await call_next(request)
+        except HTTPException as e:
+            return JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail, "type": "rate_limit_exceeded"}
+            )
+        except Exception:
+            return await call_next(request)
+
+    def get_client_ip(self, request: Request) -> str:
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+        real_ip = request.headers.get("X-Real-IP")
+        if real_ip:
+            return real_ip
+        return request.client.host if request.client else "unknown"
+
+    async def _apply_rate_limits(self, identifier: str, path: str, method: str):
+        windows = [
+            (f"{identifier}:minute", self.default_requests_per_minute, 60, "default_minute"),
+            (f"{identifier}:hour", self.default_requests_per_hour, 3600, "default_hour"),
+        ]
+        if path in self.endpoint_limits:
+            limit_config = self.endpoint_limits[path]
+            windows.insert(0, (f"{identifier}:{path}", limit_config["requests"], limit_config["window"], f"{method}:{path}"))
+        for key, limit, window, action in windows:
+            allowed, count, ttl = await baseline_check_rate_limit(key, limit, window, action)
+            if not allowed:
+                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
+
+
+def build_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/products/{product_id}")
+    async def get_product(product_id: str):
+        return {"id": product_id, "name": "Benchmark product"}
+
+    @app.get("/api/v1/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(10):
+                yield b"x" * 1024
+        return StreamingResponse(chunks())
+
+    if middleware is not None:
+        app.add_middleware(
+            middleware,
+            default_requests_per_minute=BENCH_LIMIT,
+            default_requests_per_hour=BENCH_LIMIT
+        )
+    return app
+
+
+async def call(app: FastAPI, path: str, client: str) -> float:
+    """Send one GET through the ASGI interface and return its latency in seconds."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": (client, 50000),
+        "server": ("bench", 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+async def run_case(name: str, app: FastAPI, path: str, requests: int, concurrency: int) -> Dict[str, float]:
+    # Warm up routing, validation caches and limiter buckets
+    for i in range(50):
+        await call(app, path, f"10.0.0.{i % 10}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int):
+        async with semaphore:
+            latencies.append(await call(app, path, f"10.0.{i % 50}.{i % 200}"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "case": name,
+        "rps": requests / elapsed,
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rate limiting middleware")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redis", action="store_true", help="Check limits against the configured Redis")
+    args = parser.parse_args()
+
+    if args.redis:
+        await redis_manager.connect()
+
+    apps = [
+        ("no middleware", build_app()),
+        ("BaseHTTPMiddleware (previous)", build_app(BaselineRateLimitMiddleware)),
+        ("pure ASGI (current)", build_app(RateLimitMiddleware)),
+    ]
+    for path in ("/api/v1/products/42", "/api/v1/stream"):
+        print(f"\n{path}: {args.requests} requests, concurrency {args.concurrency}")
+        print(f"{'case':<32}{'req/s':>10}{'p50 us':>10}{'p99 us':>10}")
+        for name, app in apps:
+            result = await run_case(name, app, path, args.requests, args.concurrency)
+            print(f"{result['case']:<32}{result['rps']:>10.0f}{result['p50_us']:>10.0f}{result['p99_us']:>10.0f}")
+
+    if args.redis:
+        await rate_limiter.sync()
+        await redis_manager.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
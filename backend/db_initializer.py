@@ -20,8 +20,8 @@ from bson import ObjectId
 from dotenv import load_dotenv
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
-from pymongo import ASCENDING, DESCENDING, TEXT
-from pymongo.errors import ConnectionFailure, DuplicateKeyError, OperationFailure
+from pymongo import ASCENDING, DESCENDING, TEXT, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, OperationFailure
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -43,6 +43,16 @@ ADMIN_FULL_NAME = os.getenv("ADMIN_FULL_NAME", "Admin User")
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Migration that copies roles from user_roles into the user documents
+EMBED_USER_ROLES_MIGRATION = "embed_user_roles"
+# Migration that adds the lowercased name used by the customer directory search
+USER_SEARCH_NAMES_MIGRATION = "user_search_names"
+# Migration that sets created_at, which the customer directory pages on, where it is missing
+USER_CREATED_AT_MIGRATION = "user_created_at"
+# Migration that stores the indexed short ID used for order tracking
+ORDER_SHORT_IDS_MIGRATION = "order_short_ids"
+MIGRATION_BATCH_SIZE = 1000
+
 class AdminUserCreate(BaseModel):
     email: EmailStr
     password: str
@@ -86,6 +96,23 @@ class DatabaseInitializer:
             else:
                 logger.info("Admin user already exists")
             
+            # Copy roles into user documents (resumes where a previous run stopped)
+            if not await self._migration_completed(EMBED_USER_ROLES_MIGRATION):
+                logger.info("User roles not embedded in user documents yet, migrating...")
+                tasks.append(self._embed_user_roles())
+            
+            if not await self._migration_completed(USER_SEARCH_NAMES_MIGRATION):
+                logger.info("User search names missing, backfilling...")
+                tasks.append(self._backfill_user_search_names())
+            
+            if not await self._migration_completed(USER_CREATED_AT_MIGRATION):
+                logger.info("Some users may lack a creation date, backfilling...")
+                tasks.append(self._backfill_user_created_at())
+            
+            if not await self._migration_completed(ORDER_SHORT_IDS_MIGRATION):
+                logger.info("Order short IDs missing, backfilling...")
+                tasks.append(self._backfill_order_short_ids())
+            
             # Check and create default settings
             if not await self._default_settings_exist():
                 logger.info("Default settings not found, creating them...")
@@ -174,6 +201,9 @@ class DatabaseInitializer:
                 ([('firebase_uid', ASCENDING)], {"sparse": True, "background": True}),
                 ([('email_verified', ASCENDING)], {"background": True}),
                 ([('created_at', DESCENDING)], {"background": True}),
+                ([('role', ASCENDING)], {"background": True}),
+                ([('created_at', DESCENDING), ('_id', DESCENDING)], {"background": True}),
+                ([('full_name_lower', ASCENDING)], {"background": True}),
             ],
             'user_roles': [
                 ([('user_id', ASCENDING)], {"unique": True, "background": True}),
@@ -196,6 +226,7 @@ class DatabaseInitializer:
                 ([('created_at', DESCENDING)], {"background": True}),
                 ([('updated_at', DESCENDING)], {"background": True}),
                 ([('premium_code_id', ASCENDING)], {"sparse": True, "background": True}),
+                ([('short_id', ASCENDING)], {"unique": True, "sparse": True, "background": True}),
                 ([('user_id', ASCENDING), ('created_at', DESCENDING)], {"background": True}),
                 ([('status', ASCENDING), ('created_at', DESCENDING)], {"background": True}),
                 ([('user_id', ASCENDING), ('status', ASCENDING)], {"background": True}),
@@ -223,6 +254,11 @@ class DatabaseInitializer:
                 ([('user_id', ASCENDING)], {"background": True}),
                 ([('expires_at', ASCENDING)], {"background": True}),
             ],
+            'refresh_token_audit': [
+                ([('token_hash', ASCENDING)], {"unique": True, "background": True}),
+                ([('user_id', ASCENDING)], {"background": True}),
+                ([('expires_at', ASCENDING)], {"expireAfterSeconds": 0, "background": True}),
+            ],
             'payment_settings': [
                 ([('created_at', DESCENDING)], {"background": True}),
             ],
@@ -263,7 +299,9 @@ class DatabaseInitializer:
     async def _admin_user_exists(self) -> bool:
         """Check if admin user exists"""
         try:
-            # Check if any user has admin role
+            # Check if any user has admin role (user_roles covers databases not migrated yet)
+            if await self.db.users.find_one({"role": "admin"}, {"_id": 1}):
+                return True
             admin_role = await self.db.user_roles.find_one({"role": "admin"})
             return admin_role is not None
             
@@ -292,6 +330,9 @@ class DatabaseInitializer:
                 ([('firebase_uid', ASCENDING)], {"sparse": True, "background": True}),
                 ([('email_verified', ASCENDING)], {"background": True}),
                 ([('created_at', DESCENDING)], {"background": True}),
+                ([('role', ASCENDING)], {"background": True}),
+                ([('created_at', DESCENDING), ('_id', DESCENDING)], {"background": True}),
+                ([('full_name_lower', ASCENDING)], {"background": True}),
             ])
             
             # User roles collection indexes
@@ -320,6 +361,7 @@ class DatabaseInitializer:
                 ([('created_at', DESCENDING)], {"background": True}),
                 ([('updated_at', DESCENDING)], {"background": True}),
                 ([('premium_code_id', ASCENDING)], {"sparse": True, "background": True}),
+                ([('short_id', ASCENDING)], {"unique": True, "sparse": True, "background": True}),
                 ([('user_id', ASCENDING), ('created_at', DESCENDING)], {"background": True}),
                 ([('status', ASCENDING), ('created_at', DESCENDING)], {"background": True}),
                 ([('user_id', ASCENDING), ('status', ASCENDING)], {"background": True}),
@@ -353,6 +395,13 @@ class DatabaseInitializer:
                 ([('user_id', ASCENDING)], {"background": True}),
                 ([('expires_at', ASCENDING)], {"background": True}),
             ])
+            
+            # Refresh token audit trail (hashes only); entries expire with their token
+            await self._create_collection_indexes('refresh_token_audit', [
+                ([('token_hash', ASCENDING)], {"unique": True, "background": True}),
+                ([('user_id', ASCENDING)], {"background": True}),
+                ([('expires_at', ASCENDING)], {"expireAfterSeconds": 0, "background": True}),
+            ])
               # Payment settings collection indexes
             await self._create_collection_indexes('payment_settings', [
                 ([('created_at', DESCENDING)], {"background": True}),
@@ -441,21 +490,13 @@ class DatabaseInitializer:
                 "full_name": admin.full_name,
                 "hashed_password": hashed_password,
                 "email_verified": True,  # Admin users are pre-verified
-                "created_at": datetime.utcnow(),
-            }
-            
-            # Insert user
-            user_result = await self.db.users.insert_one(user_doc)
-            user_id = user_result.inserted_id
-            
-            # Create admin role
-            role_doc = {
-                "user_id": user_id,
                 "role": "admin",
+                "full_name_lower": admin.full_name.lower(),
                 "created_at": datetime.utcnow(),
             }
             
-            await self.db.user_roles.insert_one(role_doc)
+            # Insert user
+            await self.db.users.insert_one(user_doc)
             
             logger.info(f"Admin user created successfully: {admin.email}")
             return True
@@ -467,6 +508,177 @@ class DatabaseInitializer:
             logger.error(f"Error creating admin user: {e}")
             return False
     
+    async def _migration_completed(self, name: str) -> bool:
+        """Check if a data migration has finished"""
+        try:
+            state = await self.db.migrations.find_one({"_id": name})
+            return bool(state and state.get("completed"))
+            
+        except Exception as e:
+            logger.error(f"Error checking migration {name}: {e}")
+            return False
+    
+    async def _embed_user_roles(self) -> bool:
+        """
+        Copy each user's role from user_roles into their user document.
+        Progress is checkpointed after every batch, so an interrupted run resumes
+        where it stopped. Roles already set on a user document are never
+        overwritten, and users without a role entry become customers.
+        """
+        try:
+            state = await self.db.migrations.find_one({"_id": EMBED_USER_ROLES_MIGRATION}) or {}
+            last_id = state.get("last_id")
+            migrated = state.get("migrated", 0)
+            
+            while True:
+                query = {"_id": {"$gt": last_id}} if last_id else {}
+                cursor = self.db.user_roles.find(query, {"user_id": 1, "role": 1}).sort("_id", ASCENDING)
+                batch = await cursor.limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+                if not batch:
+                    break
+                
+                result = await self.db.users.bulk_write([
+                    UpdateOne(
+                        {"_id": role_doc["user_id"], "role": {"$exists": False}},
+                        {"$set": {"role": role_doc["role"]}}
+                    )
+                    for role_doc in batch
+                ], ordered=False)
+                last_id = batch[-1]["_id"]
+                migrated += result.modified_count
+                await self.db.migrations.update_one(
+                    {"_id": EMBED_USER_ROLES_MIGRATION},
+                    {"$set": {"last_id": last_id, "migrated": migrated, "updated_at": datetime.utcnow()}},
+                    upsert=True
+                )
+                logger.info(f"Embedded {migrated} user roles so far")
+            
+            defaulted = await self.db.users.update_many(
+                {"role": {"$exists": False}},
+                {"$set": {"role": "customer"}}
+            )
+            await self.db.migrations.update_one(
+                {"_id": EMBED_USER_ROLES_MIGRATION},
+                {"$set": {"completed": True, "migrated": migrated, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            logger.info(f"User roles embedded: {migrated} copied, {defaulted.modified_count} defaulted to customer")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error embedding user roles: {e}")
+            return False
+    
+    async def _backfill_user_search_names(self) -> bool:
+        """
+        Store a lowercased copy of each user's full name, which backs the
+        indexed name prefix search. Only users without one are touched, so the
+        backfill can be rerun safely.
+        """
+        try:
+            result = await self.db.users.update_many(
+                {"full_name_lower": {"$exists": False}},
+                [{"$set": {"full_name_lower": {"$toLower": {"$ifNull": ["$full_name", ""]}}}}]
+            )
+            await self.db.migrations.update_one(
+                {"_id": USER_SEARCH_NAMES_MIGRATION},
+                {"$set": {"completed": True, "migrated": result.modified_count, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            logger.info(f"User search names backfilled for {result.modified_count} users")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error backfilling user search names: {e}")
+            return False
+    
+    async def _backfill_user_created_at(self) -> bool:
+        """
+        Give users without a created_at the creation time of their ObjectId, so
+        every user sorts and pages on a real date in the customer directory.
+        """
+        try:
+            result = await self.db.users.update_many(
+                {"created_at": None},
+                [{"$set": {"created_at": {"$toDate": "$_id"}}}]
+            )
+            await self.db.migrations.update_one(
+                {"_id": USER_CREATED_AT_MIGRATION},
+                {"$set": {"completed": True, "migrated": result.modified_count, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            logger.info(f"Creation dates backfilled for {result.modified_count} users")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error backfilling user creation dates: {e}")
+            return False
+    
+    async def _backfill_order_short_ids(self) -> bool:
+        """
+        Store the short ID (last 8 characters of the order ID) on orders created
+        before it was assigned at checkout. The unique index is created first,
+        so orders whose short ID clashes with an earlier order are skipped and
+        logged; they stay trackable by their full ID. Progress is checkpointed
+        after every batch.
+        """
+        try:
+            await self.db.orders.create_index(
+                [('short_id', ASCENDING)], unique=True, sparse=True, background=True
+            )
+            state = await self.db.migrations.find_one({"_id": ORDER_SHORT_IDS_MIGRATION}) or {}
+            last_id = state.get("last_id")
+            migrated = state.get("migrated", 0)
+            skipped = state.get("skipped", 0)
+            
+            while True:
+                query = {"short_id": {"$exists": False}}
+                if last_id:
+                    query["_id"] = {"$gt": last_id}
+                cursor = self.db.orders.find(query, {"_id": 1}).sort("_id", ASCENDING)
+                batch = await cursor.limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+                if not batch:
+                    break
+                
+                requests = [
+                    UpdateOne(
+                        {"_id": order["_id"], "short_id": {"$exists": False}},
+                        {"$set": {"short_id": str(order["_id"])[-8:].lower()}}
+                    )
+                    for order in batch
+                ]
+                try:
+                    result = await self.db.orders.bulk_write(requests, ordered=False)
+                    migrated += result.modified_count
+                except BulkWriteError as e:
+                    clashes = [error for error in e.details.get("writeErrors", []) if error.get("code") == 11000]
+                    if len(clashes) != len(e.details.get("writeErrors", [])):
+                        raise
+                    for error in clashes:
+                        logger.warning(f"Order {batch[error['index']]['_id']} shares its short ID with another order, skipped")
+                    migrated += e.details.get("nModified", 0)
+                    skipped += len(clashes)
+                
+                last_id = batch[-1]["_id"]
+                await self.db.migrations.update_one(
+                    {"_id": ORDER_SHORT_IDS_MIGRATION},
+                    {"$set": {"last_id": last_id, "migrated": migrated, "skipped": skipped, "updated_at": datetime.utcnow()}},
+                    upsert=True
+                )
+                logger.info(f"Backfilled {migrated} order short IDs so far")
+            
+            await self.db.migrations.update_one(
+                {"_id": ORDER_SHORT_IDS_MIGRATION},
+                {"$set": {"completed": True, "migrated": migrated, "skipped": skipped, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            logger.info(f"Order short IDs backfilled: {migrated} set, {skipped} skipped as duplicates")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error backfilling order short IDs: {e}")
+            return False
+    
     async def _create_default_settings(self) -> bool:
         """Create default payment settings"""
         try:            # Default payment settings
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import sys
 from datetime import datetime
@@ -12,7 +13,11 @@ from app.core.config import settings
 from app.db.mongodb import close_mongo_connection, connect_to_mongo, db
 from app.db.redis import close_redis_connection, connect_to_redis
 from app.middleware.rate_limit import RateLimitMiddleware
+from app.services.cache import cache_service
+from app.services.cache_warmer import warm_cache
 from app.services.firebase_auth import firebase_auth_service
+from app.services.http_client import http_client
+from app.services.rate_limiter import rate_limiter
 from db_initializer import initialize_database_on_startup
 
 # Configure logging
@@ -74,6 +79,24 @@ async def startup_db_client():
     await connect_to_redis() 
     logger.info("Redis connection initialized")
     
+    # Keep the in-process cache tier coherent across workers
+    await cache_service.start_invalidation_listener()
+    
+    # Push tokens spent against per-worker rate limit buckets to Redis
+    await rate_limiter.start_sync()
+    
+    # Pooled client for the payment gateway and Firebase REST calls
+    await http_client.start()
+    
+    # Preload expensive read paths so the first requests after a deploy hit a warm cache
+    if settings.CACHE_WARM_ON_STARTUP:
+        try:
+            await asyncio.wait_for(warm_cache(), timeout=settings.CACHE_WARM_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Cache warm-up did not finish within {settings.CACHE_WARM_TIMEOUT}s, continuing startup")
+        except Exception as e:
+            logger.error(f"Cache warm-up error: {e}")
+    
     # Initialize Firebase (this happens automatically when imported)
     if firebase_auth_service._app:
         logger.info("Firebase authentication initialized successfully")
@@ -86,6 +109,9 @@ async def shutdown_db_client():
     await close_mongo_connection()
     logger.info("Database connection closed")
     
+    await cache_service.stop_invalidation_listener()
+    await rate_limiter.stop_sync()
+    await http_client.close()
     await close_redis_connection()
     logger.info("Redis connection closed")
 
@@ -108,7 +134,8 @@ async def health_check():
             "api": "healthy",
             "mongodb": "healthy",  # Assume healthy if we can respond  
             "redis": "healthy" if await redis_manager.is_connected() else "degraded"
-        }
+        },
+        "redis_circuit": redis_manager.state
     }
     
     return health_status
@@ -6,7 +6,9 @@ import logging
 from typing import Any, Dict, List
 
 from app.db.redis import redis_manager
+from app.db.mongodb import close_mongo_connection, connect_to_mongo
 from app.services.cache import cache_service
+from app.services.cache_warmer import WARMERS, configured_families, warm_cache
 from app.services.session import session_service
 
 logging.basicConfig(level=logging.INFO)
@@ -25,8 +27,8 @@ class CacheManager:
         
     async def get_cache_stats(self) -> Dict[str, Any]:
         """Get Redis cache statistics."""
-        if not await self.redis.is_connected():
-            return {"error": "Redis not connected"}
+        if not await self.redis.ping():
+            return {"error": "Redis not connected", "health": self.redis.get_health_status()}
         
         try:
             info = await self.redis.redis.info()
@@ -38,6 +40,7 @@ class CacheManager:
                 "memory_used": info.get("used_memory_human", "Unknown"),
                 "memory_peak": info.get("used_memory_peak_human", "Unknown"),
                 "connections": info.get("connected_clients", 0),
+                "circuit_state": self.redis.state,
                 "keyspace_hits": info.get("keyspace_hits", 0),
                 "keyspace_misses": info.get("keyspace_misses", 0),
                 "hit_rate": self._calculate_hit_rate(
@@ -97,8 +100,8 @@ class CacheManager:
     
     async def clear_user_sessions(self) -> int:
         """Clear all user session cache entries."""
-        count = await self.clear_cache_by_pattern("user_session:*")
-        count += await self.clear_cache_by_pattern("session:*")
+        count = await self.clear_cache_by_pattern("session:*")
+        count += await self.clear_cache_by_pattern("user_sessions:*")
         logger.info(f"Cleared {count} user session entries")
         return count
     
@@ -146,6 +149,18 @@ class CacheManager:
         logger.info(f"  Hit Rate: {self._calculate_hit_rate(hits_diff, misses_diff):.2f}%")
         logger.info(f"  Keys Added/Removed: {final_stats['total_keys'] - initial_stats['total_keys']}")
 
+    async def warm(self, families: List[str], concurrency: int = None) -> Dict[str, Any]:
+        """Preload cache families, printing progress as each load finishes."""
+        def report(done: int, total: int, name: str, ok: bool) -> None:
+            status = "ok" if ok else "FAILED"
+            print(f"  [{done}/{total}] {name} {status}")
+        
+        await connect_to_mongo()
+        try:
+            return await warm_cache(families, concurrency=concurrency, progress=report)
+        finally:
+            await close_mongo_connection()
+
 # CLI Commands
 async def main():
     """Main CLI interface for cache management."""
@@ -164,6 +179,8 @@ async def main():
         print("  clear-all - Clear all cache (DANGER!)")
         print("  monitor [seconds] - Monitor performance")
         print("  size-by-type - Show cache size by type")
+        print("  warm [family ...] [--concurrency N] - Preload cache families")
+        print(f"      families: {', '.join(WARMERS)} (default: {', '.join(configured_families())})")
         return
     
     command = sys.argv[1].lower()
@@ -204,6 +221,21 @@ async def main():
         for cache_type, count in sizes.items():
             print(f"  {cache_type}: {count}")
     
+    elif command == "warm":
+        args = sys.argv[2:]
+        concurrency = None
+        if "--concurrency" in args:
+            index = args.index("--concurrency")
+            concurrency = int(args[index + 1])
+            del args[index:index + 2]
+        families = args or configured_families()
+        print(f"Warming cache families: {', '.join(families)}")
+        summary = await cache_manager.warm(families, concurrency)
+        if summary["skipped"]:
+            print("Skipped: Redis is not available")
+        else:
+            print(f"Warmed {summary['warmed']} entries, {summary['failed']} failed, in {summary['seconds']}s")
+    
     else:
         print(f"Unknown command: {command}")
     
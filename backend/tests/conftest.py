@@ -0,0 +1,37 @@
+"""
+Shared test fixtures.
+
+Redis is replaced by an in-memory fakeredis server wired into the global
+redis_manager, so services and repositories run their real Redis code paths.
+Test dependencies are listed in requirements-dev.txt.
+"""
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from app.db.redis import CircuitState, RedisMode, redis_manager
+from app.services.cache import cache_service
+from app.services.cache_metrics import cache_metrics
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """A fresh in-memory Redis behind redis_manager; returns the text client."""
+    server = fakeredis.FakeServer()
+    client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(redis_manager, "redis", client)
+    monkeypatch.setattr(redis_manager, "binary_redis", fakeredis.aioredis.FakeRedis(server=server))
+    monkeypatch.setattr(redis_manager, "replica_redis", None)
+    monkeypatch.setattr(redis_manager, "mode", RedisMode.STANDALONE)
+    monkeypatch.setattr(redis_manager, "_scripts", {})
+    monkeypatch.setattr(redis_manager, "_state", CircuitState.CLOSED)
+    monkeypatch.setattr(redis_manager, "_consecutive_failures", 0)
+    cache_service.local_cache.clear()
+    cache_service._generations.clear()
+    cache_metrics.reset()
+    return client
@@ -0,0 +1,131 @@
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app.api import dependencies
+from app.core.config import settings
+from app.core.security import create_access_token, create_refresh_token, decode_access_token
+from app.models.user import Principal, UserProfile
+
+pytestmark = pytest.mark.anyio
+
+ADMIN = UserProfile(id="a1", email="admin@example.com", full_name="Ada", phone="+8801", role="admin")
+CUSTOMER = UserProfile(id="c1", email="customer@example.com", full_name="Cy", firebase_uid="fb-1")
+
+
+@pytest.fixture
+def users(monkeypatch):
+    """Profiles and profile versions served in place of the user repository."""
+    profiles = {ADMIN.id: ADMIN, CUSTOMER.id: CUSTOMER}
+    versions = {ADMIN.id: 1, CUSTOMER.id: 1}
+    loads = []
+
+    async def get_profile(user_id):
+        loads.append(("profile", user_id))
+        return profiles.get(user_id)
+
+    async def get_profile_version(user_id):
+        loads.append(("version", user_id))
+        return versions.get(user_id)
+
+    monkeypatch.setattr(dependencies.UserRepository, "get_profile", staticmethod(get_profile))
+    monkeypatch.setattr(dependencies.UserRepository, "get_profile_version", staticmethod(get_profile_version))
+    return profiles, versions, loads
+
+
+def token_for(profile: UserProfile, version: int = 1) -> str:
+    return create_access_token(subject=profile.id, profile=profile, profile_version=version)
+
+
+def test_access_token_carries_no_personal_data():
+    claims = jwt.get_unverified_claims(token_for(CUSTOMER))
+
+    assert claims["role"] == "customer"
+    assert claims["pv"] == 1
+    assert claims["sub"] == CUSTOMER.id
+    for field in ("email", "full_name", "phone", "avatar_url", "firebase_uid"):
+        assert field not in claims
+
+
+async def test_current_user_is_loaded_from_profile(users):
+    user = await dependencies.get_current_user(token_for(CUSTOMER))
+
+    assert user.id == CUSTOMER.id
+    assert user.email == CUSTOMER.email
+    assert user.firebase_uid == "fb-1"
+
+
+async def test_current_user_profile_includes_role(users):
+    profile = await dependencies.get_current_user_profile(token_for(ADMIN))
+
+    assert profile == ADMIN
+
+
+async def test_deleted_user_is_rejected(users):
+    profiles, _, _ = users
+    token = token_for(CUSTOMER)
+    del profiles[CUSTOMER.id]
+
+    with pytest.raises(HTTPException) as error:
+        await dependencies.get_current_user(token)
+    assert error.value.status_code == 401
+
+
+async def test_principal_comes_from_claims_alone(users):
+    _, _, loads = users
+
+    principal = await dependencies.get_current_principal(token_for(CUSTOMER))
+
+    assert principal == Principal(id=CUSTOMER.id, role="customer")
+    assert loads == []
+
+
+async def test_admin_with_current_claims_skips_profile(users):
+    _, _, loads = users
+
+    principal = await dependencies.get_current_admin(token_for(ADMIN))
+
+    assert principal == Principal(id=ADMIN.id, role="admin")
+    assert loads == [("version", ADMIN.id)]
+
+
+async def test_customer_rejected_without_loading_profile(users):
+    _, _, loads = users
+
+    with pytest.raises(HTTPException) as error:
+        await dependencies.get_current_admin(token_for(CUSTOMER))
+    assert error.value.status_code == 403
+    assert loads == [("version", CUSTOMER.id)]
+
+
+async def test_promoted_user_admitted_from_profile(users):
+    profiles, versions, _ = users
+    token = token_for(CUSTOMER)
+    profiles[CUSTOMER.id] = CUSTOMER.model_copy(update={"role": "admin"})
+    versions[CUSTOMER.id] = 2
+
+    principal = await dependencies.get_current_admin(token)
+
+    assert principal == Principal(id=CUSTOMER.id, role="admin")
+
+
+async def test_demoted_admin_rejected_immediately(users):
+    profiles, versions, _ = users
+    token = token_for(ADMIN)
+    profiles[ADMIN.id] = ADMIN.model_copy(update={"role": "customer"})
+    versions[ADMIN.id] = 2
+
+    with pytest.raises(HTTPException) as error:
+        await dependencies.get_current_admin(token)
+    assert error.value.status_code == 403
+
+
+async def test_invalid_token_rejected(users):
+    with pytest.raises(HTTPException) as error:
+        await dependencies.get_current_user("not-a-token")
+    assert error.value.status_code == 401
+
+
+def test_refresh_token_is_not_an_access_token():
+    assert decode_access_token(create_refresh_token("c1")) is None
+    assert jwt.decode(create_refresh_token("c1"), settings.REFRESH_TOKEN_SECRET_KEY, algorithms=[settings.ALGORITHM])["sub"] == "c1"
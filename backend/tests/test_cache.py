@@ -0,0 +1,411 @@
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import pytest
+from bson import ObjectId
+from pydantic import BaseModel
+
+import app.repositories.product as product_repository
+from app.core.config import settings
+from app.db.redis import CircuitState, redis_manager
+from app.repositories.product import ProductRepository
+from app.services.cache import cache_service, cached
+from app.services.cache_metrics import cache_metrics
+
+pytestmark = pytest.mark.anyio
+
+
+def family_stats(family: str) -> Dict:
+    return cache_metrics.snapshot()["families"].get(family, {})
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+
+async def publish_later(key: str, lock_token: str, delay: float, value=None) -> None:
+    """Act as another worker that holds the lock and then publishes its result."""
+    await asyncio.sleep(delay)
+    if value is None:
+        await cache_service.set_tombstone(key)
+    else:
+        await cache_service.set(key, value, ttl=60)
+    await cache_service.release_lock(key, lock_token)
+
+
+# Miss coalescing and recompute locks
+
+async def test_concurrent_misses_share_one_computation(fake_redis):
+    counter = Counter()
+
+    @cached("report:{name}", ttl=60)
+    async def build(name: str) -> Dict[str, int]:
+        counter.calls += 1
+        await asyncio.sleep(0.05)
+        return {"calls": counter.calls}
+
+    results = await asyncio.gather(*(build("daily") for _ in range(5)))
+
+    assert results == [{"calls": 1}] * 5
+    assert await build("daily") == {"calls": 1}
+    assert counter.calls == 1
+
+
+async def test_lock_waiter_gets_value_published_by_holder(fake_redis):
+    counter = Counter()
+
+    @cached("report:{name}", ttl=60, lock=True, lock_timeout=5)
+    async def build(name: str) -> int:
+        counter.calls += 1
+        return 42
+
+    token = await cache_service.acquire_lock("report:daily", 5)
+    holder = asyncio.create_task(publish_later("report:daily", token, 0.2, value=7))
+
+    assert await build("daily") == 7
+    await holder
+    assert counter.calls == 0
+    # Only the initial lookup counts; polling while waiting is not a miss
+    assert family_stats("report")["misses"] == 1
+
+
+async def test_lock_waiter_returns_none_result_without_timing_out(fake_redis):
+    counter = Counter()
+
+    @cached("report:{name}", ttl=60, lock=True, lock_timeout=5)
+    async def find(name: str) -> Optional[int]:
+        counter.calls += 1
+        return None
+
+    token = await cache_service.acquire_lock("report:missing", 5)
+    holder = asyncio.create_task(publish_later("report:missing", token, 0.1))
+
+    started = time.monotonic()
+    assert await find("missing") is None
+    assert time.monotonic() - started < 1
+    await holder
+    assert counter.calls == 0
+
+
+async def test_locked_none_result_is_published_as_tombstone(fake_redis):
+    counter = Counter()
+
+    @cached("report:{name}", ttl=60, lock=True)
+    async def find(name: str) -> Optional[int]:
+        counter.calls += 1
+        return None
+
+    assert await find("missing") is None
+    assert await cache_service.get_entry("report:missing") == (None, True)
+    assert await find("missing") is None
+    assert counter.calls == 1
+    # The lock is released
+    assert await cache_service.acquire_lock("report:missing", 5) is not None
+
+
+async def test_unlocked_none_result_is_not_cached(fake_redis):
+    counter = Counter()
+
+    @cached("report:{name}", ttl=60)
+    async def find(name: str) -> Optional[int]:
+        counter.calls += 1
+        return None
+
+    assert await find("missing") is None
+    assert await find("missing") is None
+    assert counter.calls == 2
+
+
+# Namespace generations
+
+async def test_versioned_key_folds_in_generation(fake_redis):
+    key = await cache_service.versioned_key("quiz_topic", "quiz_topic:list:0:100")
+    generation = await fake_redis.get("cache_gen:quiz_topic")
+
+    assert key == f"quiz_topic:g{generation}:list:0:100"
+    assert await cache_service.versioned_key("quiz_topic", "list:0:100") == key
+
+    await cache_service.bump_namespaces("quiz_topic")
+
+    assert await cache_service.versioned_key("quiz_topic", "list:0:100") != key
+
+
+async def test_bump_invalidates_cached_namespace(fake_redis):
+    counter = Counter()
+
+    @cached("quiz_topic:list:{skip}", ttl=60, namespace="quiz_topic")
+    async def list_topics(skip: int) -> int:
+        counter.calls += 1
+        return counter.calls
+
+    assert await list_topics(0) == 1
+    assert await list_topics(0) == 1
+
+    await cache_service.bump_namespaces("quiz_topic")
+
+    assert await list_topics(0) == 2
+    assert counter.calls == 2
+
+
+async def test_generation_bumped_by_another_worker(fake_redis):
+    generation = await cache_service.get_generation("quiz_topic")
+
+    # Another worker bumps the shared generation and broadcasts the namespace
+    await fake_redis.set("cache_gen:quiz_topic", generation + 1)
+    cache_service._handle_invalidation(json.dumps({"origin": "other-worker", "namespaces": ["quiz_topic"]}))
+
+    assert await cache_service.get_generation("quiz_topic") == generation + 1
+
+
+async def test_evicted_generation_does_not_revive_old_entries(fake_redis):
+    counter = Counter()
+
+    @cached("quiz_topic:list:{skip}", ttl=60, namespace="quiz_topic")
+    async def list_topics(skip: int) -> int:
+        counter.calls += 1
+        return counter.calls
+
+    seen = set()
+    for _ in range(3):
+        seen.add(await cache_service.get_generation("quiz_topic"))
+        await list_topics(0)
+        await cache_service.bump_namespaces("quiz_topic")
+        # Redis evicts the generation under memory pressure
+        await fake_redis.delete("cache_gen:quiz_topic")
+        cache_service._generations.clear()
+
+    assert len(seen) == 3
+    assert counter.calls == 3
+
+
+async def test_unrelated_namespace_keeps_generation(fake_redis):
+    product = await cache_service.get_generation("product")
+
+    await cache_service.bump_namespaces("quiz_topic")
+
+    assert await cache_service.get_generation("product") == product
+    assert await cache_service.get_generation("quiz_topic") != product
+
+
+async def test_generation_is_not_pinned_without_redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(redis_manager, "_state", CircuitState.OPEN)
+
+    assert await cache_service.get_generation("quiz_topic") == 0
+    assert cache_service._generations.get("quiz_topic") is None
+
+
+# Stale-while-revalidate
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Lets a test move time.time() forward to age entries past their fresh TTL."""
+    class Clock:
+        offset = 0.0
+
+        def advance(self, seconds: float) -> None:
+            self.offset += seconds
+
+    clock = Clock()
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + clock.offset)
+    return clock
+
+
+async def settle(condition, timeout: float = 1.0) -> None:
+    """Wait for background refreshes until condition() holds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "background refresh did not run"
+        await asyncio.sleep(0.01)
+
+
+async def test_get_swr_reports_staleness(fake_redis, clock):
+    await cache_service.set("report:swr", {"v": 1}, ttl=10, stale_ttl=60)
+    await cache_service.set("report:plain", {"v": 1}, ttl=60)
+
+    assert await cache_service.get_swr("report:swr") == ({"v": 1}, False)
+    # Kept for the fresh TTL plus the stale window
+    assert 60 < await fake_redis.ttl("report:swr") <= 70
+
+    clock.advance(11)
+
+    assert await cache_service.get_swr("report:swr") == ({"v": 1}, True)
+    assert await cache_service.get("report:swr") == {"v": 1}
+    assert await cache_service.get_swr("report:plain") == ({"v": 1}, False)
+
+
+async def test_stale_entry_is_served_while_refreshing(fake_redis, clock):
+    counter = Counter()
+
+    @cached("report:{name}", ttl=10, stale_ttl=60)
+    async def build(name: str) -> int:
+        counter.calls += 1
+        return counter.calls
+
+    assert await build("daily") == 1
+    clock.advance(11)
+
+    assert await build("daily") == 1
+    await settle(lambda: counter.calls == 2)
+
+    assert await build("daily") == 2
+    assert counter.calls == 2
+    assert family_stats("report")["stale_hits"] == 1
+
+
+async def test_concurrent_stale_reads_refresh_once(fake_redis, clock):
+    counter = Counter()
+
+    @cached("report:{name}", ttl=10, stale_ttl=60)
+    async def build(name: str) -> int:
+        counter.calls += 1
+        await asyncio.sleep(0.05)
+        return counter.calls
+
+    assert await build("daily") == 1
+    clock.advance(11)
+
+    assert await asyncio.gather(*(build("daily") for _ in range(5))) == [1] * 5
+    await settle(lambda: counter.calls == 2)
+    await asyncio.sleep(0.1)
+
+    assert counter.calls == 2
+
+
+async def test_get_many_unwraps_stale_entries(fake_redis):
+    await cache_service.set("report:a", {"v": 1}, ttl=10, stale_ttl=60)
+    await cache_service.set("report:b", {"v": 2}, ttl=10)
+
+    assert await cache_service.get_many(["report:a", "report:b", "report:c"]) == {
+        "report:a": {"v": 1},
+        "report:b": {"v": 2},
+    }
+
+
+# Return types rebuilt on a hit
+
+class Item(BaseModel):
+    id: str
+    price: float
+    tags: List[str] = []
+    created_at: Optional[datetime] = None
+
+
+async def test_models_come_back_as_declared_types(fake_redis):
+    counter = Counter()
+    created_at = datetime(2024, 5, 1, 12, 30)
+
+    @cached("item:{item_id}", ttl=60)
+    async def get_item(item_id: str) -> Optional[Item]:
+        counter.calls += 1
+        return Item(id=item_id, price=9.5, tags=["new"], created_at=created_at)
+
+    @cached("item:list:{limit}", ttl=60)
+    async def list_items(limit: int) -> List[Item]:
+        counter.calls += 1
+        return [Item(id=str(i), price=i) for i in range(limit)]
+
+    first = await get_item("a")
+    assert await get_item("a") == first
+    assert isinstance(await get_item("a"), Item)
+    assert (await get_item("a")).created_at == created_at
+
+    items = await list_items(3)
+    assert await list_items(3) == items
+    assert all(isinstance(item, Item) for item in await list_items(3))
+    assert counter.calls == 2
+
+
+async def test_primitives_come_back_as_declared_types(fake_redis):
+    @cached("stats:count", ttl=60)
+    async def count() -> int:
+        return 3
+
+    @cached("stats:enabled", ttl=60)
+    async def enabled() -> bool:
+        return False
+
+    @cached("stats:by_day", ttl=60)
+    async def by_day() -> Dict[date, float]:
+        return {date(2024, 5, 1): 1.5}
+
+    for _ in range(2):
+        assert await count() == 3
+        assert await enabled() is False
+        assert await by_day() == {date(2024, 5, 1): 1.5}
+
+
+async def test_entry_of_older_return_type_is_recomputed(fake_redis):
+    await cache_service.set("item:a", {"id": "a"}, ttl=60)
+
+    @cached("item:{item_id}", ttl=60)
+    async def get_item(item_id: str) -> Item:
+        return Item(id=item_id, price=1.0)
+
+    assert await get_item("a") == Item(id="a", price=1.0)
+    assert await cache_service.get("item:a") == {"id": "a", "price": 1.0, "tags": [], "created_at": None}
+
+
+async def test_key_built_from_defaults_and_keywords(fake_redis):
+    @cached("item:list:{skip}:{limit}", ttl=60)
+    async def list_items(skip: int = 0, limit: int = 10) -> List[int]:
+        return list(range(skip, skip + limit))
+
+    await list_items(limit=2)
+    await list_items(5, 1)
+
+    assert await cache_service.get("item:list:0:2") == [0, 1]
+    assert await cache_service.get("item:list:5:1") == [5]
+
+
+# Not-found tombstones
+
+async def test_tombstone_reads_as_known_missing(fake_redis):
+    await cache_service.set_tombstone("order:gone")
+
+    assert await cache_service.get_entry("order:gone") == (None, True)
+    assert await cache_service.get("order:gone") is None
+    assert await cache_service.get_entry("order:unknown") == (None, False)
+    assert 0 < await fake_redis.ttl("order:gone") <= settings.CACHE_NEGATIVE_TTL
+
+    stats = family_stats("order")
+    assert (stats["negative_writes"], stats["negative_hits"], stats["misses"]) == (1, 2, 1)
+
+
+async def test_get_many_skips_tombstones(fake_redis):
+    await cache_service.set("order:a", {"id": "a"}, ttl=60)
+    await cache_service.set_tombstone("order:b")
+    # Local-tier family: the tombstone is also served from process memory
+    await cache_service.set_tombstone("product:c")
+
+    assert await cache_service.get_many(["order:a", "order:b", "product:c"]) == {"order:a": {"id": "a"}}
+    assert await cache_service.get_many(["product:c"]) == {}
+    assert family_stats("product")["negative_hits"] == 2
+
+
+async def test_missing_product_is_looked_up_once(fake_redis, monkeypatch):
+    lookups = Counter()
+
+    class Products:
+        async def find_one(self, query):
+            lookups.calls += 1
+            return None
+
+    async def get_database():
+        return SimpleNamespace(products=Products())
+    monkeypatch.setattr(product_repository, "get_database", get_database)
+
+    product_id = str(ObjectId())
+    assert await ProductRepository.get_by_id(product_id) is None
+    assert await ProductRepository.get_by_id(product_id) is None
+    assert lookups.calls == 1
+
+    # Creating the product clears the tombstone
+    await cache_service.invalidate_product(product_id)
+    assert await ProductRepository.get_by_id(product_id) is None
+    assert lookups.calls == 2
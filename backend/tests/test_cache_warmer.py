@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.cache_warmer as cache_warmer
+from app.repositories.product import ProductRepository
+from app.services.cache_warmer import warm_cache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def category_loads(monkeypatch):
+    """Records the category loads a warm-up makes, with one active category in Mongo."""
+    loads = []
+
+    class Products:
+        async def distinct(self, field, query):
+            return ["cards", None]
+
+    async def get_database():
+        return SimpleNamespace(products=Products())
+
+    async def get_by_category(category, skip=0, limit=100, active_only=False):
+        loads.append(("list", category, skip, limit, active_only))
+
+    async def count_by_category(category, active_only=False):
+        loads.append(("count", category, active_only))
+
+    monkeypatch.setattr(cache_warmer, "get_database", get_database)
+    monkeypatch.setattr(ProductRepository, "get_by_category", staticmethod(get_by_category))
+    monkeypatch.setattr(ProductRepository, "count_by_category", staticmethod(count_by_category))
+    return loads
+
+
+async def test_category_warm_up_covers_endpoint_defaults(fake_redis, category_loads):
+    summary = await warm_cache(["product_categories"])
+
+    assert summary["warmed"] == 4 and summary["failed"] == 0
+    # GET /products?category=cards with no other parameters
+    assert ("list", "cards", 0, cache_warmer.DEFAULT_PAGE_SIZE, False) in category_loads
+    assert ("count", "cards", False) in category_loads
+    assert ("list", "cards", 0, cache_warmer.DEFAULT_PAGE_SIZE, True) in category_loads
+
+
+async def test_warm_up_skipped_without_redis(fake_redis, category_loads, monkeypatch):
+    monkeypatch.setattr(cache_warmer.redis_manager, "redis", None)
+
+    assert (await warm_cache(["product_categories"]))["skipped"]
+    assert category_loads == []
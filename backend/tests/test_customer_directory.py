@@ -0,0 +1,106 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import app.repositories.user as user_repository
+from app.repositories.user import (
+    UserRepository,
+    decode_directory_cursor,
+    encode_directory_cursor,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+class AggregateResult:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+
+class Users:
+    """Users collection whose aggregation returns preset documents, recording the pipeline."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return AggregateResult(self.docs)
+
+
+@pytest.fixture
+def users(monkeypatch):
+    collection = Users([])
+
+    async def get_database():
+        return SimpleNamespace(users=collection)
+    monkeypatch.setattr(user_repository, "get_database", get_database)
+    return collection
+
+
+def user_doc(created_at=None, **fields):
+    doc = {"_id": ObjectId(), "email": f"{ObjectId()}@example.com", "role": "customer", "order_stats": [], **fields}
+    if created_at:
+        doc["created_at"] = created_at
+    return doc
+
+
+def test_cursor_round_trip():
+    created_at, user_id = datetime(2024, 5, 1, 12, 30), ObjectId()
+
+    assert decode_directory_cursor(encode_directory_cursor(created_at, user_id)) == (created_at, user_id)
+
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_directory_cursor("not-a-cursor")
+
+
+async def test_next_cursor_continues_after_last_user(users):
+    newest = user_doc(datetime(2024, 5, 2), order_stats=[{"order_count": 2, "total_spent": 150.0}])
+    users.docs = [newest, user_doc(datetime(2024, 5, 1)), user_doc(datetime(2024, 4, 30))]
+
+    page = await UserRepository.get_customer_directory(limit=2)
+
+    assert page.has_more
+    assert [customer.id for customer in page.data] == [str(doc["_id"]) for doc in users.docs[:2]]
+    assert page.data[0].order_stats.order_count == 2
+    assert decode_directory_cursor(page.next_cursor) == (datetime(2024, 5, 1), users.docs[1]["_id"])
+
+
+async def test_user_without_created_at_pages_on_id(users):
+    legacy = user_doc()
+    users.docs = [legacy, user_doc()]
+
+    page = await UserRepository.get_customer_directory(limit=1)
+
+    assert page.data[0].created_at is None
+    assert decode_directory_cursor(page.next_cursor) == (None, legacy["_id"])
+
+    await UserRepository.get_customer_directory(limit=1, cursor=page.next_cursor)
+
+    assert users.pipelines[1][0]["$match"]["$and"] == [{"created_at": None, "_id": {"$lt": legacy["_id"]}}]
+
+
+async def test_dated_cursor_continues_into_users_without_created_at(users):
+    cursor = encode_directory_cursor(datetime(2024, 5, 1), ObjectId())
+
+    await UserRepository.get_customer_directory(limit=10, cursor=cursor)
+
+    assert {"created_at": None} in users.pipelines[0][0]["$match"]["$and"][0]["$or"]
+
+
+async def test_cursor_and_search_are_matched(users):
+    cursor = encode_directory_cursor(datetime(2024, 5, 1), ObjectId())
+
+    await UserRepository.get_customer_directory(limit=10, cursor=cursor, search=" Ada.L ")
+
+    match = users.pipelines[0][0]["$match"]["$and"]
+    assert match[0]["$or"][0] == {"created_at": {"$lt": datetime(2024, 5, 1)}}
+    assert match[1]["$or"][0] == {"email": {"$regex": r"^ada\.l"}}
@@ -0,0 +1,175 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from jose import jwt
+
+from app.services.firebase_tokens import (
+    DEFAULT_KEYS_MAX_AGE,
+    ISSUER_PREFIX,
+    MIN_REFRESH_INTERVAL,
+    ExpiredFirebaseTokenError,
+    FirebaseTokenVerifier,
+    InvalidFirebaseTokenError,
+    parse_max_age,
+)
+
+pytestmark = pytest.mark.anyio
+
+PROJECT_ID = "chemouflage-test"
+
+
+def make_key_pair():
+    """A private key (PEM) and a self-signed certificate (PEM) for it."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.test")])
+    now = datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+KEY_1 = make_key_pair()
+KEY_2 = make_key_pair()
+
+
+class KeySource:
+    """Serves the given certificates, counting fetches."""
+
+    def __init__(self, *certs):
+        self.certs = dict(certs)
+        self.fetches = 0
+
+    async def __call__(self):
+        self.fetches += 1
+        return dict(self.certs), 3600
+
+
+def make_token(private_pem=KEY_1[0], kid="k1", algorithm="RS256", **overrides):
+    now = int(time.time())
+    claims = {
+        "aud": PROJECT_ID,
+        "iss": ISSUER_PREFIX + PROJECT_ID,
+        "sub": "firebase-uid-1",
+        "email": "user@example.com",
+        "iat": now - 10,
+        "auth_time": now - 10,
+        "exp": now + 3600,
+        **overrides,
+    }
+    return jwt.encode(claims, private_pem, algorithm=algorithm, headers={"kid": kid})
+
+
+@pytest.fixture
+def key_source():
+    return KeySource(("k1", KEY_1[1]))
+
+
+@pytest.fixture
+def verifier(key_source):
+    return FirebaseTokenVerifier(PROJECT_ID, key_source=key_source)
+
+
+async def test_valid_token(verifier):
+    claims = await verifier.verify(make_token())
+
+    assert claims["uid"] == "firebase-uid-1"
+    assert claims["email"] == "user@example.com"
+
+
+async def test_expired_token(verifier):
+    now = int(time.time())
+    token = make_token(iat=now - 7200, auth_time=now - 7200, exp=now - 3600)
+
+    with pytest.raises(ExpiredFirebaseTokenError):
+        await verifier.verify(token)
+
+
+@pytest.mark.parametrize("claims", [
+    {"aud": "another-project"},
+    {"iss": ISSUER_PREFIX + "another-project"},
+    {"sub": ""},
+    {"iat": int(time.time()) + 3600},
+])
+async def test_token_for_another_project_or_malformed_claims(verifier, claims):
+    with pytest.raises(InvalidFirebaseTokenError):
+        await verifier.verify(make_token(**claims))
+
+
+async def test_token_signed_with_another_key(verifier):
+    with pytest.raises(InvalidFirebaseTokenError):
+        await verifier.verify(make_token(private_pem=KEY_2[0]))
+
+
+async def test_non_rs256_algorithm(verifier):
+    token = jwt.encode({"sub": "x", "aud": PROJECT_ID}, "shared-secret", algorithm="HS256", headers={"kid": "k1"})
+
+    with pytest.raises(InvalidFirebaseTokenError):
+        await verifier.verify(token)
+
+
+async def test_garbage_token(verifier):
+    with pytest.raises(InvalidFirebaseTokenError):
+        await verifier.verify("not.a.token")
+
+
+async def test_unknown_kid_refetch_is_rate_limited(verifier, key_source):
+    await verifier.verify(make_token())
+    assert key_source.fetches == 1
+
+    # Google rotated its keys; the new key is not seen until a refetch is allowed
+    key_source.certs["k2"] = KEY_2[1]
+    with pytest.raises(InvalidFirebaseTokenError):
+        await verifier.verify(make_token(private_pem=KEY_2[0], kid="k2"))
+    assert key_source.fetches == 1
+
+    verifier._keys_fetched_at -= MIN_REFRESH_INTERVAL
+    claims = await verifier.verify(make_token(private_pem=KEY_2[0], kid="k2"))
+    assert claims["uid"] == "firebase-uid-1"
+    assert key_source.fetches == 2
+
+
+async def test_verified_claims_are_cached(verifier, key_source, monkeypatch):
+    token = make_token()
+    first = await verifier.verify(token)
+
+    def fail_decode(*args):
+        raise AssertionError("cached token was decoded again")
+    monkeypatch.setattr(verifier, "_decode", fail_decode)
+
+    assert await verifier.verify(token) == first
+    assert key_source.fetches == 1
+
+
+async def test_failed_key_fetch_keeps_previous_keys(verifier, key_source):
+    await verifier.verify(make_token())
+
+    async def failing_source():
+        raise OSError("network down")
+    verifier.key_source = failing_source
+    verifier._keys_expire_at = 0
+
+    claims = await verifier.verify(make_token(sub="firebase-uid-2"))
+    assert claims["uid"] == "firebase-uid-2"
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=19845, must-revalidate") == 19845
+    assert parse_max_age(None) == DEFAULT_KEYS_MAX_AGE
@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.http_client import HttpClient
+
+pytestmark = pytest.mark.anyio
+
+
+class Upstream:
+    """Stub upstream: each request is answered by the next scripted reply."""
+
+    def __init__(self, *replies, delay: float = 0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            reply = self.replies.pop(0) if self.replies else 200
+            if isinstance(reply, Exception):
+                raise reply
+            return httpx.Response(reply, json={"ok": reply == 200})
+        finally:
+            self.in_flight -= 1
+
+
+def make_client(upstream: Upstream, **options) -> HttpClient:
+    options.setdefault("backoff_base", 0)
+    return HttpClient(transport=httpx.MockTransport(upstream), **options)
+
+
+async def test_get_is_retried_on_gateway_errors():
+    upstream = Upstream(502, 503, 200)
+    client = make_client(upstream)
+
+    response = await client.get("https://api.example.com/status")
+
+    assert response.status_code == 200
+    assert upstream.calls == 3
+    stats = client.snapshot()["hosts"]["api.example.com"]
+    assert stats["retries"] == 2
+    assert stats["statuses"] == {"5xx": 2, "2xx": 1}
+    await client.close()
+
+
+async def test_gateway_error_returned_once_retries_run_out():
+    upstream = Upstream(503, 503, 503, 503)
+    client = make_client(upstream, retries=2)
+
+    response = await client.get("https://api.example.com/status")
+
+    assert response.status_code == 503
+    assert upstream.calls == 3
+    await client.close()
+
+
+async def test_post_is_not_retried_after_read_error():
+    upstream = Upstream(httpx.ReadError("connection reset"), 200)
+    client = make_client(upstream)
+
+    with pytest.raises(httpx.ReadError):
+        await client.post("https://pay.example.com/charge", json={"amount": 10})
+    assert upstream.calls == 1
+    await client.close()
+
+
+async def test_post_is_not_retried_on_gateway_error():
+    upstream = Upstream(502, 200)
+    client = make_client(upstream)
+
+    response = await client.post("https://pay.example.com/charge")
+
+    assert response.status_code == 502
+    assert upstream.calls == 1
+    await client.close()
+
+
+async def test_post_is_retried_when_connection_failed():
+    upstream = Upstream(httpx.ConnectError("refused"), 200)
+    client = make_client(upstream)
+
+    response = await client.post("https://pay.example.com/charge")
+
+    assert response.status_code == 200
+    assert upstream.calls == 2
+    await client.close()
+
+
+async def test_retry_unsafe_allows_post_retries():
+    upstream = Upstream(httpx.ReadError("connection reset"), 200)
+    client = make_client(upstream)
+
+    response = await client.post("https://pay.example.com/status", retry_unsafe=True)
+
+    assert response.status_code == 200
+    assert upstream.calls == 2
+    await client.close()
+
+
+async def test_time_budget_covers_backoff():
+    upstream = Upstream(*[503] * 10)
+    client = make_client(upstream, retries=10)
+    client._backoff = lambda attempt: 0.2
+
+    started = time.monotonic()
+    with pytest.raises(httpx.TimeoutException):
+        await client.get("https://api.example.com/status", timeout=0.5)
+    # Attempts at 0, 0.2 and 0.4s; the next backoff would overrun the budget
+    assert upstream.calls == 3
+    assert time.monotonic() - started < 0.5
+    await client.close()
+
+
+async def test_time_budget_covers_slow_responses():
+    upstream = Upstream(200, delay=1)
+    client = make_client(upstream)
+
+    started = time.monotonic()
+    with pytest.raises(httpx.TimeoutException):
+        await client.get("https://api.example.com/slow", timeout=0.1)
+    assert time.monotonic() - started < 0.5
+    assert client.snapshot()["hosts"]["api.example.com"]["errors"] == 1
+    await client.close()
+
+
+async def test_concurrency_is_capped_per_host():
+    upstream = Upstream(delay=0.05)
+    client = make_client(upstream, max_connections_per_host=2)
+
+    await asyncio.gather(
+        *(client.get(f"https://api.example.com/items/{i}") for i in range(6)),
+        *(client.get(f"https://cdn.example.com/assets/{i}") for i in range(2)),
+    )
+
+    assert upstream.calls == 8
+    # Two slots per host, two hosts
+    assert upstream.max_in_flight == 4
+    await client.close()
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import app.repositories.order as order_repository
+from app.repositories.order import OrderRepository
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def order_queries(monkeypatch):
+    """An orders collection without any orders; returns the queries it received."""
+    queries = []
+
+    class Orders:
+        async def find_one(self, query):
+            queries.append(query)
+            return None
+
+    async def get_database():
+        return SimpleNamespace(orders=Orders())
+    monkeypatch.setattr(order_repository, "get_database", get_database)
+    return queries
+
+
+async def test_unknown_full_id_is_queried_once(fake_redis, order_queries):
+    order_id = ObjectId()
+
+    assert await OrderRepository.find_for_tracking(str(order_id)) is None
+    assert order_queries == [{"_id": order_id}]
+
+    # Remembered as missing
+    assert await OrderRepository.find_for_tracking(str(order_id)) is None
+    assert len(order_queries) == 1
+
+
+async def test_short_id_is_looked_up_by_index(fake_redis, order_queries):
+    assert await OrderRepository.find_for_tracking(" AbCd1234 ") is None
+
+    assert order_queries == [{"short_id": "abcd1234"}]
+
+
+async def test_malformed_id_skips_mongo(fake_redis, order_queries):
+    assert await OrderRepository.find_for_tracking("not-an-order-id") is None
+    assert await OrderRepository.find_for_tracking("z" * 24) is None
+
+    assert order_queries == []
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+from app.db.redis import CircuitState, redis_manager
+from app.services.rate_limiter import RateLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def limiter():
+    """A limiter that checks every request against Redis."""
+    return RateLimiter(local_enabled=False)
+
+
+# GCRA in Redis
+
+async def test_admits_up_to_limit_then_rejects(fake_redis, limiter):
+    windows = [("minute", 5, 60)]
+
+    remaining = []
+    for _ in range(5):
+        decision = await limiter.check("10.0.0.1", windows)
+        assert decision.allowed and not decision.local
+        remaining.append(decision.windows[0].remaining)
+    rejected = await limiter.check("10.0.0.1", windows)
+
+    assert remaining == [4, 3, 2, 1, 0]
+    assert not rejected.allowed
+    # One request is replenished every period / limit seconds
+    assert 11 < rejected.blocking.retry_after <= 12
+    assert 59 < rejected.windows[0].reset_after <= 60
+
+
+async def test_identifiers_are_limited_separately(fake_redis, limiter):
+    windows = [("minute", 1, 60)]
+
+    assert (await limiter.check("10.0.0.1", windows)).allowed
+    assert not (await limiter.check("10.0.0.1", windows)).allowed
+    assert (await limiter.check("10.0.0.2", windows)).allowed
+
+
+async def test_rejected_request_consumes_no_window(fake_redis, limiter):
+    windows = [("minute", 10, 60), ("login", 2, 60)]
+
+    for _ in range(2):
+        assert (await limiter.check("10.0.0.1", windows)).allowed
+    rejected = await limiter.check("10.0.0.1", windows)
+
+    assert not rejected.allowed
+    assert rejected.blocking.name == "login"
+    assert rejected.windows[0].retry_after == 0
+    # The minute window was not charged for the rejected request
+    assert (await limiter.check("10.0.0.1", [("minute", 10, 60)])).windows[0].remaining == 7
+
+
+async def test_cost_is_consumed_all_or_nothing(fake_redis, limiter):
+    windows = [("minute", 5, 60)]
+
+    assert (await limiter.check("10.0.0.1", windows, cost=3)).allowed
+    assert not (await limiter.check("10.0.0.1", windows, cost=3)).allowed
+    assert (await limiter.check("10.0.0.1", windows, cost=2)).allowed
+
+
+async def test_workers_share_limits_through_redis(fake_redis):
+    windows = [("minute", 3, 60)]
+    workers = [RateLimiter(local_enabled=False), RateLimiter(local_enabled=False)]
+
+    decisions = [await workers[i % 2].check("10.0.0.1", windows) for i in range(4)]
+
+    assert [decision.allowed for decision in decisions] == [True, True, True, False]
+
+
+async def test_windows_of_an_identifier_share_a_slot(fake_redis, limiter):
+    await limiter.check("user:42", [("minute", 10, 60), ("hour", 100, 3600)])
+
+    keys = sorted(await fake_redis.keys("rate_limit:*"))
+    assert keys == ["rate_limit:{user:42}:hour", "rate_limit:{user:42}:minute"]
+    # Keys expire once the window has fully replenished
+    assert 0 < await fake_redis.pttl("rate_limit:{user:42}:minute") <= 6000
+
+
+# Per-worker leases
+
+@pytest.fixture
+def redis_checks(monkeypatch):
+    """Counts the limiter's round trips to Redis."""
+    calls = []
+    run_script = redis_manager.run_script
+
+    async def counting_run_script(script, keys, args):
+        calls.append(args)
+        return await run_script(script, keys, args)
+    monkeypatch.setattr(redis_manager, "run_script", counting_run_script)
+    return calls
+
+
+async def test_requests_within_lease_skip_redis(fake_redis, redis_checks):
+    limiter = RateLimiter(local_share=0.1, sync_interval=60)
+    windows = [("minute", 100, 60)]
+
+    first = await limiter.check("10.0.0.1", windows)
+    # 99 remain globally, so this worker may spend 9 on its own
+    leased = [await limiter.check("10.0.0.1", windows) for _ in range(9)]
+    synced = await limiter.check("10.0.0.1", windows)
+
+    assert not first.local and not synced.local
+    assert all(decision.allowed and decision.local for decision in leased)
+    # The 9 locally admitted requests are pushed along with the next check
+    assert redis_checks == [[1, 100, 60, 0], [1, 100, 60, 9]]
+    assert synced.windows[0].remaining == 89
+
+
+async def test_lease_expires_after_sync_interval(fake_redis, redis_checks):
+    limiter = RateLimiter(local_share=0.5, sync_interval=0.05)
+    windows = [("minute", 100, 60)]
+
+    await limiter.check("10.0.0.1", windows)
+    assert (await limiter.check("10.0.0.1", windows)).local
+    await asyncio.sleep(0.06)
+
+    assert not (await limiter.check("10.0.0.1", windows)).local
+    assert len(redis_checks) == 2
+
+
+async def test_sync_pushes_locally_spent_tokens(fake_redis):
+    limiter = RateLimiter(local_share=0.5, sync_interval=60)
+    windows = [("minute", 100, 60)]
+
+    for _ in range(5):
+        await limiter.check("10.0.0.1", windows)
+
+    assert await limiter.sync() == 1
+    assert await limiter.sync() == 0
+    other_worker = RateLimiter(local_enabled=False)
+    assert (await other_worker.check("10.0.0.1", windows)).windows[0].remaining == 94
+
+
+async def test_other_workers_traffic_caps_local_bucket(fake_redis, monkeypatch):
+    windows = [("minute", 5, 60)]
+    limiter = RateLimiter(sync_interval=60)
+    other_worker = RateLimiter(local_enabled=False)
+
+    await limiter.check("10.0.0.1", windows)
+    for _ in range(4):
+        await other_worker.check("10.0.0.1", windows)
+    assert not (await limiter.check("10.0.0.1", windows)).allowed
+
+    # With Redis down the worker still remembers the quota is spent
+    monkeypatch.setattr(redis_manager, "_state", CircuitState.OPEN)
+    assert not (await limiter.check("10.0.0.1", windows)).allowed
+
+
+async def test_local_buckets_enforce_limits_without_redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(redis_manager, "_state", CircuitState.OPEN)
+    limiter = RateLimiter()
+    windows = [("minute", 3, 60)]
+
+    decisions = [await limiter.check("10.0.0.1", windows) for _ in range(4)]
+
+    assert [decision.allowed for decision in decisions] == [True, True, True, False]
+    assert all(decision.local for decision in decisions)
+    assert 19 < decisions[-1].blocking.retry_after <= 20
+    assert not limiter.check_local("10.0.0.1", windows).allowed
+    assert limiter.check_local("10.0.0.2", windows).allowed
+
+
+async def test_least_recently_used_buckets_are_evicted(fake_redis):
+    limiter = RateLimiter(max_keys=2)
+    windows = [("minute", 10, 60)]
+
+    for identifier in ("10.0.0.1", "10.0.0.2", "10.0.0.1", "10.0.0.3"):
+        limiter.check_local(identifier, windows)
+
+    assert list(limiter._buckets) == [("10.0.0.1", "minute"), ("10.0.0.3", "minute")]
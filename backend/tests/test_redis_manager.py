@@ -0,0 +1,42 @@
+import pytest
+
+from app.db.redis import RedisMode, redis_manager
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def cluster_mode(fake_redis, monkeypatch):
+    monkeypatch.setattr(redis_manager, "mode", RedisMode.CLUSTER)
+    return fake_redis
+
+
+async def test_cluster_keys_are_not_rewritten(cluster_mode):
+    await redis_manager.set_value("product:1", {"name": "Kit"})
+    await redis_manager.hash_set("refresh_token:abc", {"user_id": "u1"})
+
+    assert set(await cluster_mode.keys("*")) == {"product:1", "refresh_token:abc"}
+    assert await redis_manager.get_value("product:1") == {"name": "Kit"}
+
+
+async def test_existing_hash_tags_are_kept(cluster_mode):
+    await redis_manager.set_add("user_sessions:{u1}", ["s1"])
+
+    assert await cluster_mode.smembers("user_sessions:{u1}") == {"s1"}
+
+
+async def test_batch_operations_round_trip(fake_redis):
+    await redis_manager.set_values({"product:1": 1, "user_profile:2": {"id": "2"}}, ttl=60)
+
+    assert await redis_manager.get_values(["product:1", "missing", "user_profile:2"]) == [1, None, {"id": "2"}]
+    assert await redis_manager.delete_many(["product:1", "user_profile:2", "missing"]) == 2
+
+
+async def test_set_ttl_is_only_extended(fake_redis):
+    await redis_manager.set_add("members", ["a"], ttl=3600)
+    await redis_manager.set_add("members", ["b"], ttl=60)
+    assert await fake_redis.ttl("members") > 3500
+
+    await redis_manager.set_add("members", ["c"], ttl=7200)
+    assert await fake_redis.ttl("members") > 7100
+    assert await redis_manager.set_members("members") is not None
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+import app.repositories.token as token_repository
+from app.core.security import token_hash
+from app.repositories.token import (
+    REFRESH_TOKEN_KEY,
+    USER_REFRESH_TOKENS_KEY,
+    RefreshTokenRepository,
+)
+
+pytestmark = pytest.mark.anyio
+
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+
+
+class EmptyCollection:
+    async def find_one_and_update(self, *args, **kwargs):
+        return None
+
+    async def update_many(self, *args, **kwargs):
+        return SimpleNamespace(modified_count=0)
+
+
+@pytest.fixture(autouse=True)
+def empty_legacy_store(monkeypatch):
+    """The legacy Mongo token store holds no tokens."""
+    async def get_database():
+        return SimpleNamespace(refresh_tokens=EmptyCollection())
+    monkeypatch.setattr(token_repository, "get_database", get_database)
+
+
+async def test_rotate_replaces_token(fake_redis):
+    await RefreshTokenRepository.create(USER_ID, "old")
+
+    assert await RefreshTokenRepository.rotate("old", "new") == USER_ID
+    assert await RefreshTokenRepository.is_token_valid("new")
+    ttl = await fake_redis.ttl(REFRESH_TOKEN_KEY.format(token_hash("old")))
+    assert 0 < ttl <= settings.REFRESH_TOKEN_ROTATION_GRACE
+
+
+async def test_reuse_within_grace_issues_fresh_token(fake_redis):
+    await RefreshTokenRepository.create(USER_ID, "old")
+    await RefreshTokenRepository.rotate("old", "new1")
+
+    assert await RefreshTokenRepository.rotate("old", "new2") == USER_ID
+    assert await RefreshTokenRepository.is_token_valid("new1")
+    assert await RefreshTokenRepository.is_token_valid("new2")
+    members = await fake_redis.smembers(USER_REFRESH_TOKENS_KEY.format(USER_ID))
+    assert {token_hash("new1"), token_hash("new2")} <= members
+
+
+async def test_rotated_token_stores_no_raw_successor(fake_redis):
+    await RefreshTokenRepository.create(USER_ID, "old")
+    await RefreshTokenRepository.rotate("old", "new1")
+
+    rotated = await fake_redis.hgetall(REFRESH_TOKEN_KEY.format(token_hash("old")))
+    assert rotated["successor"] == token_hash("new1")
+    for key in await fake_redis.keys("*"):
+        value = await fake_redis.hgetall(key) if await fake_redis.type(key) == "hash" else {}
+        assert "new1" not in value.values()
+
+
+async def test_reuse_within_grace_rejected_once_successor_revoked(fake_redis):
+    await RefreshTokenRepository.create(USER_ID, "old")
+    await RefreshTokenRepository.rotate("old", "new1")
+    await RefreshTokenRepository.revoke("new1")
+
+    assert await RefreshTokenRepository.rotate("old", "new2") is None
+    assert not await RefreshTokenRepository.is_token_valid("new2")
+
+
+async def test_revoke_all_covers_tokens_in_grace(fake_redis):
+    await RefreshTokenRepository.create(USER_ID, "old")
+    await RefreshTokenRepository.rotate("old", "new1")
+    await RefreshTokenRepository.rotate("old", "new2")
+
+    await RefreshTokenRepository.revoke_all_for_user(USER_ID)
+
+    assert await RefreshTokenRepository.rotate("old", "new3") is None
+    assert not await RefreshTokenRepository.is_token_valid("new3")
+    assert not await RefreshTokenRepository.is_token_valid("new1")
+
+
+async def test_reuse_after_grace_revokes_every_token(fake_redis):
+    await RefreshTokenRepository.create(USER_ID, "old")
+    await RefreshTokenRepository.create(USER_ID, "other-device")
+    await RefreshTokenRepository.rotate("old", "new1")
+    # Grace period over
+    await fake_redis.delete(REFRESH_TOKEN_KEY.format(token_hash("old")))
+
+    assert await RefreshTokenRepository.rotate("old", "new2") is None
+    assert not await RefreshTokenRepository.is_token_valid("new1")
+    assert not await RefreshTokenRepository.is_token_valid("other-device")
+    assert not await RefreshTokenRepository.is_token_valid("new2")
+
+
+async def test_rotation_chain_keeps_user_set_small(fake_redis):
+    await RefreshTokenRepository.create(USER_ID, "t0")
+    for i in range(1, 6):
+        await RefreshTokenRepository.rotate(f"t{i - 1}", f"t{i}")
+
+    members = await fake_redis.smembers(USER_REFRESH_TOKENS_KEY.format(USER_ID))
+    assert members == {token_hash("t4"), token_hash("t5")}
+
+
+async def test_unknown_token_is_rejected(fake_redis):
+    assert await RefreshTokenRepository.rotate("never-issued", "new") is None
+    assert not await RefreshTokenRepository.is_token_valid("new")
+
+
+async def test_shorter_token_does_not_shrink_user_set_ttl(fake_redis):
+    await RefreshTokenRepository.create(USER_ID, "long", timedelta(days=30))
+    await RefreshTokenRepository.create(USER_ID, "short", timedelta(minutes=1))
+
+    ttl = await fake_redis.ttl(USER_REFRESH_TOKENS_KEY.format(USER_ID))
+    assert ttl > timedelta(days=29).total_seconds()
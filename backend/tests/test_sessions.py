@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.session import USER_SESSIONS_KEY, SessionService
+
+pytestmark = pytest.mark.anyio
+
+USER_ID = "u1"
+
+
+@pytest.fixture
+def sessions(fake_redis):
+    return SessionService(touch_interval=60)
+
+
+async def test_create_and_get_session(sessions):
+    session_id = await sessions.create_session(USER_ID, {"device": "phone", "scopes": ["a", "b"]})
+
+    session = await sessions.get_session(session_id)
+    assert session["device"] == "phone"
+    assert session["scopes"] == ["a", "b"]
+    assert session["user_id"] == USER_ID
+    assert session["session_id"] == session_id
+
+
+async def test_short_session_does_not_shrink_index_ttl(sessions, fake_redis):
+    first = await sessions.create_session(USER_ID, {}, expires_in=3600)
+    await sessions.create_session(USER_ID, {}, expires_in=60)
+
+    index_ttl = await fake_redis.ttl(USER_SESSIONS_KEY.format(USER_ID))
+    session_ttl = await fake_redis.ttl(sessions._session_key(first))
+    assert index_ttl >= session_ttl > 60
+
+
+async def test_update_session_refreshes_index(sessions, fake_redis):
+    session_id = await sessions.create_session(USER_ID, {"theme": "dark"}, expires_in=60)
+
+    assert await sessions.update_session(session_id, {"theme": "light", "user_id": "someone-else"})
+
+    session = await sessions.get_session(session_id)
+    assert session["theme"] == "light"
+    assert session["user_id"] == USER_ID
+    index_ttl = await fake_redis.ttl(USER_SESSIONS_KEY.format(USER_ID))
+    assert index_ttl >= await fake_redis.ttl(sessions._session_key(session_id)) > 60
+
+
+async def test_update_missing_session(sessions):
+    assert not await sessions.update_session(f"{USER_ID}_missing", {"theme": "dark"})
+
+
+async def test_reads_within_touch_interval_do_not_write(sessions, fake_redis):
+    session_id = await sessions.create_session(USER_ID, {})
+    key = sessions._session_key(session_id)
+    created = (await sessions.get_session(session_id))["last_activity"]
+
+    assert (await sessions.get_session(session_id))["last_activity"] == created
+
+    stale = (datetime.utcnow() - timedelta(seconds=120)).isoformat()
+    await fake_redis.hset(key, "last_activity", f'"{stale}"')
+    touched = await sessions.get_session(session_id)
+    assert touched["last_activity"] > stale
+    assert (await sessions.get_session(session_id))["last_activity"] == touched["last_activity"]
+
+
+async def test_user_sessions_drop_expired_entries(sessions, fake_redis):
+    kept = await sessions.create_session(USER_ID, {})
+    expired = await sessions.create_session(USER_ID, {})
+    await fake_redis.delete(sessions._session_key(expired))
+
+    listed = await sessions.get_user_sessions(USER_ID)
+
+    assert [session["session_id"] for session in listed] == [kept]
+    assert await fake_redis.smembers(USER_SESSIONS_KEY.format(USER_ID)) == {kept}
+
+
+async def test_delete_user_sessions_revokes_every_session(sessions, fake_redis):
+    ids = [await sessions.create_session(USER_ID, {}) for _ in range(3)]
+    other = await sessions.create_session("u2", {})
+
+    assert await sessions.delete_user_sessions(USER_ID)
+
+    for session_id in ids:
+        assert await sessions.get_session(session_id) is None
+    assert not await fake_redis.exists(USER_SESSIONS_KEY.format(USER_ID))
+    assert await sessions.get_session(other) is not None
+
+
+async def test_delete_session_removes_it_from_index(sessions, fake_redis):
+    session_id = await sessions.create_session(USER_ID, {})
+
+    assert await sessions.delete_session(session_id)
+
+    assert await sessions.get_session(session_id) is None
+    assert await fake_redis.smembers(USER_SESSIONS_KEY.format(USER_ID)) == set()
@@ -178,6 +178,11 @@ class AuthService {
         if (result.data?.access_token) {
           this.accessToken = result.data.access_token;
           localStorage.setItem("auth_access_token", this.accessToken);
+          // Refresh tokens are rotated on every refresh
+          if (result.data.refresh_token) {
+            this.refreshToken = result.data.refresh_token;
+            localStorage.setItem("auth_refresh_token", this.refreshToken);
+          }
           return true;
         }
 